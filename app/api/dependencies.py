@@ -1,6 +1,9 @@
+import time
 from typing import AsyncGenerator
+from fastapi import Depends, Request
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.core.database import AsyncSession as AsyncSessionFactory
+from app.core import database
+from app.core.database import AsyncSession as AsyncSessionFactory, PRIMARY_PIN_COOKIE
 from app.services.database_service import DatabaseService
 
 
@@ -12,6 +15,41 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
         yield session
 
 
+def is_pinned_to_primary(request: Request) -> bool:
+    """
+    True if the client wrote recently and must read its own writes from the primary.
+    """
+    try:
+        return float(request.cookies.get(PRIMARY_PIN_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+def read_session_factory(request: Request):
+    """
+    Session factory for read-only work that needs sessions of its own (e.g. concurrent
+    queries): the replica when configured, otherwise or right after a write the primary.
+    """
+    if database.ReadSession is None or is_pinned_to_primary(request):
+        return AsyncSessionFactory
+    return database.ReadSession
+
+
+async def get_read_db(
+    request: Request,
+    primary: AsyncSession = Depends(get_db)
+) -> AsyncGenerator[AsyncSession, None]:
+    """
+    Dependency that provides a session for read-only work: the replica when one is
+    configured, otherwise (or right after this client wrote) the primary session.
+    """
+    if database.ReadSession is None or is_pinned_to_primary(request):
+        yield primary
+    else:
+        async with database.ReadSession() as session:
+            yield session
+
+
 async def get_database_service(session: AsyncSession = None) -> DatabaseService:
     """
     Dependency that provides a database service instance.
@@ -1,16 +1,25 @@
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Depends, Request
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.services.analysis_service import AnalysisService
 from app.integrations.mojo_client import MojoClient
+from app.api.dependencies import get_read_db, read_session_factory
 from app.core.config import settings
 
 router = APIRouter()
 
 # Initialize with proper configuration
 mojo_client = MojoClient(settings.MOJO_BASE_URL, settings.MOJO_API_KEY)
-analysis_service = AnalysisService(mojo_client)
+
+
+async def get_analysis_service(request: Request, db: AsyncSession = Depends(get_read_db)) -> AnalysisService:
+    """Get analysis service instance reading from the replica when configured."""
+    return AnalysisService(mojo_client, db, session_factory=read_session_factory(request))
 
 @router.post("/analyze-grades")
-async def analyze_grades(teacher_id: str):
+async def analyze_grades(
+    teacher_id: str,
+    analysis_service: AnalysisService = Depends(get_analysis_service)
+):
     """Trigger grade analysis for missing grades"""
     try:
         await analysis_service.check_missing_grades()
@@ -22,7 +31,8 @@ async def analyze_grades(teacher_id: str):
 @router.post("/analytics/student/{student_id}/grades")
 async def analyze_student_grades(
     student_id: int,
-    days: int = Query(30, description="Number of days to analyze", ge=1, le=365)
+    days: int = Query(30, description="Number of days to analyze", ge=1, le=365),
+    analysis_service: AnalysisService = Depends(get_analysis_service)
 ):
     """Analyze grade trends for a student"""
     try:
@@ -41,7 +51,8 @@ async def analyze_student_grades(
 @router.post("/analytics/student/{student_id}/attendance")
 async def analyze_student_attendance(
     student_id: int,
-    days: int = Query(30, description="Number of days to analyze", ge=1, le=365)
+    days: int = Query(30, description="Number of days to analyze", ge=1, le=365),
+    analysis_service: AnalysisService = Depends(get_analysis_service)
 ):
     """Analyze attendance patterns for a student"""
     try:
@@ -60,7 +71,8 @@ async def analyze_student_attendance(
 @router.post("/analytics/student/{student_id}/homework")
 async def analyze_homework_completion(
     student_id: int,
-    days: int = Query(30, description="Number of days to analyze", ge=1, le=365)
+    days: int = Query(30, description="Number of days to analyze", ge=1, le=365),
+    analysis_service: AnalysisService = Depends(get_analysis_service)
 ):
     """Analyze homework completion for a student"""
     try:
@@ -79,7 +91,8 @@ async def analyze_homework_completion(
 @router.post("/analytics/student/{student_id}/comprehensive")
 async def generate_comprehensive_report(
     student_id: int,
-    days: int = Query(30, description="Number of days to analyze", ge=1, le=365)
+    days: int = Query(30, description="Number of days to analyze", ge=1, le=365),
+    analysis_service: AnalysisService = Depends(get_analysis_service)
 ):
     """Generate a comprehensive analytics report with AI insights"""
     try:
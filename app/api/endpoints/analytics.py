@@ -1,14 +1,15 @@
 from fastapi import APIRouter, HTTPException, Depends, status, Query
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.services.database_service import DatabaseService
-from app.api.dependencies import get_db
-from datetime import datetime, timedelta
+from app.api.dependencies import get_read_db
+from app.core.terms import Term, term_for
+from datetime import date, datetime, timedelta
 
 router = APIRouter(prefix="/analytics", tags=["analytics"])
 
 
-async def get_db_service(db: AsyncSession = Depends(get_db)) -> DatabaseService:
+async def get_db_service(db: AsyncSession = Depends(get_read_db)) -> DatabaseService:
     """Get database service instance."""
     return DatabaseService(db)
 
@@ -21,7 +22,8 @@ async def get_student_grades_summary(
 ) -> Dict[str, Any]:
     """
     Get summary of grades for a specific student over a period.
-    Returns grade count, average, and subject breakdown.
+    Returns grade count and per-subject count, average, lowest and highest score,
+    read from the daily rollups.
     """
     try:
         # Check if student exists
@@ -32,10 +34,9 @@ async def get_student_grades_summary(
                 detail=f"Student with ID {student_id} not found"
             )
         
-        # Get grades for the period
-        grades = await db_service.get_grades_for_student(student_id, days=days)
+        subject_stats = await db_service.get_subject_summary(student_id, days=days)
         
-        if not grades:
+        if not subject_stats:
             return {
                 "student_id": student_id,
                 "period_days": days,
@@ -44,22 +45,10 @@ async def get_student_grades_summary(
                 "message": "No grades found for this period"
             }
         
-        # Analyze grades by subject
-        subject_stats = {}
-        for grade in grades:
-            subject = grade.subject
-            if subject not in subject_stats:
-                subject_stats[subject] = {
-                    "count": 0,
-                    "grades": []
-                }
-            subject_stats[subject]["count"] += 1
-            subject_stats[subject]["grades"].append(grade.grade)
-        
         return {
             "student_id": student_id,
             "period_days": days,
-            "total_grades": len(grades),
+            "total_grades": sum(stats["count"] for stats in subject_stats.values()),
             "subjects": subject_stats,
             "date_range": {
                 "from": (datetime.now() - timedelta(days=days)).isoformat(),
@@ -75,16 +64,192 @@ async def get_student_grades_summary(
         )
 
 
+@router.get("/student/{student_id}/grade-trends")
+async def get_student_grade_trends(
+    student_id: int,
+    subject: Optional[str] = Query(None, description="Only this subject"),
+    db_service: DatabaseService = Depends(get_db_service)
+) -> Dict[str, Any]:
+    """
+    Get all-time grade trends per subject for a student from the online trend state:
+    count, average, standard deviation, EWMA of recent scores, last scores and trend.
+    """
+    try:
+        student = await db_service.get_student_by_id(student_id)
+        if not student:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Student with ID {student_id} not found"
+            )
+        
+        return {
+            "student_id": student_id,
+            "subjects": await db_service.get_trend_state(student_id, subject=subject)
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to get grade trends: {str(e)}"
+        )
+
+
+@router.get("/risk")
+async def get_student_risk(
+    class_name: Optional[str] = Query(None, description="Only students of this class"),
+    min_score: Optional[float] = Query(None, ge=0, description="Only students scoring at least this"),
+    limit: int = Query(50, ge=1, le=1000, description="Number of students to return"),
+    db_service: DatabaseService = Depends(get_db_service)
+) -> Dict[str, Any]:
+    """
+    Get students ranked by the nightly early-warning risk score (rank 1 = highest risk in
+    the school), with the signals behind each score.
+    """
+    try:
+        rows = await db_service.get_student_risk(limit, class_name=class_name, min_score=min_score)
+        return {
+            "computed_at": rows[0].computed_at.isoformat() if rows else None,
+            "students": [
+                {
+                    "student_id": row.student_id,
+                    "user_id": row.user_id,
+                    "class_name": row.class_name,
+                    "rank": row.rank,
+                    "score": row.score,
+                    "grade_slope": row.grade_slope,
+                    "attendance_rate": row.attendance_rate,
+                    "attendance_drop": row.attendance_drop,
+                    "overdue_count": row.overdue_count,
+                    "missing_grade_streak": row.missing_grade_streak
+                }
+                for row in rows
+            ]
+        }
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to get student risk: {str(e)}"
+        )
+
+
+TERM_DAY_QUERY = Query(None, description="Any day in the term to show (default: today)")
+
+
+@router.get("/student/{student_id}/percentiles")
+async def get_student_percentiles(
+    student_id: int,
+    day: Optional[date] = TERM_DAY_QUERY,
+    db_service: DatabaseService = Depends(get_db_service)
+) -> Dict[str, Any]:
+    """
+    Get the percentile rank of a student's term average in each subject within their
+    class, grade level and school, read from per-class score sketches.
+    """
+    try:
+        student = await db_service.get_student_by_id(student_id)
+        if not student:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Student with ID {student_id} not found"
+            )
+        
+        term = term_for(day or date.today())
+        return {
+            "student_id": student_id,
+            "class_name": student.class_name,
+            "term": {"start": term.start.isoformat(), "end": term.end.isoformat()},
+            "subjects": await db_service.get_percentile_ranks(student, term)
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to compute percentile ranks: {str(e)}"
+        )
+
+
+def _heatmap(term: Term, cells: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Assemble a weekday x hour attendance heatmap response."""
+    return {
+        "term": {"start": term.start.isoformat(), "end": term.end.isoformat()},
+        "total_marked": sum(cell["marked"] for cell in cells),
+        "total_absences": sum(cell["absences"] for cell in cells),
+        "cells": cells
+    }
+
+
+@router.get("/student/{student_id}/attendance-heatmap")
+async def get_student_attendance_heatmap(
+    student_id: int,
+    day: Optional[date] = TERM_DAY_QUERY,
+    db_service: DatabaseService = Depends(get_db_service)
+) -> Dict[str, Any]:
+    """
+    Get a student's absences in a term by weekday (ISO, 1 = Monday) and lesson hour.
+    """
+    try:
+        student = await db_service.get_student_by_id(student_id)
+        if not student:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Student with ID {student_id} not found"
+            )
+        
+        term = term_for(day or date.today())
+        cells = await db_service.get_attendance_heatmap(term, student_id=student.user_id)
+        return {"student_id": student_id, **_heatmap(term, cells)}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to generate attendance heatmap: {str(e)}"
+        )
+
+
+@router.get("/class/{class_name}/attendance-heatmap")
+async def get_class_attendance_heatmap(
+    class_name: str,
+    day: Optional[date] = TERM_DAY_QUERY,
+    db_service: DatabaseService = Depends(get_db_service)
+) -> Dict[str, Any]:
+    """
+    Get absences across a class's lessons in a term by weekday (ISO, 1 = Monday) and lesson hour.
+    """
+    try:
+        term = term_for(day or date.today())
+        cells = await db_service.get_attendance_heatmap(term, class_name=class_name)
+        return {"class_name": class_name, **_heatmap(term, cells)}
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to generate attendance heatmap: {str(e)}"
+        )
+
+
+def _summarize_class(class_name: str, students: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Assemble a class overview from its per-student rows."""
+    return {
+        "class_name": class_name,
+        "student_count": len(students),
+        "recent_grades_count": sum(s["grade_count"] for s in students),
+        "students": students
+    }
+
+
 @router.get("/class/{class_name}/overview")
 async def get_class_overview(
     class_name: str,
+    days: int = Query(7, ge=1, le=365, description="Number of days of activity to include"),
     db_service: DatabaseService = Depends(get_db_service)
 ) -> Dict[str, Any]:
     """
     Get overview of a class including student count and recent activity.
     """
     try:
-        students = await db_service.get_students_by_class(class_name)
+        students = await db_service.get_class_overview([class_name], days=days)
         
         if not students:
             raise HTTPException(
@@ -92,25 +257,95 @@ async def get_class_overview(
                 detail=f"No students found in class {class_name}"
             )
         
-        # Get recent grades for all students in the class
-        all_grades = []
-        for student in students:
-            grades = await db_service.get_grades_for_student(student.id, days=7)
-            all_grades.extend(grades)
+        return _summarize_class(class_name, students)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to generate class overview: {str(e)}"
+        )
+
+
+@router.get("/class/{class_name}/homework")
+async def get_class_homework_completion(
+    class_name: str,
+    days: int = Query(30, ge=1, le=365, description="Include homework due within the last N days or later"),
+    db_service: DatabaseService = Depends(get_db_service)
+) -> Dict[str, Any]:
+    """
+    Get homework completion (completed, pending, overdue) for every student in a class.
+    """
+    try:
+        students = await db_service.get_class_homework_completion(class_name, days=days)
+        
+        if not students:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"No students found in class {class_name}"
+            )
         
         return {
             "class_name": class_name,
-            "student_count": len(students),
-            "recent_grades_count": len(all_grades),
-            "students": [
-                {
-                    "id": s.id,
-                    "user_id": s.user_id
-                } for s in students
-            ]
+            "period_days": days,
+            "students": students
         }
     except HTTPException:
         raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to generate homework completion: {str(e)}"
+        )
+
+
+@router.get("/class/{class_name}/grade-trends")
+async def get_class_grade_trends(
+    class_name: str,
+    days: int = Query(30, ge=1, le=365, description="Number of days to analyze"),
+    db_service: DatabaseService = Depends(get_db_service)
+) -> Dict[str, Any]:
+    """
+    Get grade trends (mean, slope, half-over-half change, range, latest) for every
+    student and subject in a class, computed in one pass over the class's grades.
+    """
+    try:
+        trends = await db_service.get_cohort_trends(days, class_name=class_name)
+        return {
+            "class_name": class_name,
+            "period_days": days,
+            "students": [
+                {"student_id": student_id, "subjects": subjects}
+                for student_id, subjects in trends.items()
+            ]
+        }
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to generate grade trends: {str(e)}"
+        )
+
+
+@router.get("/classes/overview")
+async def get_classes_overview(
+    class_names: List[str] = Query(..., min_length=1, description="Class names, e.g. ?class_names=5A&class_names=5B"),
+    days: int = Query(7, ge=1, le=365, description="Number of days of activity to include"),
+    db_service: DatabaseService = Depends(get_db_service)
+) -> Dict[str, Any]:
+    """
+    Get overviews for several classes at once (e.g. a whole grade level).
+    """
+    try:
+        students = await db_service.get_class_overview(class_names, days=days)
+        
+        by_class = {name: [] for name in class_names}
+        for student in students:
+            by_class[student["class_name"]].append(student)
+        
+        return {
+            "period_days": days,
+            "classes": [_summarize_class(name, rows) for name, rows in by_class.items()]
+        }
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -126,19 +361,13 @@ async def get_system_summary(
     Get overall system summary including counts of users, students, teachers, etc.
     """
     try:
-        users = await db_service.get_users()
-        students = await db_service.get_students()
-        teachers = await db_service.get_teachers()
-        grades = await db_service.get_grades()
-        lessons = await db_service.get_lessons()
-        
         return {
             "summary": {
-                "total_users": len(users),
-                "total_students": len(students),
-                "total_teachers": len(teachers),
-                "total_grades": len(grades),
-                "total_lessons": len(lessons)
+                "total_users": await db_service.count_users(),
+                "total_students": await db_service.count_students(),
+                "total_teachers": await db_service.count_teachers(),
+                "total_grades": await db_service.count_grades(),
+                "total_lessons": await db_service.count_lessons()
             },
             "timestamp": datetime.now().isoformat()
         }
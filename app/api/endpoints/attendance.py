@@ -1,8 +1,14 @@
 from fastapi import APIRouter, HTTPException, Depends, status, Query
+from typing import List, Literal, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.schemas.attendance import AttendanceCreate, AttendanceUpdate, AttendanceResponse, AttendanceListResponse
+from app.schemas.attendance import (
+    AttendanceCreate, AttendanceUpdate, AttendanceResponse, AttendanceListResponse,
+    LessonAttendanceMark, LessonAttendanceResponse, AttendanceBulkUpsert, AttendanceUpsertResponse
+)
 from app.services.database_service import DatabaseService
-from app.api.dependencies import get_db
+from app.core.pagination import InvalidCursorError
+from app.models.attendance import Attendance
+from app.api.dependencies import get_db, get_read_db
 from datetime import datetime
 
 router = APIRouter(prefix="/attendance", tags=["attendance"])
@@ -13,43 +19,108 @@ async def get_db_service(db: AsyncSession = Depends(get_db)) -> DatabaseService:
     return DatabaseService(db)
 
 
+async def get_read_db_service(db: AsyncSession = Depends(get_read_db)) -> DatabaseService:
+    """Get database service instance for read-only queries (replica when configured)."""
+    return DatabaseService(db)
+
+
 @router.post("/", response_model=AttendanceResponse, status_code=status.HTTP_201_CREATED)
 async def mark_attendance(
     attendance_data: AttendanceCreate,
     db_service: DatabaseService = Depends(get_db_service)
 ):
-    """Mark attendance for a student in a lesson."""
+    """Mark attendance for a student in a lesson, dated at the lesson. Safe to repeat."""
     try:
         attendance = await db_service.mark_attendance(
             student_id=attendance_data.student_id,
             lesson_id=attendance_data.lesson_id,
             present=attendance_data.present
         )
-        return attendance
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Failed to mark attendance: {str(e)}"
         )
+    if attendance is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Lesson with ID {attendance_data.lesson_id} not found"
+        )
+    return attendance
+
+
+@router.post("/lesson/{lesson_id}", response_model=LessonAttendanceResponse)
+async def mark_lesson_attendance(
+    lesson_id: int,
+    roster: LessonAttendanceMark,
+    db_service: DatabaseService = Depends(get_db_service)
+):
+    """Mark attendance for a whole lesson at once. Safe to re-submit with corrections."""
+    try:
+        records = await db_service.mark_lesson_attendance(lesson_id, roster.attendance)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Failed to mark attendance: {str(e)}"
+        )
+    if records is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Lesson with ID {lesson_id} not found"
+        )
+    return LessonAttendanceResponse(lesson_id=lesson_id, attendance_records=records)
+
+
+@router.put("/bulk", response_model=AttendanceUpsertResponse)
+async def upsert_attendance(
+    bulk_data: AttendanceBulkUpsert,
+    db_service: DatabaseService = Depends(get_db_service)
+):
+    """Insert or update attendance by (student_id, lesson_id). Safe to replay."""
+    try:
+        upserted, errors = await db_service.upsert_attendance(
+            [record.model_dump() for record in bulk_data.records]
+        )
+        return AttendanceUpsertResponse(
+            upserted=upserted,
+            errors=errors,
+            upserted_count=len(upserted),
+            error_count=len(errors)
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Failed to upsert attendance: {str(e)}"
+        )
 
 
 @router.get("/", response_model=AttendanceListResponse)
 async def list_attendance(
     skip: int = Query(0, ge=0, description="Number of records to skip"),
     limit: int = Query(100, ge=1, le=100, description="Number of records to return"),
-    db_service: DatabaseService = Depends(get_db_service)
+    cursor: Optional[str] = Query(None, description="Opaque cursor from a previous page's next_cursor"),
+    with_total: bool = Query(False, description="Include the total number of matching records"),
+    include: List[Literal["with_student", "with_lesson"]] = Query([], description="Related objects to embed"),
+    db_service: DatabaseService = Depends(get_read_db_service)
 ):
-    """List attendance records with pagination."""
+    """List attendance records with cursor pagination."""
     try:
-        attendance_records = await db_service.get_attendance_records(skip=skip, limit=limit)
-        all_records = await db_service.get_attendance_records()
-        total = len(all_records)
+        attendance_records = await db_service.get_attendance_records(
+            skip=skip, limit=limit, cursor=cursor, load=include
+        )
+        total = await db_service.count_attendance_records() if with_total else None
         
         return AttendanceListResponse(
             attendance_records=attendance_records,
             total=total,
             page=skip // limit + 1,
-            per_page=limit
+            per_page=limit,
+            next_cursor=db_service.page_cursor(Attendance, attendance_records, limit)
+        )
+    except InvalidCursorError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
         )
     except Exception as e:
         raise HTTPException(
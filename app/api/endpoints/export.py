@@ -0,0 +1,119 @@
+import csv
+import io
+import json
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.services.database_service import DatabaseService
+from app.api.dependencies import get_read_db
+
+router = APIRouter(prefix="/export", tags=["export"])
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+async def get_db_service(db: AsyncSession = Depends(get_read_db)) -> DatabaseService:
+    """Get database service instance for read-only queries (replica when configured)."""
+    return DatabaseService(db)
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+async def _ndjson_chunks(batches: AsyncIterator[List[Dict]]) -> AsyncIterator[str]:
+    async for rows in batches:
+        yield "".join(json.dumps(row, default=_json_default) + "\n" for row in rows)
+
+
+async def _csv_chunks(columns: List[str], batches: AsyncIterator[List[Dict]]) -> AsyncIterator[str]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns)
+    writer.writeheader()
+    yield buffer.getvalue()
+    async for rows in batches:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(
+            {key: value.isoformat() if isinstance(value, datetime) else value for key, value in row.items()}
+            for row in rows
+        )
+        yield buffer.getvalue()
+
+
+def _export_response(
+    db_service: DatabaseService,
+    kind: str,
+    format: str,
+    date_from: Optional[datetime],
+    date_to: Optional[datetime],
+    class_name: Optional[str]
+) -> StreamingResponse:
+    batches = db_service.stream_export(kind, date_from=date_from, date_to=date_to, class_name=class_name)
+    if format == "csv":
+        body = _csv_chunks(db_service.export_columns(kind), batches)
+    else:
+        body = _ndjson_chunks(batches)
+    return StreamingResponse(
+        body,
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{kind}.{format}"'}
+    )
+
+
+FORMAT_QUERY = Query("ndjson", pattern="^(ndjson|csv)$", description="ndjson or csv")
+DATE_FROM_QUERY = Query(None, description="Only rows on or after this date")
+DATE_TO_QUERY = Query(None, description="Only rows before this date")
+CLASS_QUERY = Query(None, description="Only rows for this class")
+
+
+@router.get("/grades")
+async def export_grades(
+    format: str = FORMAT_QUERY,
+    date_from: Optional[datetime] = DATE_FROM_QUERY,
+    date_to: Optional[datetime] = DATE_TO_QUERY,
+    class_name: Optional[str] = CLASS_QUERY,
+    db_service: DatabaseService = Depends(get_db_service)
+):
+    """Stream all grades, filtered by grade date and the student's class."""
+    return _export_response(db_service, "grades", format, date_from, date_to, class_name)
+
+
+@router.get("/attendance")
+async def export_attendance(
+    format: str = FORMAT_QUERY,
+    date_from: Optional[datetime] = DATE_FROM_QUERY,
+    date_to: Optional[datetime] = DATE_TO_QUERY,
+    class_name: Optional[str] = CLASS_QUERY,
+    db_service: DatabaseService = Depends(get_db_service)
+):
+    """Stream all attendance records, filtered by date and the lesson's class."""
+    return _export_response(db_service, "attendance", format, date_from, date_to, class_name)
+
+
+@router.get("/homework")
+async def export_homework(
+    format: str = FORMAT_QUERY,
+    date_from: Optional[datetime] = DATE_FROM_QUERY,
+    date_to: Optional[datetime] = DATE_TO_QUERY,
+    class_name: Optional[str] = CLASS_QUERY,
+    db_service: DatabaseService = Depends(get_db_service)
+):
+    """Stream all homework, filtered by due date and the lesson's class."""
+    return _export_response(db_service, "homework", format, date_from, date_to, class_name)
+
+
+@router.get("/submissions")
+async def export_submissions(
+    format: str = FORMAT_QUERY,
+    date_from: Optional[datetime] = DATE_FROM_QUERY,
+    date_to: Optional[datetime] = DATE_TO_QUERY,
+    class_name: Optional[str] = CLASS_QUERY,
+    db_service: DatabaseService = Depends(get_db_service)
+):
+    """Stream all homework submissions, filtered by submission date and the homework's class."""
+    return _export_response(db_service, "submissions", format, date_from, date_to, class_name)
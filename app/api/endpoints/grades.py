@@ -1,9 +1,12 @@
 from fastapi import APIRouter, HTTPException, Depends, status, Query
-from typing import Optional
+from typing import List, Literal, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.schemas.grade import GradeCreate, GradeUpdate, GradeResponse, GradeListResponse
-from app.services.database_service import DatabaseService
-from app.api.dependencies import get_db
+from app.schemas.grade import GradeCreate, GradeUpdate, GradeResponse, GradeListResponse, GradeBulkCreate, GradeBulkResponse, GradeUpsertResponse
+from app.services.database_service import DatabaseService, DuplicateGradeKeyError
+from app.core.pagination import InvalidCursorError
+from app.models.grade import Grade
+from app.api.dependencies import get_db, get_read_db
+from datetime import datetime, timedelta
 
 router = APIRouter(prefix="/grades", tags=["grades"])
 
@@ -13,6 +16,11 @@ async def get_db_service(db: AsyncSession = Depends(get_db)) -> DatabaseService:
     return DatabaseService(db)
 
 
+async def get_read_db_service(db: AsyncSession = Depends(get_read_db)) -> DatabaseService:
+    """Get database service instance for read-only queries (replica when configured)."""
+    return DatabaseService(db)
+
+
 @router.post("/", response_model=GradeResponse, status_code=status.HTTP_201_CREATED)
 async def create_grade(
     grade_data: GradeCreate,
@@ -36,33 +44,90 @@ async def create_grade(
         )
 
 
+@router.post("/bulk", response_model=GradeBulkResponse, status_code=status.HTTP_201_CREATED)
+async def create_grades_bulk(
+    bulk_data: GradeBulkCreate,
+    db_service: DatabaseService = Depends(get_db_service)
+):
+    """Create many grades in a single transaction, reporting errors per item."""
+    try:
+        created, errors = await db_service.create_grades_bulk(
+            [grade.model_dump() for grade in bulk_data.grades]
+        )
+        return GradeBulkResponse(
+            created=[grade for _, grade in created],
+            errors=errors,
+            created_count=len(created),
+            error_count=len(errors)
+        )
+    except DuplicateGradeKeyError as e:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=str(e)
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Failed to create grades: {str(e)}"
+        )
+
+
+@router.put("/bulk", response_model=GradeUpsertResponse)
+async def upsert_grades(
+    bulk_data: GradeBulkCreate,
+    db_service: DatabaseService = Depends(get_db_service)
+):
+    """Insert or update grades by (student_id, subject, date, teacher_id). Safe to replay."""
+    try:
+        upserted, errors = await db_service.upsert_grades(
+            [grade.model_dump() for grade in bulk_data.grades]
+        )
+        return GradeUpsertResponse(
+            upserted=upserted,
+            errors=errors,
+            upserted_count=len(upserted),
+            error_count=len(errors)
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Failed to upsert grades: {str(e)}"
+        )
+
+
 @router.get("/", response_model=GradeListResponse)
 async def list_grades(
     skip: int = Query(0, ge=0, description="Number of records to skip"),
     limit: int = Query(100, ge=1, le=100, description="Number of records to return"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from a previous page's next_cursor"),
+    with_total: bool = Query(False, description="Include the total number of matching records"),
     student_id: Optional[int] = Query(None, description="Filter by student ID"),
     days: Optional[int] = Query(None, ge=1, description="Filter grades from last N days (only with student_id)"),
-    db_service: DatabaseService = Depends(get_db_service)
+    include: List[Literal["with_student", "with_teacher"]] = Query([], description="Related objects to embed"),
+    db_service: DatabaseService = Depends(get_read_db_service)
 ):
-    """List grades with optional filtering and pagination."""
+    """List grades ordered by (date, id) with optional filtering and cursor pagination."""
     try:
+        since = None
         if student_id:
-            if days:
-                grades = await db_service.get_grades_for_student(student_id=student_id, days=days)
-            else:
-                grades = await db_service.get_grades_for_student(student_id=student_id, days=365)  # Default to 1 year
-            total = len(grades)
-            grades = grades[skip:skip + limit]
-        else:
-            grades = await db_service.get_grades(skip=skip, limit=limit)
-            all_grades = await db_service.get_grades()
-            total = len(all_grades)
+            since = datetime.now() - timedelta(days=days or 365)  # Default to 1 year
+        
+        grades = await db_service.get_grades(
+            skip=skip, limit=limit, cursor=cursor, student_id=student_id, since=since, load=include
+        )
+        total = await db_service.count_grades(student_id=student_id, since=since) if with_total else None
         
         return GradeListResponse(
             grades=grades,
             total=total,
             page=skip // limit + 1,
-            per_page=limit
+            per_page=limit,
+            next_cursor=db_service.page_cursor(Grade, grades, limit)
+        )
+    except InvalidCursorError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
         )
     except Exception as e:
         raise HTTPException(
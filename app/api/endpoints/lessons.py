@@ -1,8 +1,11 @@
 from fastapi import APIRouter, HTTPException, Depends, status, Query
+from typing import List, Literal, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.schemas.lesson import LessonCreate, LessonUpdate, LessonResponse, LessonListResponse
 from app.services.database_service import DatabaseService
-from app.api.dependencies import get_db
+from app.core.pagination import InvalidCursorError
+from app.models.lesson import Lesson
+from app.api.dependencies import get_db, get_read_db
 
 router = APIRouter(prefix="/lessons", tags=["lessons"])
 
@@ -12,6 +15,11 @@ async def get_db_service(db: AsyncSession = Depends(get_db)) -> DatabaseService:
     return DatabaseService(db)
 
 
+async def get_read_db_service(db: AsyncSession = Depends(get_read_db)) -> DatabaseService:
+    """Get database service instance for read-only queries (replica when configured)."""
+    return DatabaseService(db)
+
+
 @router.post("/", response_model=LessonResponse, status_code=status.HTTP_201_CREATED)
 async def create_lesson(
     lesson_data: LessonCreate,
@@ -38,19 +46,27 @@ async def create_lesson(
 async def list_lessons(
     skip: int = Query(0, ge=0, description="Number of records to skip"),
     limit: int = Query(100, ge=1, le=100, description="Number of records to return"),
-    db_service: DatabaseService = Depends(get_db_service)
+    cursor: Optional[str] = Query(None, description="Opaque cursor from a previous page's next_cursor"),
+    with_total: bool = Query(False, description="Include the total number of matching records"),
+    include: List[Literal["with_teacher"]] = Query([], description="Related objects to embed"),
+    db_service: DatabaseService = Depends(get_read_db_service)
 ):
-    """List lessons with pagination."""
+    """List lessons with cursor pagination."""
     try:
-        lessons = await db_service.get_lessons(skip=skip, limit=limit)
-        all_lessons = await db_service.get_lessons()
-        total = len(all_lessons)
+        lessons = await db_service.get_lessons(skip=skip, limit=limit, cursor=cursor, load=include)
+        total = await db_service.count_lessons() if with_total else None
         
         return LessonListResponse(
             lessons=lessons,
             total=total,
             page=skip // limit + 1,
-            per_page=limit
+            per_page=limit,
+            next_cursor=db_service.page_cursor(Lesson, lessons, limit)
+        )
+    except InvalidCursorError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
         )
     except Exception as e:
         raise HTTPException(
@@ -0,0 +1,14 @@
+from fastapi import APIRouter
+from app.core import database
+
+router = APIRouter(prefix="/metrics", tags=["metrics"])
+
+
+@router.get("/db-pool")
+async def get_db_pool_metrics():
+    """Connection pool usage per engine: checkout latency, connections in use, overflow and timeouts."""
+    engines = {"primary": database.engine, "replica": database.read_engine}
+    return {
+        name: metrics.snapshot(engines[name].sync_engine.pool)
+        for name, metrics in database.pool_metrics.items()
+    }
@@ -0,0 +1,37 @@
+from fastapi import APIRouter, HTTPException, Depends, status, Query
+from typing import List, Literal, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.schemas.search import SearchResponse
+from app.services import search as search_service
+from app.core.pagination import InvalidCursorError, next_cursor
+from app.api.dependencies import get_read_db
+
+router = APIRouter(prefix="/search", tags=["search"])
+
+
+@router.get("", response_model=SearchResponse)
+async def search(
+    q: str = Query(..., min_length=1, max_length=200, description="Words to find; each must match as a prefix"),
+    kind: List[Literal["lesson", "homework", "grade"]] = Query([], description="Only these kinds (default: all)"),
+    limit: int = Query(20, ge=1, le=100, description="Number of results to return"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from a previous page's next_cursor"),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Search lesson topics, homework titles and descriptions, and grade lesson topics, best match first."""
+    try:
+        hits = await search_service.search(db, q, kinds=kind, limit=limit, cursor=cursor)
+        return SearchResponse(
+            query=q,
+            results=hits,
+            next_cursor=next_cursor(hits, limit, search_service.CURSOR_ATTRS)
+        )
+    except InvalidCursorError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to search: {str(e)}"
+        )
@@ -1,9 +1,11 @@
 from fastapi import APIRouter, HTTPException, Depends, status, Query
-from typing import Optional
+from typing import List, Literal, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.schemas.student import StudentCreate, StudentUpdate, StudentResponse, StudentListResponse
 from app.services.database_service import DatabaseService
-from app.api.dependencies import get_db
+from app.core.pagination import InvalidCursorError
+from app.models.student import Student
+from app.api.dependencies import get_db, get_read_db
 
 router = APIRouter(prefix="/students", tags=["students"])
 
@@ -13,6 +15,11 @@ async def get_db_service(db: AsyncSession = Depends(get_db)) -> DatabaseService:
     return DatabaseService(db)
 
 
+async def get_read_db_service(db: AsyncSession = Depends(get_read_db)) -> DatabaseService:
+    """Get database service instance for read-only queries (replica when configured)."""
+    return DatabaseService(db)
+
+
 @router.post("/", response_model=StudentResponse, status_code=status.HTTP_201_CREATED)
 async def create_student(
     student_data: StudentCreate,
@@ -36,25 +43,30 @@ async def create_student(
 async def list_students(
     skip: int = Query(0, ge=0, description="Number of records to skip"),
     limit: int = Query(100, ge=1, le=100, description="Number of records to return"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from a previous page's next_cursor"),
+    with_total: bool = Query(False, description="Include the total number of matching records"),
     class_name: Optional[str] = Query(None, description="Filter by class name"),
-    db_service: DatabaseService = Depends(get_db_service)
+    include: List[Literal["with_user"]] = Query([], description="Related objects to embed"),
+    db_service: DatabaseService = Depends(get_read_db_service)
 ):
-    """List students with optional filtering by class and pagination."""
+    """List students with optional filtering by class and cursor pagination."""
     try:
-        if class_name:
-            students = await db_service.get_students_by_class(class_name)
-            total = len(students)
-            students = students[skip:skip + limit]
-        else:
-            students = await db_service.get_students(skip=skip, limit=limit)
-            all_students = await db_service.get_students()
-            total = len(all_students)
+        students = await db_service.get_students(
+            skip=skip, limit=limit, cursor=cursor, class_name=class_name, load=include
+        )
+        total = await db_service.count_students(class_name=class_name) if with_total else None
         
         return StudentListResponse(
             students=students,
             total=total,
             page=skip // limit + 1,
-            per_page=limit
+            per_page=limit,
+            next_cursor=db_service.page_cursor(Student, students, limit)
+        )
+    except InvalidCursorError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
         )
     except Exception as e:
         raise HTTPException(
@@ -1,8 +1,11 @@
 from fastapi import APIRouter, HTTPException, Depends, status, Query
+from typing import List, Literal, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.schemas.teacher import TeacherCreate, TeacherUpdate, TeacherResponse, TeacherListResponse
 from app.services.database_service import DatabaseService
-from app.api.dependencies import get_db
+from app.core.pagination import InvalidCursorError
+from app.models.teacher import Teacher
+from app.api.dependencies import get_db, get_read_db
 
 router = APIRouter(prefix="/teachers", tags=["teachers"])
 
@@ -12,6 +15,11 @@ async def get_db_service(db: AsyncSession = Depends(get_db)) -> DatabaseService:
     return DatabaseService(db)
 
 
+async def get_read_db_service(db: AsyncSession = Depends(get_read_db)) -> DatabaseService:
+    """Get database service instance for read-only queries (replica when configured)."""
+    return DatabaseService(db)
+
+
 @router.post("/", response_model=TeacherResponse, status_code=status.HTTP_201_CREATED)
 async def create_teacher(
     teacher_data: TeacherCreate,
@@ -35,19 +43,27 @@ async def create_teacher(
 async def list_teachers(
     skip: int = Query(0, ge=0, description="Number of records to skip"),
     limit: int = Query(100, ge=1, le=100, description="Number of records to return"),
-    db_service: DatabaseService = Depends(get_db_service)
+    cursor: Optional[str] = Query(None, description="Opaque cursor from a previous page's next_cursor"),
+    with_total: bool = Query(False, description="Include the total number of matching records"),
+    include: List[Literal["with_user"]] = Query([], description="Related objects to embed"),
+    db_service: DatabaseService = Depends(get_read_db_service)
 ):
-    """List teachers with pagination."""
+    """List teachers with cursor pagination."""
     try:
-        teachers = await db_service.get_teachers(skip=skip, limit=limit)
-        all_teachers = await db_service.get_teachers()
-        total = len(all_teachers)
+        teachers = await db_service.get_teachers(skip=skip, limit=limit, cursor=cursor, load=include)
+        total = await db_service.count_teachers() if with_total else None
         
         return TeacherListResponse(
             teachers=teachers,
             total=total,
             page=skip // limit + 1,
-            per_page=limit
+            per_page=limit,
+            next_cursor=db_service.page_cursor(Teacher, teachers, limit)
+        )
+    except InvalidCursorError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
         )
     except Exception as e:
         raise HTTPException(
@@ -1,9 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List
+from typing import List, Optional
 
 from app.services.database_service import DatabaseService
+from app.core.pagination import InvalidCursorError
+from app.models.user import User
 from app.core.database import get_db
+from app.api.dependencies import get_read_db
 from app.schemas.user import UserResponse, UserCreate, UserListResponse
 
 router = APIRouter(prefix="/users", tags=["users"])
@@ -20,17 +23,23 @@ async def create_user(user: UserCreate, db: AsyncSession = Depends(get_db)):
     return created_user
 
 @router.get("", response_model=UserListResponse)
-async def list_users(skip: int = 0, limit: int = 100, db: AsyncSession = Depends(get_db)):
+async def list_users(skip: int = 0, limit: int = 100, cursor: Optional[str] = None,
+                     with_total: bool = False, db: AsyncSession = Depends(get_read_db)):
     """
-    Retrieve users.
+    Retrieve users ordered by id, using `cursor` from the previous page to continue.
     """
     db_service = DatabaseService(db)
-    users = await db_service.get_users(skip=skip, limit=limit)
+    try:
+        users = await db_service.get_users(skip=skip, limit=limit, cursor=cursor)
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    total = await db_service.count_users() if with_total else None
     return UserListResponse(
         users=users,
-        total=len(users),
+        total=total,
         page=skip // limit + 1 if limit > 0 else 1,
-        per_page=limit
+        per_page=limit,
+        next_cursor=db_service.page_cursor(User, users, limit)
     )
 
 @router.get("/{user_id}", response_model=UserResponse)
@@ -2,16 +2,52 @@ import sqlalchemy.ext.asyncio as sa_asyncio
 from sqlalchemy.orm import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
+from app.core.pool_metrics import InstrumentedAsyncQueuePool, instrument_engine
 
 # Base model
 Base = declarative_base()
 
+
+def engine_options(url: str) -> dict:
+    """
+    Engine keyword arguments built from the pool settings.
+    """
+    options = {"echo": settings.DB_ECHO, "pool_pre_ping": settings.DB_POOL_PRE_PING}
+    if not url.startswith("sqlite"):
+        options.update(
+            poolclass=InstrumentedAsyncQueuePool,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+        )
+    return options
+
+
 # Async engine setup
-engine = sa_asyncio.create_async_engine(settings.DATABASE_URL, echo=True)
+engine = sa_asyncio.create_async_engine(settings.DATABASE_URL, **engine_options(settings.DATABASE_URL))
+
+# Pool metrics per engine, exposed at /api/metrics/db-pool
+pool_metrics = {"primary": instrument_engine(engine, "primary")}
 
 # Async session setup
 AsyncSession = sessionmaker(engine, class_=sa_asyncio.AsyncSession, expire_on_commit=False)
 
+# Optional read replica; None means reads go to the primary
+read_engine = (
+    sa_asyncio.create_async_engine(settings.DATABASE_READ_URL, **engine_options(settings.DATABASE_READ_URL))
+    if settings.DATABASE_READ_URL else None
+)
+if read_engine is not None:
+    pool_metrics["replica"] = instrument_engine(read_engine, "replica")
+ReadSession = (
+    sessionmaker(read_engine, class_=sa_asyncio.AsyncSession, expire_on_commit=False)
+    if read_engine is not None else None
+)
+
+# Cookie holding the time until which a client's reads are pinned to the primary
+PRIMARY_PIN_COOKIE = "db_primary_until"
+
 async def get_db():
     """
     Dependency function that provides a database session.
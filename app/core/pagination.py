@@ -0,0 +1,86 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, Optional, Sequence
+
+from sqlalchemy import DateTime, tuple_
+
+
+class InvalidCursorError(ValueError):
+    """Raised when a pagination cursor cannot be decoded."""
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """
+    Encode the keyset values of the last row on a page into an opaque cursor.
+    """
+    payload = json.dumps(
+        [v.isoformat() if isinstance(v, datetime) else v for v in values],
+        separators=(",", ":"),
+    )
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, columns: Sequence) -> List[Any]:
+    """
+    Decode a cursor produced by encode_cursor for the given order columns.
+    Raises InvalidCursorError if the cursor is malformed.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+    except Exception as e:
+        raise InvalidCursorError(f"Invalid cursor: {cursor}") from e
+
+    if not isinstance(values, list) or len(values) != len(columns):
+        raise InvalidCursorError(f"Invalid cursor: {cursor}")
+
+    decoded = []
+    for column, value in zip(columns, values):
+        try:
+            decoded.append(_coerce_value(column, value))
+        except (TypeError, ValueError) as e:
+            raise InvalidCursorError(f"Invalid cursor: {cursor}") from e
+    return decoded
+
+
+def _coerce_value(column, value: Any) -> Any:
+    """
+    Check a decoded cursor value against its column type, parsing datetimes.
+    Raises TypeError or ValueError when the value cannot belong to the column.
+    """
+    if value is None:
+        if getattr(column, "nullable", True) is False:
+            raise ValueError(f"{column.key} cannot be null")
+        return None
+    if isinstance(column.type, DateTime):
+        return datetime.fromisoformat(value)
+    try:
+        expected = column.type.python_type
+    except NotImplementedError:
+        return value
+    if isinstance(value, bool) and expected is not bool:
+        raise TypeError(f"{column.key} expects {expected.__name__}")
+    if expected is float and isinstance(value, int):
+        return value
+    if not isinstance(value, expected):
+        raise TypeError(f"{column.key} expects {expected.__name__}")
+    return value
+
+
+def keyset_after(columns: Sequence, cursor: str):
+    """
+    Build a WHERE clause selecting rows strictly after the cursor position.
+    """
+    values = decode_cursor(cursor, columns)
+    return tuple_(*columns) > tuple_(*values)
+
+
+def next_cursor(items: Sequence, limit: int, attrs: Sequence[str]) -> Optional[str]:
+    """
+    Return the cursor for the page following `items`, or None on the last page.
+    """
+    if not items or len(items) < limit:
+        return None
+    last = items[-1]
+    return encode_cursor([getattr(last, attr) for attr in attrs])
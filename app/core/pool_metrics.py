@@ -0,0 +1,105 @@
+import time
+from typing import Dict, Optional
+
+from sqlalchemy import event, exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+
+class PoolMetrics:
+    """Counters describing how an engine's connection pool is being used."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.checkouts = 0
+        self.checkout_timeouts = 0
+        self.checkout_seconds_total = 0.0
+        self.checkout_seconds_max = 0.0
+        self.checked_out = 0
+        self.peak_checked_out = 0
+        self.connections_opened = 0
+        self.invalidations = 0
+
+    def record_checkout_wait(self, seconds: float):
+        self.checkouts += 1
+        self.checkout_seconds_total += seconds
+        self.checkout_seconds_max = max(self.checkout_seconds_max, seconds)
+
+    def snapshot(self, pool=None) -> Dict:
+        """
+        Return the counters as a dict, plus live sizing figures when the pool is given.
+        """
+        data = {
+            "checkouts": self.checkouts,
+            "checkout_timeouts": self.checkout_timeouts,
+            "checkout_latency_avg_ms": round(1000 * self.checkout_seconds_total / self.checkouts, 3)
+            if self.checkouts else None,
+            "checkout_latency_max_ms": round(1000 * self.checkout_seconds_max, 3),
+            "connections_in_use": self.checked_out,
+            "peak_connections_in_use": self.peak_checked_out,
+            "connections_opened": self.connections_opened,
+            "invalidations": self.invalidations,
+        }
+        if isinstance(pool, AsyncAdaptedQueuePool):
+            data.update({
+                "pool_size": pool.size(),
+                "max_overflow": pool._max_overflow,
+                "overflow_in_use": max(pool.overflow(), 0),
+                "idle_connections": pool.checkedin(),
+            })
+        return data
+
+
+class InstrumentedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """
+    Queue pool that times how long callers wait for a connection and counts
+    checkout timeouts. Everything else is tracked with pool events.
+    """
+
+    metrics: Optional[PoolMetrics] = None
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            if self.metrics is not None:
+                self.metrics.checkout_timeouts += 1
+            raise
+        if self.metrics is not None:
+            self.metrics.record_checkout_wait(time.perf_counter() - started)
+        return connection
+
+    def recreate(self):
+        # engine.dispose() swaps in a fresh pool; keep counting into the same metrics
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+def instrument_engine(async_engine, name: str) -> PoolMetrics:
+    """
+    Attach pool event listeners to an async engine and return its metrics.
+    """
+    metrics = PoolMetrics(name)
+    sync_engine = async_engine.sync_engine
+    if isinstance(sync_engine.pool, InstrumentedAsyncQueuePool):
+        sync_engine.pool.metrics = metrics
+
+    @event.listens_for(sync_engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        metrics.connections_opened += 1
+
+    @event.listens_for(sync_engine, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        metrics.checked_out += 1
+        metrics.peak_checked_out = max(metrics.peak_checked_out, metrics.checked_out)
+
+    @event.listens_for(sync_engine, "checkin")
+    def on_checkin(dbapi_connection, connection_record):
+        metrics.checked_out = max(metrics.checked_out - 1, 0)
+
+    @event.listens_for(sync_engine, "invalidate")
+    def on_invalidate(dbapi_connection, connection_record, exception):
+        metrics.invalidations += 1
+
+    return metrics
@@ -0,0 +1,70 @@
+from datetime import date, datetime
+from typing import List, NamedTuple, Optional, Tuple, Union
+
+from app.core.config import settings
+
+
+class Term(NamedTuple):
+    """An academic term: the half-open date range [start, end)."""
+    start: date
+    end: date
+
+    @property
+    def label(self) -> str:
+        return f"{self.start:%Y_%m}"
+
+    def contains(self, day: Union[date, datetime]) -> bool:
+        if isinstance(day, datetime):
+            day = day.date()
+        return self.start <= day < self.end
+
+
+def term_start_days(spec: Optional[str] = None) -> List[Tuple[int, int]]:
+    """
+    Parse a comma-separated list of MM-DD term start days (defaults to
+    settings.ACADEMIC_TERM_STARTS) into sorted (month, day) pairs.
+    """
+    spec = spec or settings.ACADEMIC_TERM_STARTS
+    starts = []
+    for item in spec.split(","):
+        month, day = (int(part) for part in item.strip().split("-"))
+        date(2000, month, day)  # validates the pair
+        starts.append((month, day))
+    if not starts:
+        raise ValueError("At least one term start day is required")
+    return sorted(set(starts))
+
+
+def term_for(day: Union[date, datetime], spec: Optional[str] = None) -> Term:
+    """Return the term containing `day`."""
+    if isinstance(day, datetime):
+        day = day.date()
+    starts = term_start_days(spec)
+    candidates = [
+        date(year, month, dom)
+        for year in (day.year - 1, day.year, day.year + 1)
+        for month, dom in starts
+    ]
+    index = max(i for i, start in enumerate(candidates) if start <= day)
+    return Term(candidates[index], candidates[index + 1])
+
+
+def terms_between(first: Union[date, datetime], last: Union[date, datetime], spec: Optional[str] = None) -> List[Term]:
+    """Return the consecutive terms covering `first` through `last` inclusive."""
+    if isinstance(last, datetime):
+        last = last.date()
+    term = term_for(first, spec)
+    terms = [term]
+    while term.end <= last:
+        term = term_for(term.end, spec)
+        terms.append(term)
+    return terms
+
+
+def following_terms(term: Term, count: int, spec: Optional[str] = None) -> List[Term]:
+    """Return the `count` terms after `term`."""
+    terms = []
+    for _ in range(count):
+        term = term_for(term.end, spec)
+        terms.append(term)
+    return terms
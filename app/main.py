@@ -1,13 +1,14 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 import asyncio
 import logging
+import time
+from app.core import database
 from app.core.config import settings
 from app.services.scheduler import SchedulerService
 from app.integrations.mojo_client import MojoClient
-from app.core.database import engine, Base
-from app.api.endpoints import users, students, teachers, grades, attendance, homework, lessons, analytics
+from app.api.endpoints import users, students, teachers, grades, attendance, homework, lessons, analytics, export, metrics, search
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -21,9 +22,7 @@ async def lifespan(app: FastAPI):
     # Startup
     logger.info("Starting AI Mojo Assistant...")
     
-    # Create database tables
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    # Schema is managed by Alembic (database/migrations); run `alembic upgrade head` before starting
     
     mojo_client = MojoClient(
         base_url=settings.MOJO_BASE_URL,
@@ -62,6 +61,28 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+@app.middleware("http")
+async def pin_reads_to_primary_after_writes(request: Request, call_next):
+    """
+    After a successful write, keep the client's reads on the primary for a short
+    window so it sees its own writes despite replica lag.
+    """
+    response = await call_next(request)
+    if (
+        database.ReadSession is not None
+        and request.method not in ("GET", "HEAD", "OPTIONS")
+        and response.status_code < 400
+    ):
+        window = settings.READ_AFTER_WRITE_PIN_SECONDS
+        response.set_cookie(
+            database.PRIMARY_PIN_COOKIE,
+            str(time.time() + window),
+            max_age=window,
+            httponly=True,
+        )
+    return response
+
 # Include API routers
 app.include_router(users.router, prefix="/api")
 app.include_router(students.router, prefix="/api")
@@ -71,6 +92,9 @@ app.include_router(attendance.router, prefix="/api")
 app.include_router(homework.router, prefix="/api")
 app.include_router(lessons.router, prefix="/api")
 app.include_router(analytics.router, prefix="/api")
+app.include_router(export.router, prefix="/api")
+app.include_router(metrics.router, prefix="/api")
+app.include_router(search.router, prefix="/api")
 
 @app.get("/")
 async def root():
@@ -6,6 +6,13 @@ from app.models.grade import Grade
 from app.models.lesson import Lesson
 from app.models.attendance import Attendance
 from app.models.homework import Homework
+from app.models.homework_submission import HomeworkSubmission
+from app.models.rollup import (
+    StudentSubjectDaily, StudentAttendanceDaily, StudentSubjectTrend, StudentSubjectTrendBase, StudentDataVersion,
+    ClassSubjectSketch, StudentRisk
+)
+from app.models.archive import ArchivedTerm
+from app.models import search  # noqa: F401  (text search index DDL)
 
 __all__ = [
     "Base",
@@ -17,4 +24,13 @@ __all__ = [
     "Lesson",
     "Attendance",
     "Homework",
+    "HomeworkSubmission",
+    "StudentSubjectDaily",
+    "StudentAttendanceDaily",
+    "StudentSubjectTrend",
+    "StudentSubjectTrendBase",
+    "StudentDataVersion",
+    "ClassSubjectSketch",
+    "StudentRisk",
+    "ArchivedTerm",
 ]
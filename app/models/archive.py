@@ -0,0 +1,15 @@
+from sqlalchemy import Column, Date, DateTime, String
+from app.core.database import Base
+
+
+class ArchivedTerm(Base):
+    """
+    A term partition exported and detached by scripts/data/archive_terms.py. Its rows are
+    gone from the live table; only the daily rollups (and derived state) still cover it.
+    """
+    __tablename__ = "archived_terms"
+
+    table_name = Column(String, primary_key=True)  # grades or attendance
+    term_start = Column(Date, primary_key=True)
+    term_end = Column(Date, nullable=False)
+    archived_at = Column(DateTime, nullable=False)
@@ -1,9 +1,14 @@
-from sqlalchemy import Column, Integer, ForeignKey, DateTime, Boolean
+from sqlalchemy import Column, Integer, ForeignKey, DateTime, Boolean, UniqueConstraint, Index
 from sqlalchemy.orm import relationship
 from app.core.database import Base
 
 class Attendance(Base):
     __tablename__ = 'attendance'
+    __table_args__ = (
+        # Includes the partition key (date) because attendance is partitioned by term on Postgres
+        UniqueConstraint('student_id', 'lesson_id', 'date', name='uq_attendance_student_lesson'),
+        Index('ix_attendance_student_date', 'student_id', 'date'),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     student_id = Column(Integer, ForeignKey('users.id'), nullable=False)
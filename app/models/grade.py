@@ -1,15 +1,22 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Float, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from app.core.database import Base
 
 class Grade(Base):
     __tablename__ = "grades"
+    __table_args__ = (
+        # Natural key of a synced grade; includes the partition key (date) for Postgres
+        UniqueConstraint("student_id", "subject", "date", "teacher_id", name="uq_grades_natural_key"),
+        Index("ix_grades_student_date", "student_id", "date"),
+        Index("ix_grades_student_subject_date", "student_id", "subject", "date"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     student_id = Column(Integer, ForeignKey("students.id"), nullable=False)
     teacher_id = Column(Integer, ForeignKey("teachers.id"), nullable=False)
     subject = Column(String, nullable=False)
     grade = Column(String, nullable=False)  # e.g., "5", "4+", etc.
+    score = Column(Float, nullable=True)  # numeric value of `grade`, see app.services.grading
     date = Column(DateTime, nullable=False)
     lesson_topic = Column(String, nullable=True)
 
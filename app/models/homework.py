@@ -8,7 +8,7 @@ class Homework(Base):
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, nullable=False)
     description = Column(Text)
-    due_date = Column(DateTime, nullable=False)
+    due_date = Column(DateTime, nullable=False, index=True)
     lesson_id = Column(Integer, ForeignKey('lessons.id'), nullable=False)
     teacher_id = Column(Integer, ForeignKey('users.id'), nullable=False)
 
@@ -1,9 +1,12 @@
-from sqlalchemy import Column, Integer, ForeignKey, DateTime, Text, Boolean
+from sqlalchemy import Column, Integer, ForeignKey, DateTime, Text, Boolean, Index
 from sqlalchemy.orm import relationship
 from app.core.database import Base
 
 class HomeworkSubmission(Base):
     __tablename__ = 'homework_submissions'
+    __table_args__ = (
+        Index('ix_homework_submissions_student_homework', 'student_id', 'homework_id'),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     homework_id = Column(Integer, ForeignKey('homework.id'), nullable=False)
@@ -1,9 +1,12 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from app.core.database import Base
 
 class Lesson(Base):
     __tablename__ = 'lessons'
+    __table_args__ = (
+        Index('ix_lessons_class_date', 'class_name', 'date'),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     subject = Column(String, nullable=False)
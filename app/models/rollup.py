@@ -0,0 +1,102 @@
+from sqlalchemy import Column, Integer, String, Date, DateTime, Float, JSON, Index
+from app.core.database import Base
+
+
+class StudentSubjectDaily(Base):
+    """Per-day grade aggregates for a student in a subject, maintained by DatabaseService."""
+    __tablename__ = "student_subject_daily"
+
+    student_id = Column(Integer, primary_key=True)  # students.id, as in grades
+    subject = Column(String, primary_key=True)
+    day = Column(Date, primary_key=True)
+    grade_count = Column(Integer, nullable=False, default=0)
+    score_count = Column(Integer, nullable=False, default=0)  # grades with a numeric score
+    score_sum = Column(Float, nullable=False, default=0)
+    score_min = Column(Float, nullable=True)
+    score_max = Column(Float, nullable=True)
+
+
+class StudentAttendanceDaily(Base):
+    """Per-day attendance counts for a student, maintained by DatabaseService."""
+    __tablename__ = "student_attendance_daily"
+
+    student_id = Column(Integer, primary_key=True)  # users.id, as in attendance
+    day = Column(Date, primary_key=True)
+    present_count = Column(Integer, nullable=False, default=0)
+    absent_count = Column(Integer, nullable=False, default=0)
+
+
+class StudentSubjectTrend(Base):
+    """Online all-time grade statistics for a student in a subject (see app.services.trend_state)."""
+    __tablename__ = "student_subject_trend"
+
+    student_id = Column(Integer, primary_key=True)  # students.id, as in grades
+    subject = Column(String, primary_key=True)
+    score_count = Column(Integer, nullable=False, default=0)
+    mean = Column(Float, nullable=False, default=0)  # Welford running mean
+    m2 = Column(Float, nullable=False, default=0)  # Welford sum of squared deviations
+    ewma = Column(Float, nullable=True)
+    recent = Column(JSON, nullable=False)  # last RECENT_SCORES scores, oldest first
+    last_date = Column(DateTime, nullable=True)  # (date, id) of the latest folded grade
+    last_grade_id = Column(Integer, nullable=True)
+
+
+class StudentSubjectTrendBase(Base):
+    """
+    Trend state (as in student_subject_trend) of a pair's archived grades only. Written when a
+    term is archived; rebuilds of the pair's trend state start from it instead of from empty.
+    """
+    __tablename__ = "student_subject_trend_base"
+
+    student_id = Column(Integer, primary_key=True)
+    subject = Column(String, primary_key=True)
+    score_count = Column(Integer, nullable=False, default=0)
+    mean = Column(Float, nullable=False, default=0)
+    m2 = Column(Float, nullable=False, default=0)
+    ewma = Column(Float, nullable=True)
+    recent = Column(JSON, nullable=False)
+    last_date = Column(DateTime, nullable=True)
+    last_grade_id = Column(Integer, nullable=True)
+
+
+class StudentDataVersion(Base):
+    """Per-student counter bumped by DatabaseService on every grade and attendance write."""
+    __tablename__ = "student_data_version"
+
+    # The student_id written to grades (students.id) or attendance (users.id); both bump the same row
+    student_id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+
+class ClassSubjectSketch(Base):
+    """
+    Score sketch (see app.services.sketch) of the students' term averages in a class and
+    subject: how many students' averages fall in each bin. Maintained by DatabaseService.
+    """
+    __tablename__ = "class_subject_sketch"
+
+    class_name = Column(String, primary_key=True)
+    subject = Column(String, primary_key=True)
+    term_start = Column(Date, primary_key=True)
+    bin = Column(Integer, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+
+class StudentRisk(Base):
+    """Early-warning risk scores from the nightly job (see app.services.risk), one row per student."""
+    __tablename__ = "student_risk"
+    __table_args__ = (
+        Index("ix_student_risk_rank", "rank"),
+    )
+
+    student_id = Column(Integer, primary_key=True)  # students.id
+    user_id = Column(Integer, nullable=False)  # as in attendance and alerts
+    class_name = Column(String, nullable=False)
+    rank = Column(Integer, nullable=False)  # 1 = highest risk in the school
+    score = Column(Float, nullable=False)
+    grade_slope = Column(Float, nullable=True)
+    attendance_rate = Column(Float, nullable=True)
+    attendance_drop = Column(Float, nullable=True)
+    overdue_count = Column(Integer, nullable=False)
+    missing_grade_streak = Column(Integer, nullable=False)
+    computed_at = Column(DateTime, nullable=False)
@@ -0,0 +1,104 @@
+"""
+Text search indexes over lesson topics, homework text and grade lesson topics.
+
+Postgres: GIN indexes on to_tsvector('simple', <text>) per table (migration 0007);
+queries must use the same expressions to hit them.
+SQLite: one FTS5 table, `search_index`, kept current by triggers. Its rowid
+encodes the source row as id * len(SEARCH_KINDS) + kind position.
+"""
+from typing import Dict, List, NamedTuple
+
+from sqlalchemy import DDL, event
+
+from app.core.database import Base
+
+
+class SearchSource(NamedTuple):
+    table: str
+    text: str  # SQL expression of the indexed text; {row} is replaced by a row alias prefix
+    columns: str  # columns `text` is built from
+    index: str  # name of the Postgres GIN index
+
+
+SEARCH_SOURCES: Dict[str, SearchSource] = {
+    "lesson": SearchSource("lessons", "{row}topic", "topic", "ix_lessons_topic_search"),
+    "homework": SearchSource(
+        "homework", "{row}title || ' ' || coalesce({row}description, '')", "title, description",
+        "ix_homework_text_search"
+    ),
+    "grade": SearchSource(
+        "grades", "coalesce({row}lesson_topic, '')", "lesson_topic", "ix_grades_lesson_topic_search"
+    ),
+}
+SEARCH_KINDS = tuple(SEARCH_SOURCES)  # order is part of the SQLite rowid encoding
+
+SEARCH_INDEX_TABLE = "search_index"
+TEXT_SEARCH_CONFIG = "simple"  # no stemming or stop words: topics are short and multilingual
+
+
+def search_text(kind: str, row: str = "") -> str:
+    return SEARCH_SOURCES[kind].text.format(row=row)
+
+
+def search_vector(kind: str, row: str = "") -> str:
+    """The to_tsvector expression indexed on Postgres."""
+    return f"to_tsvector('{TEXT_SEARCH_CONFIG}', {search_text(kind, row)})"
+
+
+def postgres_search_index_sql() -> List[str]:
+    return [
+        f"CREATE INDEX {source.index} ON {source.table} USING gin ({search_vector(kind)})"
+        for kind, source in SEARCH_SOURCES.items()
+    ]
+
+
+def sqlite_search_index_sql(populate: bool = False) -> List[str]:
+    """FTS5 table and sync triggers; with `populate`, also index the existing rows."""
+    slots = len(SEARCH_KINDS)
+    statements = [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_INDEX_TABLE} "
+        f"USING fts5(text, tokenize = 'unicode61 remove_diacritics 2')"
+    ]
+    for position, (kind, source) in enumerate(SEARCH_SOURCES.items()):
+        rowid = f"{{row}}id * {slots} + {position}"
+        insert = (
+            f"INSERT INTO {SEARCH_INDEX_TABLE} (rowid, text) "
+            f"VALUES ({rowid.format(row='new.')}, {search_text(kind, 'new.')})"
+        )
+        delete = f"DELETE FROM {SEARCH_INDEX_TABLE} WHERE rowid = {rowid.format(row='old.')}"
+        prefix = f"{SEARCH_INDEX_TABLE}_{source.table}"
+        statements += [
+            f"CREATE TRIGGER IF NOT EXISTS {prefix}_ai AFTER INSERT ON {source.table} BEGIN {insert}; END",
+            f"CREATE TRIGGER IF NOT EXISTS {prefix}_au AFTER UPDATE OF {source.columns} ON {source.table} "
+            f"BEGIN {delete}; {insert}; END",
+            f"CREATE TRIGGER IF NOT EXISTS {prefix}_ad AFTER DELETE ON {source.table} BEGIN {delete}; END",
+        ]
+        if populate:
+            statements.append(
+                f"INSERT INTO {SEARCH_INDEX_TABLE} (rowid, text) "
+                f"SELECT {rowid.format(row='')}, {search_text(kind)} FROM {source.table}"
+            )
+    return statements
+
+
+def is_search_index_object(name: str) -> bool:
+    """True for the indexes and FTS5 tables above, which are managed outside the models."""
+    return (
+        name == SEARCH_INDEX_TABLE
+        or name.startswith(f"{SEARCH_INDEX_TABLE}_")
+        or name in {source.index for source in SEARCH_SOURCES.values()}
+    )
+
+
+def include_name(name, type_, parent_names) -> bool:
+    """Alembic autogenerate filter that ignores the search index objects."""
+    return name is None or not is_search_index_object(name)
+
+
+# Tables created with Base.metadata.create_all (tests, local dev) get the SQLite index too
+for _statement in sqlite_search_index_sql():
+    event.listen(Base.metadata, "after_create", DDL(_statement).execute_if(dialect="sqlite"))
+event.listen(
+    Base.metadata, "before_drop",
+    DDL(f"DROP TABLE IF EXISTS {SEARCH_INDEX_TABLE}").execute_if(dialect="sqlite")
+)
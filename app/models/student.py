@@ -7,7 +7,7 @@ class Student(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    class_name = Column(String, nullable=False)  # e.g., "5A"
+    class_name = Column(String, nullable=False, index=True)  # e.g., "5A"
 
     user = relationship("User", back_populates="student_profile")
 
@@ -1,17 +1,19 @@
-from .user import UserBase, UserCreate, UserUpdate, UserResponse, UserListResponse, RoleEnum
-from .student import StudentBase, StudentCreate, StudentUpdate, StudentResponse, StudentListResponse
-from .teacher import TeacherBase, TeacherCreate, TeacherUpdate, TeacherResponse, TeacherListResponse
-from .grade import GradeBase, GradeCreate, GradeUpdate, GradeResponse, GradeListResponse
-from .attendance import AttendanceBase, AttendanceCreate, AttendanceUpdate, AttendanceResponse, AttendanceListResponse
+from .user import UserBase, UserCreate, UserUpdate, UserResponse, UserListResponse, UserSummary, RoleEnum
+from .student import StudentBase, StudentCreate, StudentUpdate, StudentResponse, StudentListResponse, StudentSummary
+from .teacher import TeacherBase, TeacherCreate, TeacherUpdate, TeacherResponse, TeacherListResponse, TeacherSummary
+from .grade import GradeBase, GradeCreate, GradeUpdate, GradeResponse, GradeListResponse, GradeBulkCreate, GradeBulkResponse, GradeUpsertResponse, BulkItemError
+from .attendance import AttendanceBase, AttendanceCreate, AttendanceUpdate, AttendanceResponse, AttendanceListResponse, LessonAttendanceMark, LessonAttendanceResponse, AttendanceUpsert, AttendanceBulkUpsert, AttendanceUpsertResponse
 from .homework import HomeworkBase, HomeworkCreate, HomeworkUpdate, HomeworkResponse, HomeworkListResponse
-from .lesson import LessonBase, LessonCreate, LessonUpdate, LessonResponse, LessonListResponse
+from .lesson import LessonBase, LessonCreate, LessonUpdate, LessonResponse, LessonListResponse, LessonSummary
+from .search import SearchHit, SearchResponse
 
 __all__ = [
-    "UserBase", "UserCreate", "UserUpdate", "UserResponse", "UserListResponse", "RoleEnum",
-    "StudentBase", "StudentCreate", "StudentUpdate", "StudentResponse", "StudentListResponse",
-    "TeacherBase", "TeacherCreate", "TeacherUpdate", "TeacherResponse", "TeacherListResponse",
-    "GradeBase", "GradeCreate", "GradeUpdate", "GradeResponse", "GradeListResponse",
-    "AttendanceBase", "AttendanceCreate", "AttendanceUpdate", "AttendanceResponse", "AttendanceListResponse",
+    "UserBase", "UserCreate", "UserUpdate", "UserResponse", "UserListResponse", "UserSummary", "RoleEnum",
+    "StudentBase", "StudentCreate", "StudentUpdate", "StudentResponse", "StudentListResponse", "StudentSummary",
+    "TeacherBase", "TeacherCreate", "TeacherUpdate", "TeacherResponse", "TeacherListResponse", "TeacherSummary",
+    "GradeBase", "GradeCreate", "GradeUpdate", "GradeResponse", "GradeListResponse", "GradeBulkCreate", "GradeBulkResponse", "GradeUpsertResponse", "BulkItemError",
+    "AttendanceBase", "AttendanceCreate", "AttendanceUpdate", "AttendanceResponse", "AttendanceListResponse", "LessonAttendanceMark", "LessonAttendanceResponse", "AttendanceUpsert", "AttendanceBulkUpsert", "AttendanceUpsertResponse",
     "HomeworkBase", "HomeworkCreate", "HomeworkUpdate", "HomeworkResponse", "HomeworkListResponse",
-    "LessonBase", "LessonCreate", "LessonUpdate", "LessonResponse", "LessonListResponse",
+    "LessonBase", "LessonCreate", "LessonUpdate", "LessonResponse", "LessonListResponse", "LessonSummary",
+    "SearchHit", "SearchResponse",
 ]
@@ -1,6 +1,10 @@
-from pydantic import BaseModel, Field, ConfigDict
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import Optional, Dict, List
 from datetime import datetime
+from .base import ORMResponse
+from .user import UserSummary
+from .lesson import LessonSummary
+from .grade import BulkItemError
 
 
 class AttendanceBase(BaseModel):
@@ -11,22 +15,48 @@ class AttendanceBase(BaseModel):
 
 
 class AttendanceCreate(AttendanceBase):
-    pass
+    date: Optional[datetime] = None  # ignored: attendance is always dated at the lesson
 
 
 class AttendanceUpdate(BaseModel):
     present: Optional[bool] = None
 
 
-class AttendanceResponse(AttendanceBase):
+class AttendanceResponse(AttendanceBase, ORMResponse):
     id: int
+    student: Optional[UserSummary] = None  # with include=with_student
+    lesson: Optional[LessonSummary] = None  # with include=with_lesson
 
-    model_config = ConfigDict(from_attributes=True)
-        
+
+class LessonAttendanceMark(BaseModel):
+    attendance: Dict[int, bool] = Field(..., min_length=1, description="Map of student_id to present")
+
+
+class LessonAttendanceResponse(BaseModel):
+    lesson_id: int
+    attendance_records: list[AttendanceResponse]
+
+
+class AttendanceUpsert(BaseModel):
+    student_id: int
+    lesson_id: int
+    present: bool = True
+
+
+class AttendanceBulkUpsert(BaseModel):
+    records: List[AttendanceUpsert] = Field(..., min_length=1, max_length=5000)
+
+
+class AttendanceUpsertResponse(BaseModel):
+    upserted: list[AttendanceResponse]  # inserted or changed; unchanged replays are omitted
+    errors: list[BulkItemError]
+    upserted_count: int
+    error_count: int
 
 
 class AttendanceListResponse(BaseModel):
     attendance_records: list[AttendanceResponse]
-    total: int
+    total: Optional[int] = None
     page: int
     per_page: int
+    next_cursor: Optional[str] = None
@@ -0,0 +1,26 @@
+from pydantic import BaseModel, ConfigDict, model_validator
+from sqlalchemy import inspect
+from sqlalchemy.orm import InstanceState
+
+
+class ORMResponse(BaseModel):
+    """
+    Response built from an ORM object that includes relationships only when they
+    were eager-loaded (see DatabaseService.LOAD_PROFILES); unloaded ones are left
+    at their default instead of triggering a lazy load.
+    """
+
+    model_config = ConfigDict(from_attributes=True)
+
+    @model_validator(mode="before")
+    @classmethod
+    def _skip_unloaded_relationships(cls, data):
+        state = inspect(data, raiseerr=False)
+        if not isinstance(state, InstanceState):
+            return data
+        skipped = state.unloaded & set(state.mapper.relationships.keys())
+        return {
+            name: getattr(data, name)
+            for name in cls.model_fields
+            if name not in skipped and hasattr(data, name)
+        }
@@ -1,6 +1,9 @@
-from pydantic import BaseModel, Field, ConfigDict
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import Optional, List
 from datetime import datetime
+from .base import ORMResponse
+from .student import StudentSummary
+from .teacher import TeacherSummary
 
 
 class GradeBase(BaseModel):
@@ -23,15 +26,39 @@ class GradeUpdate(BaseModel):
     lesson_topic: Optional[str] = Field(None, max_length=255)
 
 
-class GradeResponse(GradeBase):
+class GradeResponse(GradeBase, ORMResponse):
     id: int
+    score: Optional[float] = None
+    student: Optional[StudentSummary] = None  # with include=with_student
+    teacher: Optional[TeacherSummary] = None  # with include=with_teacher
 
-    model_config = ConfigDict(from_attributes=True)
-        
+
+class GradeBulkCreate(BaseModel):
+    grades: List[GradeCreate] = Field(..., min_length=1, max_length=5000)
+
+
+class BulkItemError(BaseModel):
+    index: int
+    detail: str
+
+
+class GradeBulkResponse(BaseModel):
+    created: list[GradeResponse]
+    errors: list[BulkItemError]
+    created_count: int
+    error_count: int
+
+
+class GradeUpsertResponse(BaseModel):
+    upserted: list[GradeResponse]  # inserted or changed; unchanged replays are omitted
+    errors: list[BulkItemError]
+    upserted_count: int
+    error_count: int
 
 
 class GradeListResponse(BaseModel):
     grades: list[GradeResponse]
-    total: int
+    total: Optional[int] = None
     page: int
     per_page: int
+    next_cursor: Optional[str] = None
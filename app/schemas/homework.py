@@ -1,6 +1,9 @@
-from pydantic import BaseModel, Field, ConfigDict
+from pydantic import BaseModel, Field
 from typing import Optional
 from datetime import datetime
+from .base import ORMResponse
+from .user import UserSummary
+from .lesson import LessonSummary
 
 
 class HomeworkBase(BaseModel):
@@ -21,15 +24,15 @@ class HomeworkUpdate(BaseModel):
     due_date: Optional[datetime] = None
 
 
-class HomeworkResponse(HomeworkBase):
+class HomeworkResponse(HomeworkBase, ORMResponse):
     id: int
-
-    model_config = ConfigDict(from_attributes=True)
-        
+    lesson: Optional[LessonSummary] = None  # with include=with_lesson
+    teacher: Optional[UserSummary] = None  # with include=with_teacher
 
 
 class HomeworkListResponse(BaseModel):
     homework: list[HomeworkResponse]
-    total: int
+    total: Optional[int] = None
     page: int
     per_page: int
+    next_cursor: Optional[str] = None
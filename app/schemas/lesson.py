@@ -1,6 +1,8 @@
 from pydantic import BaseModel, Field, ConfigDict
 from typing import Optional
 from datetime import datetime
+from .base import ORMResponse
+from .user import UserSummary
 
 
 class LessonBase(BaseModel):
@@ -22,15 +24,24 @@ class LessonUpdate(BaseModel):
     class_name: Optional[str] = Field(None, min_length=1, max_length=10)
 
 
-class LessonResponse(LessonBase):
+class LessonResponse(LessonBase, ORMResponse):
     id: int
+    teacher: Optional[UserSummary] = None  # with include=with_teacher
+
+
+class LessonSummary(BaseModel):
+    id: int
+    subject: str
+    topic: str
+    class_name: str
+    date: datetime
 
     model_config = ConfigDict(from_attributes=True)
-        
 
 
 class LessonListResponse(BaseModel):
     lessons: list[LessonResponse]
-    total: int
+    total: Optional[int] = None
     page: int
     per_page: int
+    next_cursor: Optional[str] = None
@@ -0,0 +1,19 @@
+from pydantic import BaseModel, ConfigDict
+from typing import Optional, Literal
+from datetime import datetime
+
+
+class SearchHit(BaseModel):
+    kind: Literal["lesson", "homework", "grade"]
+    id: int
+    text: Optional[str] = None  # lesson topic, homework title or grade lesson topic
+    date: datetime  # lesson date, homework due date or grade date
+    rank: float
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class SearchResponse(BaseModel):
+    query: str
+    results: list[SearchHit]
+    next_cursor: Optional[str] = None
@@ -1,5 +1,7 @@
-from pydantic import BaseModel, Field, ConfigDict
+from pydantic import BaseModel, Field
 from typing import Optional
+from .base import ORMResponse
+from .user import UserSummary
 
 
 class StudentBase(BaseModel):
@@ -15,15 +17,20 @@ class StudentUpdate(BaseModel):
     class_name: Optional[str] = Field(None, min_length=1, max_length=10)
 
 
-class StudentResponse(StudentBase):
+class StudentResponse(StudentBase, ORMResponse):
     id: int
+    user: Optional[UserSummary] = None  # with include=with_user
 
-    model_config = ConfigDict(from_attributes=True)
-        
+
+class StudentSummary(ORMResponse):
+    id: int
+    class_name: str
+    user: Optional[UserSummary] = None
 
 
 class StudentListResponse(BaseModel):
     students: list[StudentResponse]
-    total: int
+    total: Optional[int] = None
     page: int
     per_page: int
+    next_cursor: Optional[str] = None
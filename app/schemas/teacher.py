@@ -1,5 +1,7 @@
-from pydantic import BaseModel, Field, ConfigDict
+from pydantic import BaseModel, Field
 from typing import Optional, List
+from .base import ORMResponse
+from .user import UserSummary
 
 
 class TeacherBase(BaseModel):
@@ -15,14 +17,19 @@ class TeacherUpdate(BaseModel):
     subjects: Optional[List[str]] = Field(None, min_length=1)
 
 
-class TeacherResponse(TeacherBase):
+class TeacherResponse(TeacherBase, ORMResponse):
     id: int
+    user: Optional[UserSummary] = None  # with include=with_user
 
-    model_config = ConfigDict(from_attributes=True)
+
+class TeacherSummary(ORMResponse):
+    id: int
+    user: Optional[UserSummary] = None
 
 
 class TeacherListResponse(BaseModel):
     teachers: list[TeacherResponse]
-    total: int
+    total: Optional[int] = None
     page: int
     per_page: int
+    next_cursor: Optional[str] = None
@@ -31,8 +31,16 @@ class UserResponse(UserBase):
     model_config = ConfigDict(from_attributes=True)
 
 
+class UserSummary(BaseModel):
+    id: int
+    name: Optional[str] = None  # users.name is nullable
+
+    model_config = ConfigDict(from_attributes=True)
+
+
 class UserListResponse(BaseModel):
     users: list[UserResponse]
-    total: int
+    total: Optional[int] = None
     page: int
     per_page: int
+    next_cursor: Optional[str] = None
@@ -1,17 +1,78 @@
+import asyncio
+import copy
 import logging
-from typing import List, Dict, Optional
+import time
+from datetime import date, datetime, timedelta
+from typing import Awaitable, Callable, List, Dict, Optional
+import numpy as np
+from app.core.cache import TTLCache
 from app.integrations.mojo_client import MojoClient
 from app.services.llm_service import LLMService
 from app.services.database_service import DatabaseService
+from app.services.cohort import compute_cohort
+from app.services.risk import ATTENDANCE_ALERT_RATE, OVERDUE_ALERT_COUNT
 from sqlalchemy.ext.asyncio import AsyncSession
 
 logger = logging.getLogger(__name__)
 
+# Per-student analysis results keyed by (kind, student_id, days, data_version, day); see _snapshot
+snapshot_cache = TTLCache(maxsize=4096)
+
+
+def _elapsed_ms(started: float) -> float:
+    return round(1000 * (time.perf_counter() - started), 1)
+
+
+async def _timed(timings: Dict[str, float], stage: str, awaitable: Awaitable):
+    """Await `awaitable`, recording its duration in `timings[stage]` (milliseconds)."""
+    started = time.perf_counter()
+    try:
+        return await awaitable
+    finally:
+        timings[stage] = _elapsed_ms(started)
+
+
 class AnalysisService:
-    def __init__(self, mojo_client: MojoClient, session: Optional[AsyncSession] = None):
+    def __init__(
+        self,
+        mojo_client: MojoClient,
+        session: Optional[AsyncSession] = None,
+        session_factory: Optional[Callable[[], AsyncSession]] = None
+    ):
+        """
+        `session_factory` (e.g. a sessionmaker) lets independent analyses run concurrently,
+        each on its own session; without it they share `session` and run one at a time.
+        """
         self.mojo_client = mojo_client
         self.llm_service = LLMService()
         self.db_service = DatabaseService(session)
+        self.session_factory = session_factory
+    
+    def _with_session(self, session: AsyncSession) -> "AnalysisService":
+        """A copy of this service that uses `session` for its database work."""
+        service = copy.copy(self)
+        service.db_service = DatabaseService(session)
+        return service
+    
+    async def _run_analyses(
+        self,
+        timings: Dict[str, float],
+        analyses: Dict[str, Callable[["AnalysisService"], Awaitable[Dict]]]
+    ) -> List[Dict]:
+        """
+        Run independent analyses, timing each under its name. With a session factory they
+        run concurrently, each on a fresh session (one AsyncSession cannot serve concurrent
+        tasks); otherwise one after another on the shared session.
+        """
+        async def run(stage: str, analysis: Callable[["AnalysisService"], Awaitable[Dict]]) -> Dict:
+            if self.session_factory is None:
+                return await _timed(timings, stage, analysis(self))
+            async with self.session_factory() as session:
+                return await _timed(timings, stage, analysis(self._with_session(session)))
+        
+        if self.session_factory is None:
+            return [await run(stage, analysis) for stage, analysis in analyses.items()]
+        return list(await asyncio.gather(*(run(stage, analysis) for stage, analysis in analyses.items())))
     
     async def check_missing_grades(self):
         """Check for teachers with missing grades and send alerts"""
@@ -28,6 +89,8 @@ class AnalysisService:
     async def generate_weekly_reports(self):
         """Generate and send weekly performance reports to parents"""
         students = await self.mojo_client.get_students()
+        # One cohort pass for the whole school instead of a trend query per student and subject
+        trends = await self.analyze_cohort(days=7)
         
         for student in students:
             grades = await self.mojo_client.get_grades(student['id'], days=7)
@@ -36,40 +99,71 @@ class AnalysisService:
                     grades, 
                     student.get('name', 'Student')
                 )
+                report_data["subject_trends"] = trends.get(student['id'], {})
                 await self.mojo_client.send_parent_report(student['id'], report_data)
     
+    async def analyze_cohort(self, days: int = 30, class_name: Optional[str] = None) -> Dict[int, Dict[str, Dict]]:
+        """Grade trends for every student x subject pair (optionally one class): {student_id: {subject: stats}}"""
+        try:
+            return await self.db_service.get_cohort_trends(days, class_name=class_name)
+        except Exception as e:
+            logger.error(f"Error analyzing cohort grades: {e}")
+            return {}
+    
+    async def _snapshot(self, kind: str, student_id: int, days: int, compute: Callable[[], Awaitable[Dict]]) -> Dict:
+        """
+        Result of `compute()`, cached under the student's data version, which every grade
+        and attendance write bumps, so a cached result never misses a write. The version is
+        read before the data. Keys include today's date because analysis windows end now.
+        Error results are not cached.
+        """
+        if self.db_service.session is None:
+            return await compute()
+        try:
+            version = await self.db_service.get_data_version(student_id)
+        except Exception as e:
+            logger.warning(f"Could not read data version of student {student_id}: {e}")
+            return await compute()
+        
+        key = (kind, student_id, days, version, date.today())
+        result = snapshot_cache.get(key)
+        if result is None:
+            result = await compute()
+            if result.get("status") != "error":
+                snapshot_cache.set(key, result)
+        return result
+    
     async def analyze_student_grades(self, student_id: int, days: int = 30) -> Dict:
         """Analyze grade trends for a student across all subjects"""
+        return await self._snapshot("grades", student_id, days, lambda: self._analyze_student_grades(student_id, days))
+    
+    async def _analyze_student_grades(self, student_id: int, days: int) -> Dict:
         try:
-            # Get all grades for the student
-            grades = await self.db_service.get_grades_by_student(student_id, days)
+            # All of the student's grades in one query, every subject summarised by the cohort engine
+            columns = await self.db_service.load_grade_columns(
+                datetime.now() - timedelta(days=days), student_ids=[student_id]
+            )
             
-            if not grades:
+            if not len(columns):
                 return {
                     "student_id": student_id,
                     "status": "no_data",
                     "message": "No grade data available for analysis"
                 }
             
-            # Group by subject and analyze trends
-            subjects = set(g["subject"] for g in grades)
-            grade_trends = {}
-            
-            for subject in subjects:
-                trend_data = await self.db_service.get_grade_trends(student_id, subject, days)
-                grade_trends[subject] = trend_data
+            grade_trends = compute_cohort(columns).by_student().get(student_id, {})
             
             # Calculate overall statistics
-            all_values = [g["value"] for g in grades]
-            average_grade = sum(all_values) / len(all_values) if all_values else 0
+            scores = columns.score[~np.isnan(columns.score)]
+            average_grade = float(scores.mean()) if len(scores) else 0
             
             return {
                 "student_id": student_id,
                 "status": "success",
                 "average_grade": round(average_grade, 2),
                 "grade_trends": grade_trends,
-                "total_grades": len(grades),
-                "subjects_count": len(subjects)
+                "total_grades": len(columns),
+                "subjects_count": len(grade_trends)
             }
         except Exception as e:
             logger.error(f"Error analyzing student grades: {e}")
@@ -81,6 +175,11 @@ class AnalysisService:
     
     async def analyze_student_attendance(self, student_id: int, days: int = 30) -> Dict:
         """Analyze attendance patterns for a student"""
+        return await self._snapshot(
+            "attendance", student_id, days, lambda: self._analyze_student_attendance(student_id, days)
+        )
+    
+    async def _analyze_student_attendance(self, student_id: int, days: int) -> Dict:
         try:
             attendance_stats = await self.db_service.get_attendance_stats(student_id, days)
             
@@ -88,7 +187,7 @@ class AnalysisService:
             attendance_rate = attendance_stats.get("attendance_rate", 0)
             alerts = []
             
-            if attendance_rate < 75:
+            if attendance_rate < ATTENDANCE_ALERT_RATE:
                 alert_data = await self.llm_service.generate_alert(
                     "low_attendance",
                     {"attendance_rate": attendance_rate}
@@ -118,7 +217,7 @@ class AnalysisService:
             alerts = []
             overdue_count = homework_stats.get("overdue_count", 0)
             
-            if overdue_count > 2:
+            if overdue_count > OVERDUE_ALERT_COUNT:
                 alert_data = await self.llm_service.generate_alert(
                     "missing_homework",
                     {"overdue_count": overdue_count}
@@ -140,12 +239,22 @@ class AnalysisService:
             }
     
     async def generate_comprehensive_report(self, student_id: int, days: int = 30) -> Dict:
-        """Generate a comprehensive analytics report with AI insights"""
+        """
+        Generate a comprehensive analytics report with AI insights. The three analyses run
+        concurrently (see _run_analyses), then both LLM calls run concurrently; per-stage
+        and total durations are returned in `timings_ms`.
+        """
         try:
+            started = time.perf_counter()
+            timings: Dict[str, float] = {}
+            
             # Gather all analytics data
-            grades_analysis = await self.analyze_student_grades(student_id, days)
-            attendance_analysis = await self.analyze_student_attendance(student_id, days)
-            homework_analysis = await self.analyze_homework_completion(student_id, days)
+            grades_analysis, attendance_analysis, homework_analysis = await self._run_analyses(timings, {
+                "grades": lambda service: service.analyze_student_grades(student_id, days),
+                "attendance": lambda service: service.analyze_student_attendance(student_id, days),
+                "homework": lambda service: service.analyze_homework_completion(student_id, days),
+            })
+            timings["analyses"] = _elapsed_ms(started)
             
             # Prepare data for AI insights
             analytics_data = {
@@ -154,10 +263,7 @@ class AnalysisService:
                 "homework": homework_analysis.get("homework_stats", {})
             }
             
-            # Generate AI insights
-            insights = await self.llm_service.generate_insights(analytics_data)
-            
-            # Generate recommendations
+            # Recommendations only need the analyses, so both LLM calls run at once
             student_profile = {
                 "average_grade": grades_analysis.get("average_grade", 0),
                 "attendance_rate": attendance_analysis.get("attendance_stats", {}).get("attendance_rate", 0),
@@ -166,7 +272,13 @@ class AnalysisService:
                 "areas_for_improvement": self._identify_improvements(grades_analysis, attendance_analysis, homework_analysis)
             }
             
-            recommendations = await self.llm_service.generate_recommendations(student_profile)
+            llm_started = time.perf_counter()
+            insights, recommendations = await asyncio.gather(
+                _timed(timings, "insights", self.llm_service.generate_insights(analytics_data)),
+                _timed(timings, "recommendations", self.llm_service.generate_recommendations(student_profile))
+            )
+            timings["llm"] = _elapsed_ms(llm_started)
+            timings["total"] = _elapsed_ms(started)
             
             return {
                 "student_id": student_id,
@@ -176,7 +288,8 @@ class AnalysisService:
                 "attendance": attendance_analysis,
                 "homework": homework_analysis,
                 "ai_insights": insights.get("insights"),
-                "recommendations": recommendations.get("recommendations")
+                "recommendations": recommendations.get("recommendations"),
+                "timings_ms": timings
             }
         except Exception as e:
             logger.error(f"Error generating comprehensive report: {e}")
@@ -223,7 +336,7 @@ class AnalysisService:
         
         # Check homework
         overdue = homework_analysis.get("homework_stats", {}).get("overdue_count", 0)
-        if overdue > 2:
+        if overdue > OVERDUE_ALERT_COUNT:
             improvements.append("Homework completion")
         
         return improvements if improvements else ["Continue current approach"]
@@ -0,0 +1,159 @@
+"""
+Vectorized grade statistics for many students at once.
+
+Grades are loaded once as columnar NumPy arrays (see
+DatabaseService.load_grade_columns) and every student x subject pair is
+summarised in a few array passes instead of one query and loop per pair.
+"""
+from datetime import datetime
+from typing import Dict, Iterable, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+# The newer half of a pair's scored grades must average this much above (below) the
+# older half to count as improving (declining). Halves split at day boundaries: the
+# older half is the days whose grades all fall within the first floor(count / 2),
+# so grades from one day stay together. DatabaseService.get_grade_trends applies the
+# same rule to the daily rollups.
+TREND_THRESHOLD = 0.5
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+class GradeColumns(NamedTuple):
+    """One entry per grade, sorted by (student, subject, date). Unscored grades have a NaN score."""
+    student_id: np.ndarray  # int64
+    subject: np.ndarray  # object (str)
+    day: np.ndarray  # float64, days since 1970-01-01
+    score: np.ndarray  # float64
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Tuple[int, str, datetime, Optional[float]]]) -> "GradeColumns":
+        rows = list(rows)
+        student_id = np.fromiter((r[0] for r in rows), dtype=np.int64, count=len(rows))
+        subject = np.array([r[1] for r in rows], dtype=object)
+        day = np.fromiter(((r[2] - _EPOCH).total_seconds() / 86400 for r in rows), dtype=np.float64, count=len(rows))
+        score = np.fromiter((np.nan if r[3] is None else r[3] for r in rows), dtype=np.float64, count=len(rows))
+        # Stable sort keeps the input order (e.g. by id) for grades with the same timestamp
+        _, subject_code = np.unique(subject, return_inverse=True)
+        order = np.lexsort((day, subject_code, student_id))
+        return cls(student_id[order], subject[order], day[order], score[order])
+
+    def __len__(self) -> int:
+        return len(self.student_id)
+
+
+class CohortStats(NamedTuple):
+    """Per student x subject statistics, one entry per pair, in (student, subject) order."""
+    student_id: np.ndarray
+    subject: np.ndarray
+    grade_count: np.ndarray  # all grades, scored or not
+    count: np.ndarray  # grades with a score; the rest are NaN where there are none
+    mean: np.ndarray
+    slope: np.ndarray  # least-squares score change per day (NaN with fewer than 2 days)
+    half_delta: np.ndarray  # newer half mean - older half mean (NaN with fewer than 2 scores)
+    lowest: np.ndarray
+    highest: np.ndarray
+    latest: np.ndarray
+    trend: np.ndarray  # improving / declining / stable / insufficient_data / no_data
+
+    def by_student(self) -> Dict[int, Dict[str, Dict]]:
+        """{student_id: {subject: stats}} with plain Python values (None for NaN)."""
+        result: Dict[int, Dict[str, Dict]] = {}
+        for i in range(len(self.student_id)):
+            result.setdefault(int(self.student_id[i]), {})[self.subject[i]] = {
+                "subject": self.subject[i],
+                "average": _round(self.mean[i]) if self.count[i] else 0,
+                "trend": str(self.trend[i]),
+                "count": int(self.count[i]),
+                "grade_count": int(self.grade_count[i]),
+                "slope": _round(self.slope[i], 4),
+                "half_delta": _round(self.half_delta[i]),
+                "latest_grade": _round(self.latest[i]),
+                "highest_grade": _round(self.highest[i]),
+                "lowest_grade": _round(self.lowest[i]),
+            }
+        return result
+
+
+def _round(value: float, digits: int = 2) -> Optional[float]:
+    return None if np.isnan(value) else round(float(value), digits)
+
+
+def _per_group(values: np.ndarray, group: np.ndarray, size: int) -> np.ndarray:
+    return np.bincount(group, weights=values, minlength=size)
+
+
+def _safe_divide(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    out = np.full(numerator.shape, np.nan)
+    np.divide(numerator, denominator, out=out, where=denominator > 0)
+    return out
+
+
+def compute_cohort(columns: GradeColumns) -> CohortStats:
+    """Summarise every student x subject pair in `columns` in vectorized passes."""
+    n = len(columns)
+    if n == 0:
+        empty = np.array([], dtype=np.float64)
+        return CohortStats(
+            np.array([], dtype=np.int64), np.array([], dtype=object), np.array([], dtype=np.int64),
+            np.array([], dtype=np.int64), empty, empty, empty, empty, empty, empty, np.array([], dtype=object)
+        )
+
+    student_id, subject, day, score = columns
+    # Grades are sorted, so each pair is one contiguous run
+    new_pair = np.empty(n, dtype=bool)
+    new_pair[0] = True
+    new_pair[1:] = (student_id[1:] != student_id[:-1]) | (subject[1:] != subject[:-1])
+    starts = np.flatnonzero(new_pair)
+    group = np.cumsum(new_pair) - 1
+    size = len(starts)
+
+    scored = ~np.isnan(score)
+    y = np.where(scored, score, 0.0)
+    weight = scored.astype(np.float64)
+    grade_count = np.bincount(group, minlength=size)
+    count = np.bincount(group, weights=weight, minlength=size).astype(np.int64)
+
+    mean = _safe_divide(_per_group(y, group, size), count)
+
+    # Least-squares slope of score over time: cov(t, y) / var(t), scored grades only
+    t = day - day[starts][group]  # relative to the pair's first grade, for precision
+    t_mean = _safe_divide(_per_group(t * weight, group, size), count)
+    dt = np.where(scored, t - t_mean[group], 0.0)
+    dy = np.where(scored, score - mean[group], 0.0)
+    slope = _safe_divide(_per_group(dt * dy, group, size), _per_group(dt * dt, group, size))
+
+    # Older half = the pair's days whose running scored count is at most count / 2
+    calendar_day = np.floor(day)
+    new_day = new_pair.copy()
+    new_day[1:] |= calendar_day[1:] != calendar_day[:-1]
+    day_ends = np.append(np.flatnonzero(new_day)[1:], n) - 1
+    running = np.cumsum(weight) - np.concatenate(([0.0], np.cumsum(weight)))[starts][group]
+    day_running = running[day_ends][np.cumsum(new_day) - 1]
+    older = scored & (2 * day_running <= count[group])
+    newer = scored & ~older
+    half_delta = (
+        _safe_divide(_per_group(np.where(newer, score, 0.0), group, size), _per_group(newer.astype(float), group, size))
+        - _safe_divide(_per_group(np.where(older, score, 0.0), group, size), _per_group(older.astype(float), group, size))
+    )
+
+    lowest = np.minimum.reduceat(np.where(scored, score, np.inf), starts)
+    highest = np.maximum.reduceat(np.where(scored, score, -np.inf), starts)
+    lowest[count == 0] = np.nan
+    highest[count == 0] = np.nan
+
+    # Latest scored grade: the largest scored index in each run
+    last_scored = np.maximum.reduceat(np.where(scored, np.arange(n), -1), starts)
+    latest = np.where(last_scored >= 0, score[np.maximum(last_scored, 0)], np.nan)
+
+    trend = np.select(
+        [count == 0, np.isnan(half_delta), half_delta > TREND_THRESHOLD, half_delta < -TREND_THRESHOLD],
+        ["no_data", "insufficient_data", "improving", "declining"],
+        default="stable"
+    ).astype(object)
+
+    return CohortStats(
+        student_id[starts], subject[starts], grade_count, count, mean, slope, half_delta,
+        lowest, highest, latest, trend
+    )
@@ -1,6 +1,9 @@
+from contextlib import asynccontextmanager
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, insert, update, delete
-from typing import List, Optional
+from sqlalchemy import select, insert, update, delete, text, tuple_, extract, literal, true, union, Date, SelectBase
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import joinedload
+from typing import List, Optional, Tuple, Set, AsyncIterator, Sequence
 from app.models.user import User, Role
 from app.models.student import Student
 from app.models.teacher import Teacher
@@ -8,66 +11,654 @@ from app.models.grade import Grade
 from app.models.lesson import Lesson
 from app.models.attendance import Attendance
 from app.models.homework import Homework
+import calendar
 import logging
+import numpy as np
 from datetime import datetime, timedelta
 from typing import Dict
 from sqlalchemy import func, and_, or_
 from app.models.homework_submission import HomeworkSubmission
+from app.models.rollup import (
+    StudentSubjectDaily, StudentAttendanceDaily, StudentSubjectTrend, StudentSubjectTrendBase, StudentDataVersion,
+    ClassSubjectSketch, StudentRisk
+)
+from app.models.archive import ArchivedTerm
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.terms import Term, term_for
+from app.core.pagination import keyset_after, next_cursor
+from app.services.grading import parse_grade
+from app.services.loader import BatchLoader
+from app.services.cohort import TREND_THRESHOLD, GradeColumns, compute_cohort
+from app.services.trend_state import STATE_COLUMNS, add_score, describe, empty_state, fold, follows
+from app.services.sketch import ScoreSketch, grade_level, sketch_bin
+from app.services.risk import (
+    ATTENDANCE_PRIOR_DAYS, ATTENDANCE_RECENT_DAYS, GRADE_WINDOW_DAYS, HOMEWORK_WINDOW_DAYS, STREAK_WINDOW_DAYS,
+    RiskSignals, mean_slope_per_student, missing_grade_streaks, score_risk
+)
 
 logger = logging.getLogger(__name__)
 
+# Calendar day of a timestamp column, typed so bound date parameters compare correctly
+GRADE_DAY = func.date(Grade.date, type_=Date)
+ATTENDANCE_DAY = func.date(Attendance.date, type_=Date)
+
+# Attendance heatmaps keyed by (scope, student or class, term start); see get_attendance_heatmap
+heatmap_cache = TTLCache(maxsize=4096)
+
+
+class DuplicateGradeKeyError(ValueError):
+    """Raised when a bulk insert repeats a grade's (student_id, subject, date, teacher_id) key."""
+
+    def __init__(self, groups: List[List[int]]):
+        self.groups = groups  # indexes of the items sharing each repeated key
+        super().__init__("Items repeat the same (student_id, subject, date, teacher_id): " + "; ".join(
+            ", ".join(str(index) for index in group) for group in groups
+        ))
+
+
+class ArchivedTermError(ValueError):
+    """Raised when a write is dated in an archived term, whose rollups can no longer be recomputed."""
+
+    def __init__(self, table: str, boundary):
+        self.boundary = boundary
+        super().__init__(f"Terms of {table} before {boundary} are archived; writes must be dated on or after it")
+
+
 class DatabaseService:
+    # Keyset ordering used by the paginated list methods
+    PAGE_ORDER = {
+        User: ("id",),
+        Student: ("id",),
+        Teacher: ("id",),
+        Grade: ("date", "id"),
+        Lesson: ("date", "id"),
+        Attendance: ("date", "id"),
+        Homework: ("due_date", "id"),
+    }
+
     def __init__(self, session: Optional[AsyncSession] = None):
         self.session = session
+        self._batch_depth = 0
+        # Memoized by-id lookups for the lifetime of this service (one request)
+        self._loaders = {
+            model: BatchLoader(lambda ids, model=model: self._fetch_by_ids(model, ids))
+            for model in (User, Student, Teacher, Lesson, Homework)
+        }
+
+    # Unit of work
+    @asynccontextmanager
+    async def batch(self):
+        """
+        Run several mutations in one transaction: writes inside the block skip their
+        own commit, everything commits once on exit and rolls back together on error.
+        """
+        outermost = self._batch_depth == 0
+        self._batch_depth += 1
+        try:
+            yield self
+            if outermost:
+                await self.session.commit()
+        except BaseException:
+            if outermost:
+                await self.session.rollback()
+                self._clear_loaders()
+            raise
+        finally:
+            self._batch_depth -= 1
+
+    async def _commit(self):
+        """Commit now, or leave it to the enclosing batch()."""
+        if not self._batch_depth:
+            await self.session.commit()
+
+    async def _rollback(self):
+        """Roll back now, or leave it to the enclosing batch()."""
+        if not self._batch_depth:
+            await self.session.rollback()
+            self._clear_loaders()
+
+    # Batched lookups by id
+    async def _fetch_by_ids(self, model, ids: List[int]) -> Dict[int, object]:
+        """One IN query for all `ids`; the batch function behind the loaders."""
+        result = await self.session.execute(select(model).where(model.id.in_(ids)))
+        return {row.id: row for row in result.scalars()}
+
+    async def _get_by_ids(self, model, ids) -> Dict[int, object]:
+        ids = list(dict.fromkeys(ids))
+        rows = await self._loaders[model].load_many(ids)
+        return {row_id: row for row_id, row in zip(ids, rows) if row is not None}
+
+    def _clear_loaders(self):
+        # Rolled-back objects are expired and cannot be lazily refreshed in async code
+        for loader in self._loaders.values():
+            loader.clear()
+
+    async def get_users_by_ids(self, ids) -> Dict[int, User]:
+        return await self._get_by_ids(User, ids)
+
+    async def get_students_by_ids(self, ids) -> Dict[int, Student]:
+        return await self._get_by_ids(Student, ids)
+
+    async def get_teachers_by_ids(self, ids) -> Dict[int, Teacher]:
+        return await self._get_by_ids(Teacher, ids)
+
+    async def get_lessons_by_ids(self, ids) -> Dict[int, Lesson]:
+        return await self._get_by_ids(Lesson, ids)
+
+    async def get_homework_by_ids(self, ids) -> Dict[int, Homework]:
+        return await self._get_by_ids(Homework, ids)
+
+    # Single-statement writes
+    async def _insert_returning(self, model, **values):
+        """INSERT ... RETURNING the new row as an ORM object."""
+        result = await self.session.execute(insert(model).values(**values).returning(model))
+        row = result.scalar_one()
+        if model in self._loaders:
+            self._loaders[model].prime(row.id, row)
+        return row
+
+    async def _update_returning(self, model, row_id: int, exact: Optional[Dict] = None, **values):
+        """
+        UPDATE ... WHERE id = :id RETURNING the row; None values are left unchanged, while
+        `exact` values are always written (None included, e.g. a derived column set to NULL).
+        Returns None if the row does not exist.
+        """
+        values = {key: value for key, value in values.items() if value is not None}
+        values.update(exact or {})
+        if not values:
+            return await self.session.get(model, row_id)
+        result = await self.session.execute(
+            update(model).where(model.id == row_id).values(**values).returning(model)
+            .execution_options(populate_existing=True)
+        )
+        return result.scalar_one_or_none()
+
+    async def _delete_returning(self, model, row_id: int, *columns):
+        """DELETE ... WHERE id = :id RETURNING `columns` (the id by default); None if nothing was deleted."""
+        result = await self.session.execute(
+            delete(model).where(model.id == row_id).returning(*(columns or (model.id,)))
+        )
+        if model in self._loaders:
+            self._loaders[model].clear(row_id)
+        return result.first()
+
+    # Eager-loading profiles for list methods. Every profile is a many-to-one
+    # relationship, so it is joined into the page query instead of lazy-loaded per row
+    LOAD_PROFILES = {
+        Student: {
+            "with_user": (joinedload(Student.user),),
+        },
+        Teacher: {
+            "with_user": (joinedload(Teacher.user),),
+        },
+        Grade: {
+            "with_student": (joinedload(Grade.student).joinedload(Student.user),),
+            "with_teacher": (joinedload(Grade.teacher).joinedload(Teacher.user),),
+        },
+        Lesson: {
+            "with_teacher": (joinedload(Lesson.teacher),),
+        },
+        Attendance: {
+            "with_student": (joinedload(Attendance.student),),
+            "with_lesson": (joinedload(Attendance.lesson),),
+        },
+        Homework: {
+            "with_lesson": (joinedload(Homework.lesson),),
+            "with_teacher": (joinedload(Homework.teacher),),
+        },
+    }
+
+    def _with_profiles(self, query, model, load: Sequence[str] = ()):
+        """Apply the named LOAD_PROFILES of `model` to `query`."""
+        profiles = self.LOAD_PROFILES.get(model, {})
+        for name in load:
+            if name not in profiles:
+                raise ValueError(f"Unknown load profile for {model.__name__}: {name}")
+            query = query.options(*profiles[name])
+        return query
+
+    # Pagination helpers
+    def _paginate(self, query, model, skip: int = 0, limit: int = 100, cursor: Optional[str] = None):
+        """Order by the model's keyset and continue after `cursor` (falls back to OFFSET for `skip`)."""
+        columns = [getattr(model, name) for name in self.PAGE_ORDER[model]]
+        query = query.order_by(*columns)
+        if cursor:
+            query = query.where(keyset_after(columns, cursor))
+        elif skip:
+            query = query.offset(skip)
+        return query.limit(limit)
+
+    def page_cursor(self, model, items: List, limit: int) -> Optional[str]:
+        """Cursor for the page following `items`, or None if this was the last page."""
+        return next_cursor(items, limit, self.PAGE_ORDER[model])
+
+    def _upsert(self, model):
+        """Dialect-specific INSERT construct supporting ON CONFLICT DO UPDATE."""
+        dialect = self.session.get_bind().dialect.name
+        if dialect == "postgresql":
+            return postgresql.insert(model)
+        if dialect == "sqlite":
+            return sqlite.insert(model)
+        raise NotImplementedError(f"Upserts are not supported on {dialect}")
+
+    async def _upsert_changed(self, model, rows: List[Dict], key: List, update_columns: List[str],
+                              batch_size: int) -> Tuple[List, List]:
+        """
+        INSERT ... ON CONFLICT (key) DO UPDATE `update_columns`, one statement per
+        `batch_size` rows. Conflicting rows whose values are unchanged are left untouched,
+        so only inserted and changed rows are returned, as (inserted, updated).
+        """
+        inserted, updated = [], []
+        key_names = [column.key for column in key]
+        for start in range(0, len(rows), batch_size):
+            batch = rows[start:start + batch_size]
+            # Keys already stored tell updated rows from inserted ones in the RETURNING rows
+            existing = {tuple(row) for row in (await self.session.execute(
+                select(*key).where(tuple_(*key).in_([tuple(r[name] for name in key_names) for r in batch]))
+            )).all()}
+            stmt = self._upsert(model).values(batch)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=key,
+                set_={column: stmt.excluded[column] for column in update_columns},
+                where=or_(*(
+                    getattr(model, column).is_distinct_from(stmt.excluded[column]) for column in update_columns
+                ))
+            ).returning(model).execution_options(populate_existing=True)
+            result = await self.session.execute(stmt)
+            for row in result.scalars().all():
+                stored = tuple(getattr(row, name) for name in key_names) in existing
+                (updated if stored else inserted).append(row)
+        return inserted, updated
+
+    async def _estimate_count(self, model) -> Optional[int]:
+        """
+        Planner row estimate from pg_class; None when unavailable. Partitioned parents
+        (grades, attendance) are never analyzed themselves, so their estimate is the sum
+        over their partitions, skipping partitions not analyzed yet.
+        """
+        if self.session.get_bind().dialect.name != "postgresql":
+            return None
+        result = await self.session.execute(
+            text(
+                "SELECT (CASE WHEN c.relkind = 'p' THEN ("
+                "  SELECT CASE WHEN max(p.reltuples) < 0 THEN -1 ELSE sum(greatest(p.reltuples, 0)) END"
+                "  FROM pg_inherits i JOIN pg_class p ON p.oid = i.inhrelid WHERE i.inhparent = c.oid"
+                ") ELSE c.reltuples END)::bigint FROM pg_class c WHERE c.oid = CAST(:table AS regclass)"
+            ),
+            {"table": model.__tablename__}
+        )
+        estimate = result.scalar_one_or_none()
+        return estimate if estimate is not None and estimate >= 0 else None
+
+    async def count_rows(self, model, *criteria) -> int:
+        """
+        COUNT(*) over `model` matching `criteria`. Unfiltered counts on very large
+        tables use the planner estimate instead of a full scan.
+        """
+        if not criteria:
+            estimate = await self._estimate_count(model)
+            if estimate is not None and estimate >= settings.COUNT_ESTIMATE_THRESHOLD:
+                return estimate
+        result = await self.session.execute(select(func.count()).select_from(model).where(*criteria))
+        return result.scalar_one()
+
+    # Daily rollup maintenance
+    GRADE_ROLLUP_COLUMNS = ["student_id", "subject", "day", "grade_count", "score_count", "score_sum", "score_min", "score_max"]
+    ATTENDANCE_ROLLUP_COLUMNS = ["student_id", "day", "present_count", "absent_count"]
+
+    def _grade_rollup_source(self, *criteria):
+        return select(
+            Grade.student_id,
+            Grade.subject,
+            GRADE_DAY,
+            func.count(Grade.id),
+            func.count(Grade.score),
+            func.coalesce(func.sum(Grade.score), 0),
+            func.min(Grade.score),
+            func.max(Grade.score)
+        ).where(*criteria).group_by(Grade.student_id, Grade.subject, GRADE_DAY)
+
+    def _attendance_rollup_source(self, *criteria):
+        return select(
+            Attendance.student_id,
+            ATTENDANCE_DAY,
+            func.count(Attendance.id).filter(Attendance.present.is_(True)),
+            func.count(Attendance.id).filter(Attendance.present.is_not(True))
+        ).where(*criteria).group_by(Attendance.student_id, ATTENDANCE_DAY)
+
+    def _day_range(self, column, days: List) -> List:
+        """Plain range bounds on `column` covering `days`, so term partitions are pruned."""
+        return [column >= min(days), column < max(days) + timedelta(days=1)]
+
+    async def _refresh_grade_rollups(self, keys: Set[Tuple[int, str, object]]):
+        """
+        Recompute student_subject_daily for the given (student_id, subject, day) keys from
+        the grades table and bump the students' data versions. Runs inside the caller's
+        transaction before its commit.
+        """
+        if not keys:
+            return
+        keys = list(keys)
+        await self._bump_data_versions(student_id for student_id, _, _ in keys)
+        sketch_terms = {(student_id, subject, term_for(day)) for student_id, subject, day in keys}
+        sketch_criteria = [
+            tuple_(StudentSubjectDaily.student_id, StudentSubjectDaily.subject).in_(
+                {(student_id, subject) for student_id, subject, _ in sketch_terms}
+            ),
+            StudentSubjectDaily.day >= min(term.start for _, _, term in sketch_terms),
+            StudentSubjectDaily.day < max(term.end for _, _, term in sketch_terms)
+        ]
+        old_members = await self._sketch_members(*sketch_criteria, terms=sketch_terms)
+        await self.session.execute(
+            delete(StudentSubjectDaily).where(
+                tuple_(StudentSubjectDaily.student_id, StudentSubjectDaily.subject, StudentSubjectDaily.day).in_(keys)
+            )
+        )
+        await self.session.execute(
+            insert(StudentSubjectDaily).from_select(
+                self.GRADE_ROLLUP_COLUMNS,
+                self._grade_rollup_source(
+                    tuple_(Grade.student_id, Grade.subject, GRADE_DAY).in_(keys),
+                    *self._day_range(Grade.date, [day for _, _, day in keys])
+                )
+            )
+        )
+        await self._move_sketch_members(old_members, await self._sketch_members(*sketch_criteria, terms=sketch_terms))
+
+    async def _refresh_attendance_rollups(self, keys: Set[Tuple[int, object]]):
+        """Recompute student_attendance_daily for the given (student_id, day) keys and bump data versions."""
+        if not keys:
+            return
+        keys = list(keys)
+        await self._bump_data_versions(student_id for student_id, _ in keys)
+        await self.session.execute(
+            delete(StudentAttendanceDaily).where(
+                tuple_(StudentAttendanceDaily.student_id, StudentAttendanceDaily.day).in_(keys)
+            )
+        )
+        await self.session.execute(
+            insert(StudentAttendanceDaily).from_select(
+                self.ATTENDANCE_ROLLUP_COLUMNS,
+                self._attendance_rollup_source(
+                    tuple_(Attendance.student_id, ATTENDANCE_DAY).in_(keys),
+                    *self._day_range(Attendance.date, [day for _, day in keys])
+                )
+            )
+        )
+
+    async def _bump_data_versions(self, student_ids):
+        """
+        Increment student_data_version for `student_ids` (ids, or a select of ids), creating
+        missing rows, so cached analytics snapshots of those students are no longer used.
+        """
+        stmt = self._upsert(StudentDataVersion)
+        if isinstance(student_ids, SelectBase):
+            stmt = stmt.from_select(
+                ["student_id", "version"],
+                # WHERE keeps SQLite from parsing ON CONFLICT as a join constraint
+                select(student_ids.subquery().c.student_id, literal(1)).where(true())
+            )
+        else:
+            # Sorted so concurrent writers lock rows in the same order
+            ids = sorted(set(student_ids))
+            if not ids:
+                return
+            stmt = stmt.values([{"student_id": student_id, "version": 1} for student_id in ids])
+        await self.session.execute(stmt.on_conflict_do_update(
+            index_elements=[StudentDataVersion.student_id],
+            set_={"version": StudentDataVersion.version + 1}
+        ))
+
+    async def get_data_version(self, student_id: int) -> int:
+        """Current data version of a student (0 before their first grade or attendance write)."""
+        result = await self.session.execute(
+            select(StudentDataVersion.version).where(StudentDataVersion.student_id == student_id)
+        )
+        return result.scalar_one_or_none() or 0
+
+    async def _sketch_members(self, *criteria, terms: Optional[Set[Tuple[int, str, Term]]] = None) -> Dict[Tuple, int]:
+        """
+        Sketch bin of each student's term average per subject, from the daily rollups matching
+        `criteria` (optionally only the given (student_id, subject, term) triples):
+        {(class_name, subject, term_start, student_id): bin}.
+        """
+        result = await self.session.stream(
+            select(
+                Student.class_name, StudentSubjectDaily.student_id, StudentSubjectDaily.subject,
+                StudentSubjectDaily.day, StudentSubjectDaily.score_sum, StudentSubjectDaily.score_count
+            ).join(Student, Student.id == StudentSubjectDaily.student_id)
+            .where(StudentSubjectDaily.score_count > 0, *criteria)
+            .execution_options(yield_per=10000)
+        )
+        sums: Dict[Tuple, List] = {}
+        async for row in result:
+            term = term_for(row.day)
+            if terms is not None and (row.student_id, row.subject, term) not in terms:
+                continue
+            total = sums.setdefault((row.class_name, row.subject, term.start, row.student_id), [0.0, 0])
+            total[0] += row.score_sum
+            total[1] += row.score_count
+        return {key: sketch_bin(score_sum / score_count) for key, (score_sum, score_count) in sums.items()}
+
+    async def _move_sketch_members(self, old: Dict[Tuple, int], new: Dict[Tuple, int]):
+        """Apply the change from `old` to `new` members (see _sketch_members) to class_subject_sketch."""
+        deltas: Dict[Tuple, int] = {}
+        for members, step in ((old, -1), (new, 1)):
+            for (class_name, subject, term_start, _), index in members.items():
+                key = (class_name, subject, term_start, index)
+                deltas[key] = deltas.get(key, 0) + step
+        rows = [
+            {"class_name": class_name, "subject": subject, "term_start": term_start, "bin": index, "count": delta}
+            for (class_name, subject, term_start, index), delta in sorted(deltas.items()) if delta
+        ]
+        if not rows:
+            return
+        stmt = self._upsert(ClassSubjectSketch).values(rows)
+        await self.session.execute(stmt.on_conflict_do_update(
+            index_elements=[ClassSubjectSketch.class_name, ClassSubjectSketch.subject,
+                            ClassSubjectSketch.term_start, ClassSubjectSketch.bin],
+            set_={"count": ClassSubjectSketch.count + stmt.excluded["count"]}
+        ))
+        decremented = [(r["class_name"], r["subject"], r["term_start"], r["bin"]) for r in rows if r["count"] < 0]
+        if decremented:
+            await self.session.execute(delete(ClassSubjectSketch).where(
+                tuple_(ClassSubjectSketch.class_name, ClassSubjectSketch.subject,
+                       ClassSubjectSketch.term_start, ClassSubjectSketch.bin).in_(decremented),
+                ClassSubjectSketch.count <= 0
+            ))
+
+    async def _fold_grade_trends(self, *criteria, seeds: Optional[Dict[Tuple[int, str], Dict]] = None) -> Dict[Tuple[int, str], Dict]:
+        """
+        Trend state of every (student_id, subject) pair with scored grades matching `criteria`,
+        each folded on top of its state in `seeds` (e.g. its archived grades; see
+        _trend_bases). Seeded pairs without matching grades keep their seed.
+        """
+        seeds = seeds or {}
+        result = await self.session.stream(
+            select(Grade.student_id, Grade.subject, Grade.score, Grade.date, Grade.id)
+            .where(Grade.score.is_not(None), *criteria)
+            .order_by(Grade.student_id, Grade.subject, Grade.date, Grade.id)
+            .execution_options(yield_per=10000)
+        )
+        states = dict(seeds)
+        async for row in result:
+            pair = (row.student_id, row.subject)
+            states[pair] = add_score(states.get(pair) or empty_state(), row.score, row.date, row.id)
+        return states
+
+    async def _trend_bases(self, pairs: Optional[List[Tuple[int, str]]] = None) -> Dict[Tuple[int, str], Dict]:
+        """Stored trend state of archived grades for `pairs` (default: every pair that has one)."""
+        query = select(StudentSubjectTrendBase.student_id, StudentSubjectTrendBase.subject,
+                       *(getattr(StudentSubjectTrendBase, column) for column in STATE_COLUMNS))
+        if pairs is not None:
+            if not pairs:
+                return {}
+            query = query.where(tuple_(StudentSubjectTrendBase.student_id, StudentSubjectTrendBase.subject).in_(pairs))
+        result = await self.session.execute(query)
+        return {(row.student_id, row.subject): {column: getattr(row, column) for column in STATE_COLUMNS}
+                for row in result.all()}
+
+    async def _write_grade_trends(self, pairs: List[Tuple[int, str]], states: Dict[Tuple[int, str], Dict],
+                                  model=StudentSubjectTrend):
+        await self.session.execute(
+            delete(model).where(tuple_(model.student_id, model.subject).in_(pairs))
+        )
+        if states:
+            await self.session.execute(insert(model), [
+                {"student_id": student_id, "subject": subject, **state}
+                for (student_id, subject), state in states.items()
+            ])
+
+    async def _refresh_grade_trends(self, pairs: Set[Tuple[int, str]] = frozenset(), appended: Sequence[Grade] = ()):
+        """
+        Bring student_subject_trend up to date after a grade write, inside the caller's
+        transaction. `appended` are newly inserted grades: a pair whose new grades all
+        follow its stored state is updated in O(1) per grade. `pairs` (corrections,
+        deletions) and pairs with back-dated or first grades are rebuilt from the grades table,
+        on top of the state of their archived grades.
+        """
+        new_grades: Dict[Tuple[int, str], List[Grade]] = {}
+        for g in sorted(appended, key=lambda g: (g.date, g.id)):
+            new_grades.setdefault((g.student_id, g.subject), []).append(g)
+        touched = list(set(pairs) | set(new_grades))
+        if not touched:
+            return
+
+        result = await self.session.execute(
+            select(StudentSubjectTrend.student_id, StudentSubjectTrend.subject,
+                   *(getattr(StudentSubjectTrend, column) for column in STATE_COLUMNS))
+            .where(tuple_(StudentSubjectTrend.student_id, StudentSubjectTrend.subject).in_(touched))
+        )
+        stored = {(row.student_id, row.subject): {column: getattr(row, column) for column in STATE_COLUMNS}
+                  for row in result.all()}
+
+        states = {}
+        rebuild = []
+        for pair in touched:
+            state = stored.get(pair)
+            grades = new_grades.get(pair)
+            if pair not in pairs and state is not None and follows(state, grades[0].date, grades[0].id):
+                states[pair] = fold(((g.score, g.date, g.id) for g in grades), state)
+            else:
+                rebuild.append(pair)
+        if rebuild:
+            states.update(await self._fold_grade_trends(
+                tuple_(Grade.student_id, Grade.subject).in_(rebuild), seeds=await self._trend_bases(rebuild)
+            ))
+        await self._write_grade_trends(touched, states)
+
+    async def _archive_boundary(self, table: str) -> Optional[datetime]:
+        """
+        End of the latest archived term of `table` (grades or attendance), as a datetime:
+        rows dated before it were archived by scripts/data/archive_terms.py. None if nothing is.
+        """
+        term_end = (await self.session.execute(
+            select(func.max(ArchivedTerm.term_end)).where(ArchivedTerm.table_name == table)
+        )).scalar()
+        return datetime.combine(term_end, datetime.min.time()) if term_end else None
+
+    async def _check_not_archived(self, table: str, *dates):
+        """Raise ArchivedTermError if any of `dates` falls in an archived term of `table`."""
+        boundary = await self._archive_boundary(table)
+        if boundary and any(d < boundary for d in dates):
+            raise ArchivedTermError(table, boundary.date())
+
+    async def record_archived_term(self, table: str, term_start, term_end):
+        """
+        Record that the term [term_start, term_end) of `table` is being archived, inside the
+        archiving transaction (see scripts/data/archive_terms.py), while its rows are still
+        live. For grades, the term's grades are folded into student_subject_trend_base so that
+        later trend rebuilds keep them. Does not commit.
+        """
+        await self.session.execute(insert(ArchivedTerm).values(
+            table_name=table, term_start=term_start, term_end=term_end, archived_at=datetime.now()
+        ))
+        if table != "grades":
+            return
+        in_term = [Grade.date >= datetime.combine(term_start, datetime.min.time()),
+                   Grade.date < datetime.combine(term_end, datetime.min.time())]
+        pairs = [tuple(row) for row in (await self.session.execute(
+            select(Grade.student_id, Grade.subject).where(*in_term).distinct()
+        )).all()]
+        if pairs:
+            states = await self._fold_grade_trends(*in_term, seeds=await self._trend_bases(pairs))
+            await self._write_grade_trends(pairs, states, model=StudentSubjectTrendBase)
+
+    async def rebuild_rollups(self):
+        """
+        Rebuild the rollup, trend state and score sketch tables from scratch (e.g. after bulk
+        SQL edits or a GRADING_SCALE change) and bump every student's data version.
+        Rollups of archived terms are kept, since their rows are gone, and trend state is
+        folded on top of the stored state of the archived grades.
+        """
+        grades_boundary = await self._archive_boundary("grades")
+        attendance_boundary = await self._archive_boundary("attendance")
+        grade_criteria = [Grade.date >= grades_boundary] if grades_boundary else []
+        attendance_criteria = [Attendance.date >= attendance_boundary] if attendance_boundary else []
+        await self.session.execute(delete(StudentSubjectDaily).where(
+            *([StudentSubjectDaily.day >= grades_boundary.date()] if grades_boundary else [])
+        ))
+        await self.session.execute(delete(StudentAttendanceDaily).where(
+            *([StudentAttendanceDaily.day >= attendance_boundary.date()] if attendance_boundary else [])
+        ))
+        await self.session.execute(delete(StudentSubjectTrend))
+        await self.session.execute(
+            insert(StudentSubjectDaily).from_select(
+                self.GRADE_ROLLUP_COLUMNS, self._grade_rollup_source(*grade_criteria)
+            )
+        )
+        await self.session.execute(
+            insert(StudentAttendanceDaily).from_select(
+                self.ATTENDANCE_ROLLUP_COLUMNS, self._attendance_rollup_source(*attendance_criteria)
+            )
+        )
+        states = await self._fold_grade_trends(seeds=await self._trend_bases())
+        if states:
+            await self._write_grade_trends(list(states), states)
+        await self._bump_data_versions(
+            union(select(Grade.student_id.label("student_id")), select(Attendance.student_id))
+        )
+        await self.session.execute(delete(ClassSubjectSketch))
+        await self._move_sketch_members({}, await self._sketch_members())
+        await self.session.commit()
 
     # User CRUD
     async def create_user(self, name: str, email: str, role: Role) -> User:
-        user = User(name=name, email=email, role=role)
-        self.session.add(user)
-        await self.session.commit()
-        await self.session.refresh(user)
+        user = await self._insert_returning(User, name=name, email=email, role=role)
+        await self._commit()
         return user
 
     async def get_user_by_id(self, user_id: int) -> Optional[User]:
-        result = await self.session.execute(select(User).where(User.id == user_id))
-        return result.scalar_one_or_none()
+        return await self._loaders[User].load(user_id)
 
     async def get_users_by_role(self, role: Role) -> List[User]:
         result = await self.session.execute(select(User).where(User.role == role))
         return result.scalars().all()
     
-    async def get_users(self, skip: int = 0, limit: int = 100) -> List[User]:
-        result = await self.session.execute(select(User).offset(skip).limit(limit))
+    async def get_users(self, skip: int = 0, limit: int = 100, cursor: Optional[str] = None) -> List[User]:
+        query = self._paginate(select(User), User, skip, limit, cursor)
+        result = await self.session.execute(query)
         return result.scalars().all()
+
+    async def count_users(self) -> int:
+        return await self.count_rows(User)
     
     async def update_user(self, user_id: int, name: Optional[str] = None, email: Optional[str] = None, role: Optional[Role] = None) -> Optional[User]:
-        user = await self.get_user_by_id(user_id)
-        if not user:
-            return None
-        if name is not None:
-            user.name = name
-        if email is not None:
-            user.email = email
-        if role is not None:
-            user.role = role
-        await self.session.commit()
-        await self.session.refresh(user)
+        user = await self._update_returning(User, user_id, name=name, email=email, role=role)
+        await self._commit()
         return user
     
     async def delete_user(self, user_id: int) -> bool:
-        user = await self.get_user_by_id(user_id)
-        if not user:
+        if not await self._delete_returning(User, user_id):
             return False
-        await self.session.delete(user)
-        await self.session.commit()
+        await self._commit()
         return True
 
     # Student CRUD
     async def create_student(self, user_id: int, class_name: str) -> Student:
-        student = Student(user_id=user_id, class_name=class_name)
-        self.session.add(student)
-        await self.session.commit()
-        await self.session.refresh(student)
+        student = await self._insert_returning(Student, user_id=user_id, class_name=class_name)
+        await self._commit()
         return student
 
     async def get_students_by_class(self, class_name: str) -> List[Student]:
@@ -75,73 +666,233 @@ class DatabaseService:
         return result.scalars().all()
     
     async def get_student_by_id(self, student_id: int) -> Optional[Student]:
-        result = await self.session.execute(select(Student).where(Student.id == student_id))
-        return result.scalar_one_or_none()
+        return await self._loaders[Student].load(student_id)
     
-    async def get_students(self, skip: int = 0, limit: int = 100) -> List[Student]:
-        result = await self.session.execute(select(Student).offset(skip).limit(limit))
+    async def get_students(self, skip: int = 0, limit: int = 100, cursor: Optional[str] = None,
+                           class_name: Optional[str] = None, load: Sequence[str] = ()) -> List[Student]:
+        query = self._with_profiles(select(Student), Student, load).where(*self._student_filters(class_name))
+        result = await self.session.execute(self._paginate(query, Student, skip, limit, cursor))
         return result.scalars().all()
+
+    async def count_students(self, class_name: Optional[str] = None) -> int:
+        return await self.count_rows(Student, *self._student_filters(class_name))
+
+    def _student_filters(self, class_name: Optional[str] = None) -> List:
+        return [Student.class_name == class_name] if class_name else []
     
     async def update_student(self, student_id: int, class_name: Optional[str] = None) -> Optional[Student]:
-        student = await self.get_student_by_id(student_id)
-        if not student:
-            return None
-        if class_name is not None:
-            student.class_name = class_name
-        await self.session.commit()
-        await self.session.refresh(student)
+        # A class change moves the student's entries between class score sketches
+        in_student = StudentSubjectDaily.student_id == student_id
+        old_members = await self._sketch_members(in_student) if class_name is not None else {}
+        student = await self._update_returning(Student, student_id, class_name=class_name)
+        if student and class_name is not None:
+            await self._move_sketch_members(old_members, await self._sketch_members(in_student))
+        await self._commit()
         return student
     
     async def delete_student(self, student_id: int) -> bool:
-        student = await self.get_student_by_id(student_id)
-        if not student:
+        old_members = await self._sketch_members(StudentSubjectDaily.student_id == student_id)
+        if not await self._delete_returning(Student, student_id):
             return False
-        await self.session.delete(student)
-        await self.session.commit()
+        await self._move_sketch_members(old_members, {})
+        await self._commit()
         return True
     
     # Teacher CRUD
     async def create_teacher(self, user_id: int, subjects: List[str]) -> Teacher:
-        teacher = Teacher(user_id=user_id, subjects=subjects)
-        self.session.add(teacher)
-        await self.session.commit()
-        await self.session.refresh(teacher)
+        teacher = await self._insert_returning(Teacher, user_id=user_id, subjects=subjects)
+        await self._commit()
         return teacher
     
     async def get_teacher_by_id(self, teacher_id: int) -> Optional[Teacher]:
-        result = await self.session.execute(select(Teacher).where(Teacher.id == teacher_id))
-        return result.scalar_one_or_none()
+        return await self._loaders[Teacher].load(teacher_id)
     
-    async def get_teachers(self, skip: int = 0, limit: int = 100) -> List[Teacher]:
-        result = await self.session.execute(select(Teacher).offset(skip).limit(limit))
+    async def get_teachers(self, skip: int = 0, limit: int = 100, cursor: Optional[str] = None,
+                           load: Sequence[str] = ()) -> List[Teacher]:
+        query = self._paginate(self._with_profiles(select(Teacher), Teacher, load), Teacher, skip, limit, cursor)
+        result = await self.session.execute(query)
         return result.scalars().all()
+
+    async def count_teachers(self) -> int:
+        return await self.count_rows(Teacher)
     
     async def update_teacher(self, teacher_id: int, subjects: Optional[List[str]] = None) -> Optional[Teacher]:
-        teacher = await self.get_teacher_by_id(teacher_id)
-        if not teacher:
-            return None
-        if subjects is not None:
-            teacher.subjects = subjects
-        await self.session.commit()
-        await self.session.refresh(teacher)
+        teacher = await self._update_returning(Teacher, teacher_id, subjects=subjects)
+        await self._commit()
         return teacher
     
     async def delete_teacher(self, teacher_id: int) -> bool:
-        teacher = await self.get_teacher_by_id(teacher_id)
-        if not teacher:
+        if not await self._delete_returning(Teacher, teacher_id):
             return False
-        await self.session.delete(teacher)
-        await self.session.commit()
+        await self._commit()
         return True
 
     # Grade CRUD
     async def create_grade(self, student_id: int, teacher_id: int, subject: str, grade: str, date, lesson_topic: Optional[str] = None) -> Grade:
-        grade_obj = Grade(student_id=student_id, teacher_id=teacher_id, subject=subject, grade=grade, date=date, lesson_topic=lesson_topic)
-        self.session.add(grade_obj)
-        await self.session.commit()
-        await self.session.refresh(grade_obj)
+        await self._check_not_archived("grades", date)
+        grade_obj = await self._insert_returning(
+            Grade, student_id=student_id, teacher_id=teacher_id, subject=subject, grade=grade,
+            score=parse_grade(grade), date=date, lesson_topic=lesson_topic
+        )
+        await self._refresh_grade_rollups({(student_id, subject, date.date())})
+        await self._refresh_grade_trends(appended=[grade_obj])
+        await self._commit()
         return grade_obj
 
+    async def create_grades_bulk(self, grades: List[Dict]) -> Tuple[List[Tuple[int, Grade]], List[Dict]]:
+        """
+        Insert many grades in one transaction with a multi-row INSERT ... RETURNING.
+        Rows referencing unknown students or teachers, dated in an archived term, or whose
+        natural key already exists are skipped and reported by index. Items repeating a natural key within `grades`
+        raise DuplicateGradeKeyError before anything is written.
+        Returns ([(index, grade), ...], [{"index": ..., "detail": ...}, ...]).
+        """
+        by_key: Dict[Tuple, List[int]] = {}
+        for index, g in enumerate(grades):
+            by_key.setdefault((g["student_id"], g["subject"], g["date"], g["teacher_id"]), []).append(index)
+        repeated = [indexes for indexes in by_key.values() if len(indexes) > 1]
+        if repeated:
+            raise DuplicateGradeKeyError(repeated)
+
+        valid, errors = await self._check_grade_references(grades)
+        existing = await self._existing_grade_keys(
+            [(g["student_id"], g["subject"], g["date"], g["teacher_id"]) for _, g in valid]
+        )
+        if existing:
+            for index, g in valid:
+                if (g["student_id"], g["subject"], g["date"], g["teacher_id"]) in existing:
+                    errors.append({"index": index, "detail": "Grade with this student, subject, date and teacher already exists"})
+            valid = [(index, g) for index, g in valid
+                     if (g["student_id"], g["subject"], g["date"], g["teacher_id"]) not in existing]
+            errors.sort(key=lambda error: error["index"])
+        if not valid:
+            return [], errors
+
+        try:
+            result = await self.session.execute(
+                insert(Grade).returning(Grade, sort_by_parameter_order=True),
+                [{**g, "score": parse_grade(g["grade"])} for _, g in valid]
+            )
+            created = result.scalars().all()
+            await self._refresh_grade_rollups({(g.student_id, g.subject, g.date.date()) for g in created})
+            await self._refresh_grade_trends(appended=created)
+            await self._commit()
+        except Exception:
+            await self._rollback()
+            raise
+
+        return [(index, grade) for (index, _), grade in zip(valid, created)], errors
+
+    async def _existing_grade_keys(self, keys: List[Tuple], chunk_size: int = 500) -> Set[Tuple]:
+        """The (student_id, subject, date, teacher_id) keys among `keys` that grades already hold."""
+        found = set()
+        columns = (Grade.student_id, Grade.subject, Grade.date, Grade.teacher_id)
+        for start in range(0, len(keys), chunk_size):
+            result = await self.session.execute(
+                select(*columns).where(tuple_(*columns).in_(keys[start:start + chunk_size]))
+            )
+            found.update(tuple(row) for row in result.all())
+        return found
+
+    async def _check_grade_references(self, grades: List[Dict]) -> Tuple[List[Tuple[int, Dict]], List[Dict]]:
+        """
+        Split `grades` into (index, grade) pairs with known students and teachers, dated after
+        any archived term, and per-index errors.
+        """
+        known_students = await self.get_students_by_ids(g["student_id"] for g in grades)
+        known_teachers = await self.get_teachers_by_ids(g["teacher_id"] for g in grades)
+        boundary = await self._archive_boundary("grades")
+
+        errors = []
+        valid = []
+        for index, g in enumerate(grades):
+            if g["student_id"] not in known_students:
+                errors.append({"index": index, "detail": f"Student with ID {g['student_id']} not found"})
+            elif g["teacher_id"] not in known_teachers:
+                errors.append({"index": index, "detail": f"Teacher with ID {g['teacher_id']} not found"})
+            elif boundary and g["date"] < boundary:
+                errors.append({"index": index, "detail": str(ArchivedTermError("grades", boundary.date()))})
+            else:
+                valid.append((index, g))
+        return valid, errors
+
+    async def upsert_grades(self, grades: List[Dict], batch_size: int = 1000) -> Tuple[List[Grade], List[Dict]]:
+        """
+        Insert or update grades keyed on (student_id, subject, date, teacher_id), one
+        INSERT ... ON CONFLICT DO UPDATE per `batch_size` rows in a single transaction.
+        Replaying a feed only rewrites grades whose mark or topic changed; when a key
+        repeats within `grades` the last item wins. Unknown students or teachers and
+        grades dated in an archived term are reported by index as in create_grades_bulk.
+        Returns (inserted or changed grades, errors).
+        """
+        valid, errors = await self._check_grade_references(grades)
+        latest = {
+            (g["student_id"], g["subject"], g["date"], g["teacher_id"]): {
+                "student_id": g["student_id"], "teacher_id": g["teacher_id"], "subject": g["subject"],
+                "grade": g["grade"], "score": parse_grade(g["grade"]), "date": g["date"],
+                "lesson_topic": g.get("lesson_topic")
+            }
+            for _, g in valid
+        }
+        if not latest:
+            return [], errors
+
+        try:
+            inserted, updated = await self._upsert_changed(
+                Grade, list(latest.values()),
+                key=[Grade.student_id, Grade.subject, Grade.date, Grade.teacher_id],
+                update_columns=["grade", "score", "lesson_topic"],
+                batch_size=batch_size
+            )
+            changed = inserted + updated
+            await self._refresh_grade_rollups({(g.student_id, g.subject, g.date.date()) for g in changed})
+            # Updated rows are corrections of already folded grades, so only their pairs are rebuilt
+            await self._refresh_grade_trends({(g.student_id, g.subject) for g in updated}, appended=inserted)
+            await self._commit()
+        except Exception:
+            await self._rollback()
+            raise
+        return sorted(changed, key=lambda g: g.id), errors
+
+    async def backfill_grade_scores(self, chunk_size: int = 1000, after_id: int = 0) -> int:
+        """
+        Fill `score` for grades written before it existed, one committed chunk at a time.
+        Safe to interrupt: a rerun picks up the rows that are still NULL (pass the last
+        logged id as `after_id` to skip re-checking unparseable marks).
+        Returns the number of rows updated.
+        """
+        updated = 0
+        while True:
+            result = await self.session.execute(
+                select(Grade.id, Grade.grade, Grade.student_id, Grade.subject, Grade.date)
+                .where(Grade.score.is_(None), Grade.id > after_id)
+                .order_by(Grade.id)
+                .limit(chunk_size)
+            )
+            rows = result.all()
+            if not rows:
+                break
+            after_id = rows[-1].id
+
+            scores = [
+                {"id": row.id, "score": score}
+                for row in rows
+                if (score := parse_grade(row.grade)) is not None
+            ]
+            if scores:
+                await self.session.execute(update(Grade), scores)
+                scored_ids = {s["id"] for s in scores}
+                await self._refresh_grade_rollups(
+                    {(row.student_id, row.subject, row.date.date()) for row in rows if row.id in scored_ids}
+                )
+                await self._refresh_grade_trends(
+                    {(row.student_id, row.subject) for row in rows if row.id in scored_ids}
+                )
+            await self.session.commit()
+            updated += len(scores)
+            logger.info(f"Backfilled grade scores up to id {after_id} ({updated} updated)")
+        return updated
+
     async def get_grades_for_student(self, student_id: int, days: int = 7) -> List[Grade]:
         from datetime import datetime, timedelta
         since = datetime.now() - timedelta(days=days)
@@ -152,152 +903,304 @@ class DatabaseService:
         result = await self.session.execute(select(Grade).where(Grade.id == grade_id))
         return result.scalar_one_or_none()
     
-    async def get_grades(self, skip: int = 0, limit: int = 100) -> List[Grade]:
-        result = await self.session.execute(select(Grade).offset(skip).limit(limit))
+    async def get_grades(self, skip: int = 0, limit: int = 100, cursor: Optional[str] = None,
+                         student_id: Optional[int] = None, since: Optional[datetime] = None,
+                         load: Sequence[str] = ()) -> List[Grade]:
+        query = self._with_profiles(select(Grade), Grade, load).where(*self._grade_filters(student_id, since))
+        result = await self.session.execute(self._paginate(query, Grade, skip, limit, cursor))
         return result.scalars().all()
+
+    async def count_grades(self, student_id: Optional[int] = None, since: Optional[datetime] = None) -> int:
+        return await self.count_rows(Grade, *self._grade_filters(student_id, since))
+
+    def _grade_filters(self, student_id: Optional[int] = None, since: Optional[datetime] = None) -> List:
+        filters = []
+        if student_id is not None:
+            filters.append(Grade.student_id == student_id)
+        if since is not None:
+            filters.append(Grade.date >= since)
+        return filters
     
     async def update_grade(self, grade_id: int, subject: Optional[str] = None, grade: Optional[str] = None, 
                           date = None, lesson_topic: Optional[str] = None) -> Optional[Grade]:
-        grade_obj = await self.get_grade_by_id(grade_id)
+        if date is not None:
+            await self._check_not_archived("grades", date)
+        rollup_keys = set()
+        if subject is not None or date is not None:
+            # The rollup key is moving: the old one has to be read before it is overwritten
+            old_key = (await self.session.execute(
+                select(Grade.student_id, Grade.subject, Grade.date).where(Grade.id == grade_id)
+            )).first()
+            if old_key is None:
+                return None
+            rollup_keys.add((old_key.student_id, old_key.subject, old_key.date.date()))
+        grade_obj = await self._update_returning(
+            Grade, grade_id, subject=subject, grade=grade, date=date, lesson_topic=lesson_topic,
+            # A new mark always replaces the score, with NULL for marks that have none
+            exact={"score": parse_grade(grade)} if grade is not None else None
+        )
         if not grade_obj:
             return None
-        if subject is not None:
-            grade_obj.subject = subject
-        if grade is not None:
-            grade_obj.grade = grade
-        if date is not None:
-            grade_obj.date = date
-        if lesson_topic is not None:
-            grade_obj.lesson_topic = lesson_topic
-        await self.session.commit()
-        await self.session.refresh(grade_obj)
+        rollup_keys.add((grade_obj.student_id, grade_obj.subject, grade_obj.date.date()))
+        await self._refresh_grade_rollups(rollup_keys)
+        await self._refresh_grade_trends({(student_id, subject) for student_id, subject, _ in rollup_keys})
+        await self._commit()
         return grade_obj
     
     async def delete_grade(self, grade_id: int) -> bool:
-        grade_obj = await self.get_grade_by_id(grade_id)
-        if not grade_obj:
+        deleted = await self._delete_returning(Grade, grade_id, Grade.student_id, Grade.subject, Grade.date)
+        if not deleted:
             return False
-        await self.session.delete(grade_obj)
-        await self.session.commit()
+        await self._refresh_grade_rollups({(deleted.student_id, deleted.subject, deleted.date.date())})
+        await self._refresh_grade_trends({(deleted.student_id, deleted.subject)})
+        await self._commit()
         return True
 
     # Lesson CRUD
     async def create_lesson(self, date, subject: str, class_name: str, teacher_id: int, topic: Optional[str] = None) -> Lesson:
-        lesson = Lesson(date=date, subject=subject, class_name=class_name, teacher_id=teacher_id, topic=topic)
-        self.session.add(lesson)
-        await self.session.commit()
-        await self.session.refresh(lesson)
+        lesson = await self._insert_returning(
+            Lesson, date=date, subject=subject, class_name=class_name, teacher_id=teacher_id, topic=topic
+        )
+        await self._commit()
         return lesson
     
     async def get_lesson_by_id(self, lesson_id: int) -> Optional[Lesson]:
-        result = await self.session.execute(select(Lesson).where(Lesson.id == lesson_id))
-        return result.scalar_one_or_none()
+        return await self._loaders[Lesson].load(lesson_id)
     
-    async def get_lessons(self, skip: int = 0, limit: int = 100) -> List[Lesson]:
-        result = await self.session.execute(select(Lesson).offset(skip).limit(limit))
+    async def get_lessons(self, skip: int = 0, limit: int = 100, cursor: Optional[str] = None,
+                          load: Sequence[str] = ()) -> List[Lesson]:
+        query = self._paginate(self._with_profiles(select(Lesson), Lesson, load), Lesson, skip, limit, cursor)
+        result = await self.session.execute(query)
         return result.scalars().all()
+
+    async def count_lessons(self) -> int:
+        return await self.count_rows(Lesson)
     
     async def update_lesson(self, lesson_id: int, date = None, subject: Optional[str] = None, 
                            class_name: Optional[str] = None, topic: Optional[str] = None) -> Optional[Lesson]:
-        lesson = await self.get_lesson_by_id(lesson_id)
-        if not lesson:
-            return None
-        if date is not None:
-            lesson.date = date
-        if subject is not None:
-            lesson.subject = subject
-        if class_name is not None:
-            lesson.class_name = class_name
-        if topic is not None:
-            lesson.topic = topic
-        await self.session.commit()
-        await self.session.refresh(lesson)
+        lesson = await self._update_returning(
+            Lesson, lesson_id, date=date, subject=subject, class_name=class_name, topic=topic
+        )
+        await self._commit()
         return lesson
     
     async def delete_lesson(self, lesson_id: int) -> bool:
-        lesson = await self.get_lesson_by_id(lesson_id)
-        if not lesson:
+        if not await self._delete_returning(Lesson, lesson_id):
             return False
-        await self.session.delete(lesson)
-        await self.session.commit()
+        await self._commit()
         return True
 
     # Attendance CRUD
-    async def mark_attendance(self, student_id: int, lesson_id: int, present: bool = True, date = None) -> Attendance:
-        from datetime import datetime as dt
-        if date is None:
-            date = dt.now()
-        attendance = Attendance(student_id=student_id, lesson_id=lesson_id, present=present, date=date)
-        self.session.add(attendance)
-        await self.session.commit()
-        await self.session.refresh(attendance)
-        return attendance
+    async def mark_attendance(self, student_id: int, lesson_id: int, present: bool = True) -> Optional[Attendance]:
+        """
+        Mark one student for a lesson. Same upsert as mark_lesson_attendance, so the
+        record always carries the lesson's date and repeated marks update it in place.
+        Returns None if the lesson does not exist.
+        """
+        records = await self.mark_lesson_attendance(lesson_id, {student_id: present})
+        return records[0] if records is not None else None
     
+    async def mark_lesson_attendance(self, lesson_id: int, attendance: Dict[int, bool]) -> Optional[List[Attendance]]:
+        """
+        Record the whole roster of a lesson as one upsert keyed on (student_id, lesson_id, date),
+        where date is always the lesson's date. Re-submitting only updates `present`,
+        so corrections are idempotent.
+        Returns None if the lesson does not exist.
+        """
+        lesson_date = (await self.session.execute(
+            select(Lesson.date).where(Lesson.id == lesson_id)
+        )).scalar_one_or_none()
+        if lesson_date is None:
+            return None
+        await self._check_not_archived("attendance", lesson_date)
+
+        rows = [
+            {"student_id": student_id, "lesson_id": lesson_id, "present": present, "date": lesson_date}
+            for student_id, present in attendance.items()
+        ]
+        stmt = self._upsert(Attendance).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Attendance.student_id, Attendance.lesson_id, Attendance.date],
+            set_={"present": stmt.excluded.present}
+        ).returning(Attendance).execution_options(populate_existing=True)
+        try:
+            result = await self.session.execute(stmt)
+            records = result.scalars().all()
+            await self._refresh_attendance_rollups({(a.student_id, a.date.date()) for a in records})
+            await self._commit()
+        except Exception:
+            await self._rollback()
+            raise
+        return sorted(records, key=lambda a: a.student_id)
+
+    async def upsert_attendance(self, records: List[Dict], batch_size: int = 1000) -> Tuple[List[Attendance], List[Dict]]:
+        """
+        Insert or update attendance keyed on (student_id, lesson_id), one
+        INSERT ... ON CONFLICT DO UPDATE per `batch_size` rows in a single transaction.
+        As in mark_lesson_attendance and mark_attendance the date is always the lesson's
+        date, so replays and marks from any of these paths hit the same
+        (student_id, lesson_id, date) key. Only changed `present` values
+        are rewritten; the last item wins for repeated keys. Unknown students or
+        lessons, and lessons in an archived term, are reported by index.
+        Returns (inserted or changed records, errors).
+        """
+        known_students = await self.get_users_by_ids(r["student_id"] for r in records)
+        known_lessons = await self.get_lessons_by_ids(r["lesson_id"] for r in records)
+        boundary = await self._archive_boundary("attendance")
+
+        errors = []
+        latest = {}
+        for index, r in enumerate(records):
+            if r["student_id"] not in known_students:
+                errors.append({"index": index, "detail": f"Student with ID {r['student_id']} not found"})
+            elif r["lesson_id"] not in known_lessons:
+                errors.append({"index": index, "detail": f"Lesson with ID {r['lesson_id']} not found"})
+            elif boundary and known_lessons[r["lesson_id"]].date < boundary:
+                errors.append({"index": index, "detail": str(ArchivedTermError("attendance", boundary.date()))})
+            else:
+                latest[(r["student_id"], r["lesson_id"])] = {
+                    "student_id": r["student_id"], "lesson_id": r["lesson_id"],
+                    "present": r.get("present", True), "date": known_lessons[r["lesson_id"]].date
+                }
+        if not latest:
+            return [], errors
+
+        try:
+            inserted, updated = await self._upsert_changed(
+                Attendance, list(latest.values()),
+                key=[Attendance.student_id, Attendance.lesson_id, Attendance.date],
+                update_columns=["present"],
+                batch_size=batch_size
+            )
+            changed = inserted + updated
+            await self._refresh_attendance_rollups({(a.student_id, a.date.date()) for a in changed})
+            await self._commit()
+        except Exception:
+            await self._rollback()
+            raise
+        return sorted(changed, key=lambda a: a.id), errors
+
     async def get_attendance_by_id(self, attendance_id: int) -> Optional[Attendance]:
         result = await self.session.execute(select(Attendance).where(Attendance.id == attendance_id))
         return result.scalar_one_or_none()
     
-    async def get_attendance_records(self, skip: int = 0, limit: int = 100) -> List[Attendance]:
-        result = await self.session.execute(select(Attendance).offset(skip).limit(limit))
+    async def get_attendance_records(self, skip: int = 0, limit: int = 100, cursor: Optional[str] = None,
+                                     load: Sequence[str] = ()) -> List[Attendance]:
+        query = self._paginate(self._with_profiles(select(Attendance), Attendance, load), Attendance, skip, limit, cursor)
+        result = await self.session.execute(query)
         return result.scalars().all()
+
+    async def count_attendance_records(self) -> int:
+        return await self.count_rows(Attendance)
     
     async def update_attendance(self, attendance_id: int, present: Optional[bool] = None) -> Optional[Attendance]:
-        attendance = await self.get_attendance_by_id(attendance_id)
+        attendance = await self._update_returning(Attendance, attendance_id, present=present)
         if not attendance:
             return None
-        if present is not None:
-            attendance.present = present
-        await self.session.commit()
-        await self.session.refresh(attendance)
+        await self._refresh_attendance_rollups({(attendance.student_id, attendance.date.date())})
+        await self._commit()
         return attendance
     
     async def delete_attendance(self, attendance_id: int) -> bool:
-        attendance = await self.get_attendance_by_id(attendance_id)
-        if not attendance:
+        deleted = await self._delete_returning(Attendance, attendance_id, Attendance.student_id, Attendance.date)
+        if not deleted:
             return False
-        await self.session.delete(attendance)
-        await self.session.commit()
+        await self._refresh_attendance_rollups({(deleted.student_id, deleted.date.date())})
+        await self._commit()
         return True
 
     # Homework CRUD
     async def create_homework(self, lesson_id: int, title: str, description: str, due_date, teacher_id: int) -> Homework:
-        homework = Homework(lesson_id=lesson_id, title=title, description=description, due_date=due_date, teacher_id=teacher_id)
-        self.session.add(homework)
-        await self.session.commit()
-        await self.session.refresh(homework)
+        homework = await self._insert_returning(
+            Homework, lesson_id=lesson_id, title=title, description=description, due_date=due_date, teacher_id=teacher_id
+        )
+        await self._commit()
         return homework
     
     async def get_homework_by_id(self, homework_id: int) -> Optional[Homework]:
-        result = await self.session.execute(select(Homework).where(Homework.id == homework_id))
-        return result.scalar_one_or_none()
+        return await self._loaders[Homework].load(homework_id)
     
-    async def get_homework_list(self, skip: int = 0, limit: int = 100) -> List[Homework]:
-        result = await self.session.execute(select(Homework).offset(skip).limit(limit))
+    async def get_homework_list(self, skip: int = 0, limit: int = 100, cursor: Optional[str] = None,
+                                load: Sequence[str] = ()) -> List[Homework]:
+        query = self._paginate(self._with_profiles(select(Homework), Homework, load), Homework, skip, limit, cursor)
+        result = await self.session.execute(query)
         return result.scalars().all()
+
+    async def count_homework(self) -> int:
+        return await self.count_rows(Homework)
     
     async def update_homework(self, homework_id: int, title: Optional[str] = None, 
                              description: Optional[str] = None, due_date = None) -> Optional[Homework]:
-        homework = await self.get_homework_by_id(homework_id)
-        if not homework:
-            return None
-        if title is not None:
-            homework.title = title
-        if description is not None:
-            homework.description = description
-        if due_date is not None:
-            homework.due_date = due_date
-        await self.session.commit()
-        await self.session.refresh(homework)
+        homework = await self._update_returning(
+            Homework, homework_id, title=title, description=description, due_date=due_date
+        )
+        await self._commit()
         return homework
     
     async def delete_homework(self, homework_id: int) -> bool:
-        homework = await self.get_homework_by_id(homework_id)
-        if not homework:
+        if not await self._delete_returning(Homework, homework_id):
             return False
-        await self.session.delete(homework)
-        await self.session.commit()
+        await self._commit()
         return True
 
+    # Streaming exports
+    def _export_query(self, kind: str):
+        """Return (query, date column, class column) for an export kind."""
+        if kind == "grades":
+            query = select(
+                Grade.id, Grade.student_id, Student.class_name, Grade.teacher_id, Grade.subject,
+                Grade.grade, Grade.score, Grade.date, Grade.lesson_topic
+            ).join(Student, Student.id == Grade.student_id)
+            return query.order_by(Grade.id), Grade.date, Student.class_name
+        if kind == "attendance":
+            query = select(
+                Attendance.id, Attendance.student_id, Attendance.lesson_id, Lesson.class_name,
+                Lesson.subject, Attendance.present, Attendance.date
+            ).join(Lesson, Lesson.id == Attendance.lesson_id)
+            return query.order_by(Attendance.id), Attendance.date, Lesson.class_name
+        if kind == "homework":
+            query = select(
+                Homework.id, Homework.lesson_id, Lesson.class_name, Lesson.subject, Homework.teacher_id,
+                Homework.title, Homework.description, Homework.due_date
+            ).join(Lesson, Lesson.id == Homework.lesson_id)
+            return query.order_by(Homework.id), Homework.due_date, Lesson.class_name
+        if kind == "submissions":
+            query = select(
+                HomeworkSubmission.id, HomeworkSubmission.homework_id, HomeworkSubmission.student_id,
+                Lesson.class_name, HomeworkSubmission.submitted_at, HomeworkSubmission.is_completed,
+                HomeworkSubmission.grade, HomeworkSubmission.feedback, HomeworkSubmission.content
+            ).join(Homework, Homework.id == HomeworkSubmission.homework_id).join(Lesson, Lesson.id == Homework.lesson_id)
+            return query.order_by(HomeworkSubmission.id), HomeworkSubmission.submitted_at, Lesson.class_name
+        raise ValueError(f"Unknown export: {kind}")
+
+    def export_columns(self, kind: str) -> List[str]:
+        query, _, _ = self._export_query(kind)
+        return [column.key for column in query.selected_columns]
+
+    async def stream_export(
+        self,
+        kind: str,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None,
+        class_name: Optional[str] = None,
+        batch_size: int = 1000
+    ) -> AsyncIterator[List[Dict]]:
+        """
+        Stream export rows in batches of plain dicts through a server-side cursor,
+        so memory use does not grow with the table size.
+        """
+        query, date_column, class_column = self._export_query(kind)
+        if date_from is not None:
+            query = query.where(date_column >= date_from)
+        if date_to is not None:
+            query = query.where(date_column < date_to)
+        if class_name is not None:
+            query = query.where(class_column == class_name)
+
+        result = await self.session.stream(query.execution_options(yield_per=batch_size))
+        async for rows in result.mappings().partitions():
+            yield [dict(row) for row in rows]
+
     # Analytics query methods
     async def get_grades_by_student(
         self, 
@@ -323,12 +1226,12 @@ class DatabaseService:
             return [
                 {
                     "id": g.id,
-                    "value": g.value,
+                    "value": g.score,
                     "date": g.date.isoformat() if g.date else None,
                     "subject": g.subject,
                     "student_id": g.student_id,
                     "teacher_id": g.teacher_id,
-                    "lesson_id": g.lesson_id
+                    "lesson_topic": g.lesson_topic
                 }
                 for g in grades
             ]
@@ -372,10 +1275,11 @@ class DatabaseService:
         student_id: int, 
         days: Optional[int] = None
     ) -> List[Dict]:
-        """Get homework assignments for a student"""
+        """Get homework assigned to the student's class (student_id is the user id, as in submissions)"""
         try:
-            # Join with lessons to get student's class homework
-            query = select(Homework).join(Lesson)
+            query = select(Homework).join(Lesson).join(
+                Student, and_(Student.class_name == Lesson.class_name, Student.user_id == student_id)
+            )
             
             if days:
                 cutoff_date = datetime.now() - timedelta(days=days)
@@ -400,6 +1304,197 @@ class DatabaseService:
             logger.error(f"Error getting homework for student {student_id}: {e}")
             return []
     
+    async def get_class_overview(self, class_names: List[str], days: int = 7) -> List[Dict]:
+        """
+        Per-student grade count, average score, last grade date and attendance rate
+        for every student in the given classes, computed in a single query over the
+        daily rollups.
+        """
+        cutoff_day = (datetime.now() - timedelta(days=days)).date()
+        class_students = select(Student.id).where(Student.class_name.in_(class_names))
+        class_users = select(Student.user_id).where(Student.class_name.in_(class_names))
+        
+        grade_stats = select(
+            StudentSubjectDaily.student_id,
+            func.sum(StudentSubjectDaily.grade_count).label("grade_count"),
+            (func.sum(StudentSubjectDaily.score_sum) / func.nullif(func.sum(StudentSubjectDaily.score_count), 0)).label("average_score"),
+            func.max(StudentSubjectDaily.day).label("last_grade_date")
+        ).where(
+            StudentSubjectDaily.student_id.in_(class_students),
+            StudentSubjectDaily.day >= cutoff_day
+        ).group_by(StudentSubjectDaily.student_id).subquery()
+        
+        # Attendance rows reference users.id rather than students.id
+        attendance_stats = select(
+            StudentAttendanceDaily.student_id,
+            func.sum(StudentAttendanceDaily.present_count + StudentAttendanceDaily.absent_count).label("lessons"),
+            func.sum(StudentAttendanceDaily.present_count).label("present")
+        ).where(
+            StudentAttendanceDaily.student_id.in_(class_users),
+            StudentAttendanceDaily.day >= cutoff_day
+        ).group_by(StudentAttendanceDaily.student_id).subquery()
+        
+        query = select(
+            Student.id,
+            Student.user_id,
+            Student.class_name,
+            grade_stats.c.grade_count,
+            grade_stats.c.average_score,
+            grade_stats.c.last_grade_date,
+            attendance_stats.c.lessons,
+            attendance_stats.c.present
+        ).outerjoin(
+            grade_stats, grade_stats.c.student_id == Student.id
+        ).outerjoin(
+            attendance_stats, attendance_stats.c.student_id == Student.user_id
+        ).where(
+            Student.class_name.in_(class_names)
+        ).order_by(Student.class_name, Student.id)
+        
+        result = await self.session.execute(query)
+        return [
+            {
+                "id": row.id,
+                "user_id": row.user_id,
+                "class_name": row.class_name,
+                "grade_count": row.grade_count or 0,
+                "average_score": round(row.average_score, 2) if row.average_score is not None else None,
+                "last_grade_date": row.last_grade_date.isoformat() if row.last_grade_date else None,
+                "attendance_rate": round(row.present / row.lessons * 100, 2) if row.lessons else None
+            }
+            for row in result.all()
+        ]
+    
+    async def get_subject_summary(self, student_id: int, days: int = 30) -> Dict[str, Dict]:
+        """Per-subject grade count, average, lowest and highest score from the daily rollups"""
+        cutoff_day = (datetime.now() - timedelta(days=days)).date()
+        query = select(
+            StudentSubjectDaily.subject,
+            func.sum(StudentSubjectDaily.grade_count).label("grade_count"),
+            (func.sum(StudentSubjectDaily.score_sum) / func.nullif(func.sum(StudentSubjectDaily.score_count), 0)).label("average"),
+            func.min(StudentSubjectDaily.score_min).label("lowest"),
+            func.max(StudentSubjectDaily.score_max).label("highest")
+        ).where(
+            StudentSubjectDaily.student_id == student_id,
+            StudentSubjectDaily.day >= cutoff_day
+        ).group_by(StudentSubjectDaily.subject).order_by(StudentSubjectDaily.subject)
+        
+        result = await self.session.execute(query)
+        return {
+            row.subject: {
+                "count": row.grade_count,
+                "average": round(row.average, 2) if row.average is not None else None,
+                "lowest": row.lowest,
+                "highest": row.highest
+            }
+            for row in result.all()
+        }
+    
+    async def load_grade_columns(
+        self,
+        since: datetime,
+        student_ids: Optional[List[int]] = None,
+        class_name: Optional[str] = None,
+        batch_size: int = 10000
+    ) -> GradeColumns:
+        """
+        (student_id, subject, date, score) of every grade since `since` as NumPy columns,
+        optionally for some students or one class, streamed in `batch_size` chunks.
+        """
+        query = select(Grade.student_id, Grade.subject, Grade.date, Grade.score).where(Grade.date >= since)
+        if student_ids is not None:
+            query = query.where(Grade.student_id.in_(student_ids))
+        if class_name is not None:
+            query = query.join(Student, Grade.student_id == Student.id).where(Student.class_name == class_name)
+        query = query.order_by(Grade.student_id, Grade.subject, Grade.date, Grade.id)
+
+        rows = []
+        result = await self.session.stream(query.execution_options(yield_per=batch_size))
+        async for chunk in result.partitions():
+            rows.extend(chunk)
+        return GradeColumns.from_rows(rows)
+
+    async def get_cohort_trends(
+        self,
+        days: int = 30,
+        student_ids: Optional[List[int]] = None,
+        class_name: Optional[str] = None
+    ) -> Dict[int, Dict[str, Dict]]:
+        """
+        Grade trends for every student x subject pair over the last `days`, computed by the
+        vectorized cohort engine from a single grades query: {student_id: {subject: stats}}.
+        """
+        # Whole days, as in get_grade_trends
+        since = datetime.combine((datetime.now() - timedelta(days=days)).date(), datetime.min.time())
+        columns = await self.load_grade_columns(since, student_ids=student_ids, class_name=class_name)
+        return compute_cohort(columns).by_student()
+
+    async def get_trend_state(self, student_id: int, subject: Optional[str] = None) -> Dict[str, Dict]:
+        """
+        All-time online statistics (count, mean, std dev, EWMA, recent scores, EWMA trend)
+        per subject for a student, read from student_subject_trend: {subject: stats}.
+        """
+        query = select(StudentSubjectTrend).where(StudentSubjectTrend.student_id == student_id)
+        if subject is not None:
+            query = query.where(StudentSubjectTrend.subject == subject)
+        # Trend rows are rewritten with Core statements, so loaded instances may be stale
+        result = await self.session.execute(
+            query.order_by(StudentSubjectTrend.subject).execution_options(populate_existing=True)
+        )
+        return {
+            row.subject: describe(row.subject, {column: getattr(row, column) for column in STATE_COLUMNS})
+            for row in result.scalars().all()
+        }
+
+    async def get_percentile_ranks(self, student: Student, term: Term) -> Dict[str, Dict]:
+        """
+        Where the student's term average in each subject ranks among the term averages of
+        their class, grade level (classes with the same leading number) and school, from the
+        class score sketches: {subject: {"average", "class", "grade_level", "school"}}, each
+        scope giving the percentile rank, student count and median.
+        """
+        in_term = [StudentSubjectDaily.day >= term.start, StudentSubjectDaily.day < term.end]
+        averages = (await self.session.execute(
+            select(
+                StudentSubjectDaily.subject,
+                (func.sum(StudentSubjectDaily.score_sum) / func.sum(StudentSubjectDaily.score_count)).label("average")
+            ).where(
+                StudentSubjectDaily.student_id == student.id, StudentSubjectDaily.score_count > 0, *in_term
+            ).group_by(StudentSubjectDaily.subject).order_by(StudentSubjectDaily.subject)
+        )).all()
+        if not averages:
+            return {}
+
+        result = await self.session.execute(
+            select(ClassSubjectSketch.class_name, ClassSubjectSketch.subject, ClassSubjectSketch.bin,
+                   ClassSubjectSketch.count)
+            .where(ClassSubjectSketch.term_start == term.start,
+                   ClassSubjectSketch.subject.in_([row.subject for row in averages]))
+        )
+        level = grade_level(student.class_name)
+        scopes = {
+            "class": lambda class_name: class_name == student.class_name,
+            "grade_level": lambda class_name: level is not None and grade_level(class_name) == level,
+            "school": lambda class_name: True,
+        }
+        bins: Dict[Tuple[str, str], List[Tuple[int, int]]] = {}
+        for row in result.all():
+            for scope, includes in scopes.items():
+                if includes(row.class_name):
+                    bins.setdefault((row.subject, scope), []).append((row.bin, row.count))
+
+        ranks = {}
+        for row in averages:
+            ranks[row.subject] = {"average": round(row.average, 2)}
+            for scope in scopes:
+                sketch = ScoreSketch.from_bins(bins.get((row.subject, scope), []))
+                ranks[row.subject][scope] = {
+                    "percentile": sketch.percentile_rank(row.average),
+                    "students": sketch.total,
+                    "median": sketch.quantile(0.5),
+                }
+        return ranks
+
     async def get_grade_trends(
         self, 
         student_id: int, 
@@ -408,9 +1503,38 @@ class DatabaseService:
     ) -> Dict:
         """Analyze grade trends for a student in a subject"""
         try:
-            grades = await self.get_grades_by_student(student_id, days, subject)
+            cutoff_day = (datetime.now() - timedelta(days=days)).date()
             
-            if not grades:
+            # Daily rollups with a running grade count, so the halves split happens at day boundaries
+            daily = select(
+                StudentSubjectDaily.score_count,
+                StudentSubjectDaily.score_sum,
+                StudentSubjectDaily.score_min,
+                StudentSubjectDaily.score_max,
+                func.sum(StudentSubjectDaily.score_count).over(order_by=StudentSubjectDaily.day).label("running"),
+                func.sum(StudentSubjectDaily.score_count).over().label("n")
+            ).where(
+                StudentSubjectDaily.student_id == student_id,
+                StudentSubjectDaily.subject == subject,
+                StudentSubjectDaily.day >= cutoff_day,
+                StudentSubjectDaily.score_count > 0
+            ).subquery()
+            
+            # First half: days whose grades all fall within the older floor(n/2) grades
+            first_half = 2 * daily.c.running <= daily.c.n
+            query = select(
+                func.sum(daily.c.score_count).label("total"),
+                (func.sum(daily.c.score_sum) / func.sum(daily.c.score_count)).label("average"),
+                func.min(daily.c.score_min).label("lowest"),
+                func.max(daily.c.score_max).label("highest"),
+                (func.sum(daily.c.score_sum).filter(first_half)
+                 / func.sum(daily.c.score_count).filter(first_half)).label("first_half_avg"),
+                (func.sum(daily.c.score_sum).filter(~first_half)
+                 / func.sum(daily.c.score_count).filter(~first_half)).label("second_half_avg")
+            )
+            row = (await self.session.execute(query)).one()
+            
+            if not row.total:
                 return {
                     "subject": subject,
                     "average": 0,
@@ -418,18 +1542,19 @@ class DatabaseService:
                     "count": 0
                 }
             
-            values = [g["value"] for g in grades]
-            average = sum(values) / len(values)
+            latest = (await self.session.execute(
+                select(Grade.score).where(
+                    Grade.student_id == student_id,
+                    Grade.subject == subject,
+                    Grade.score.is_not(None)
+                ).order_by(Grade.date.desc(), Grade.id.desc()).limit(1)
+            )).scalar_one_or_none()
             
-            # Calculate trend (compare first half vs second half)
-            mid = len(values) // 2
-            if mid > 0:
-                first_half_avg = sum(values[:mid]) / mid
-                second_half_avg = sum(values[mid:]) / (len(values) - mid)
-                
-                if second_half_avg > first_half_avg + 0.5:
+            # Calculate trend (compare older half vs newer half), same rule as the cohort engine
+            if row.first_half_avg is not None and row.second_half_avg is not None:
+                if row.second_half_avg > row.first_half_avg + TREND_THRESHOLD:
                     trend = "improving"
-                elif second_half_avg < first_half_avg - 0.5:
+                elif row.second_half_avg < row.first_half_avg - TREND_THRESHOLD:
                     trend = "declining"
                 else:
                     trend = "stable"
@@ -438,12 +1563,12 @@ class DatabaseService:
             
             return {
                 "subject": subject,
-                "average": round(average, 2),
+                "average": round(row.average, 2),
                 "trend": trend,
-                "count": len(grades),
-                "latest_grade": values[0] if values else None,
-                "highest_grade": max(values) if values else None,
-                "lowest_grade": min(values) if values else None
+                "count": row.total,
+                "latest_grade": latest,
+                "highest_grade": row.highest,
+                "lowest_grade": row.lowest
             }
         except Exception as e:
             logger.error(f"Error analyzing grade trends: {e}")
@@ -461,9 +1586,17 @@ class DatabaseService:
     ) -> Dict:
         """Calculate attendance statistics for a student"""
         try:
-            records = await self.get_attendance_by_student(student_id, days)
+            cutoff_day = (datetime.now() - timedelta(days=days)).date()
+            query = select(
+                func.sum(StudentAttendanceDaily.present_count).label("present"),
+                func.sum(StudentAttendanceDaily.absent_count).label("absent")
+            ).where(
+                StudentAttendanceDaily.student_id == student_id,
+                StudentAttendanceDaily.day >= cutoff_day
+            )
+            row = (await self.session.execute(query)).one()
             
-            if not records:
+            if not row.present and not row.absent:
                 return {
                     "total_lessons": 0,
                     "present_count": 0,
@@ -471,14 +1604,14 @@ class DatabaseService:
                     "attendance_rate": 0
                 }
             
-            present_count = sum(1 for r in records if r["present"])
-            total_lessons = len(records)
-            attendance_rate = (present_count / total_lessons * 100) if total_lessons > 0 else 0
+            present_count = row.present
+            total_lessons = row.present + row.absent
+            attendance_rate = present_count / total_lessons * 100
             
             return {
                 "total_lessons": total_lessons,
                 "present_count": present_count,
-                "absent_count": total_lessons - present_count,
+                "absent_count": row.absent,
                 "attendance_rate": round(attendance_rate, 2)
             }
         except Exception as e:
@@ -490,65 +1623,251 @@ class DatabaseService:
                 "attendance_rate": 0
             }
     
+    async def get_attendance_heatmap(
+        self,
+        term: Term,
+        student_id: Optional[int] = None,
+        class_name: Optional[str] = None
+    ) -> List[Dict]:
+        """
+        Attendance within `term` bucketed by the lesson's weekday and hour, for one student
+        (user id, as in attendance) or for the lessons of one class, from one grouped query.
+        Results are cached per term: for HEATMAP_CACHE_SECONDS while the term is still open,
+        until evicted once it has ended.
+        """
+        key = ("student", student_id, term.start) if student_id is not None else ("class", class_name, term.start)
+        cells = heatmap_cache.get(key)
+        if cells is not None:
+            return cells
+
+        weekday = extract("dow", Lesson.date)  # 0 = Sunday on Postgres and SQLite
+        hour = extract("hour", Lesson.date)
+        criteria = [
+            Attendance.date >= datetime.combine(term.start, datetime.min.time()),
+            Attendance.date < datetime.combine(term.end, datetime.min.time())
+        ]
+        if student_id is not None:
+            criteria.append(Attendance.student_id == student_id)
+        else:
+            criteria.append(Lesson.class_name == class_name)
+        query = select(
+            weekday.label("weekday"),
+            hour.label("hour"),
+            func.count(Attendance.id).label("marked"),
+            func.count(Attendance.id).filter(Attendance.present.is_not(True)).label("absences")
+        ).join(Lesson, Attendance.lesson_id == Lesson.id).where(*criteria).group_by(weekday, hour)
+        rows = (await self.session.execute(query)).all()
+
+        cells = []
+        for row in rows:
+            iso_weekday = int(row.weekday) or 7
+            cells.append({
+                "weekday": iso_weekday,
+                "weekday_name": calendar.day_name[iso_weekday - 1],
+                "hour": int(row.hour),
+                "marked": row.marked,
+                "absences": row.absences,
+                "absence_rate": round(row.absences / row.marked * 100, 2)
+            })
+        cells.sort(key=lambda cell: (cell["weekday"], cell["hour"]))
+
+        ended = term.end <= datetime.now().date()
+        heatmap_cache.set(key, cells, ttl=None if ended else settings.HEATMAP_CACHE_SECONDS)
+        return cells
+
     async def get_homework_completion_rate(
         self, 
         student_id: int, 
         days: int = 30
     ) -> Dict:
-        """Calculate homework completion rate for a student"""
+        """
+        Calculate homework completion rate for a student over their class's homework
+        (student_id is the user id, as in homework_submissions)
+        """
         try:
-            # Get homework assigned in the period
-            cutoff_date = datetime.now() - timedelta(days=days)
-            
-            query = select(Homework).join(Lesson).where(
-                Homework.due_date >= cutoff_date
-            )
-            result = await self.session.execute(query)
-            homework_list = result.scalars().all()
+            query = self._homework_completion_query(days).where(Student.user_id == student_id)
+            row = (await self.session.execute(query)).first()
             
-            if not homework_list:
+            if row is None or not row.total:
                 return {
                     "total_assignments": 0,
                     "completed_count": 0,
                     "completion_rate": 0,
+                    "pending_count": 0,
                     "overdue_count": 0
                 }
             
-            total_assignments = len(homework_list)
-            
-            # Get submissions for this student
-            submission_query = select(HomeworkSubmission).where(
-                and_(
-                    HomeworkSubmission.student_id == student_id,
-                    HomeworkSubmission.homework_id.in_([h.id for h in homework_list])
-                )
-            )
-            submission_result = await self.session.execute(submission_query)
-            submissions = submission_result.scalars().all()
-            
-            completed_count = sum(1 for s in submissions if s.is_completed)
-            
-            # Count overdue assignments
-            now = datetime.now()
-            submitted_ids = {s.homework_id for s in submissions if s.is_completed}
-            overdue_count = sum(
-                1 for h in homework_list 
-                if h.due_date < now and h.id not in submitted_ids
-            )
-            
-            completion_rate = (completed_count / total_assignments * 100) if total_assignments > 0 else 0
-            
-            return {
-                "total_assignments": total_assignments,
-                "completed_count": completed_count,
-                "completion_rate": round(completion_rate, 2),
-                "overdue_count": overdue_count
-            }
+            return self._homework_completion_stats(row)
         except Exception as e:
             logger.error(f"Error calculating homework completion: {e}")
             return {
                 "total_assignments": 0,
                 "completed_count": 0,
                 "completion_rate": 0,
+                "pending_count": 0,
                 "overdue_count": 0
             }
+
+    async def get_class_homework_completion(self, class_name: str, days: int = 30) -> List[Dict]:
+        """Homework completion stats for every student in a class, from one grouped query"""
+        query = self._homework_completion_query(days).where(Student.class_name == class_name)
+        rows = (await self.session.execute(query.order_by(Student.id))).all()
+        return [
+            {"id": row.id, "user_id": row.user_id, **self._homework_completion_stats(row)}
+            for row in rows
+        ]
+
+    def _homework_completion_query(self, days: int):
+        """
+        Per-student total/completed/overdue counts over the homework of the student's class
+        due since `days` ago: one LEFT JOIN to the student's completed submissions.
+        """
+        now = datetime.now()
+        class_homework = select(Homework.id, Homework.due_date, Lesson.class_name).join(Lesson).where(
+            Homework.due_date >= now - timedelta(days=days)
+        ).subquery()
+        done = and_(
+            HomeworkSubmission.homework_id == class_homework.c.id,
+            HomeworkSubmission.student_id == Student.user_id,
+            HomeworkSubmission.is_completed.is_(True)
+        )
+        # Several completed submissions for one homework still count it once
+        homework_id = func.count(class_homework.c.id.distinct())
+        return select(
+            Student.id,
+            Student.user_id,
+            homework_id.label("total"),
+            homework_id.filter(HomeworkSubmission.id.is_not(None)).label("completed"),
+            homework_id.filter(and_(HomeworkSubmission.id.is_(None), class_homework.c.due_date < now)).label("overdue")
+        ).select_from(Student).outerjoin(
+            class_homework, class_homework.c.class_name == Student.class_name
+        ).outerjoin(HomeworkSubmission, done).group_by(Student.id, Student.user_id)
+
+    def _homework_completion_stats(self, row) -> Dict:
+        return {
+            "total_assignments": row.total,
+            "completed_count": row.completed,
+            "completion_rate": round(row.completed / row.total * 100, 2) if row.total else 0,
+            "pending_count": row.total - row.completed - row.overdue,
+            "overdue_count": row.overdue
+        }
+
+    # Early-warning risk
+    async def _load_risk_signals(self, students) -> RiskSignals:
+        """School-wide risk signals (see app.services.risk) for `students` (rows sorted by id)."""
+        now = datetime.now()
+        size = len(students)
+        student_ids = np.array([s.id for s in students], dtype=np.int64)
+        index_by_user = {s.user_id: i for i, s in enumerate(students)}
+
+        stats = compute_cohort(await self.load_grade_columns(now - timedelta(days=GRADE_WINDOW_DAYS)))
+        grade_slope = mean_slope_per_student(stats, student_ids)
+
+        recent_day = (now - timedelta(days=ATTENDANCE_RECENT_DAYS)).date()
+        prior_day = (now - timedelta(days=ATTENDANCE_RECENT_DAYS + ATTENDANCE_PRIOR_DAYS)).date()
+        is_recent = StudentAttendanceDaily.day >= recent_day
+        attendance = (await self.session.execute(
+            select(
+                StudentAttendanceDaily.student_id,
+                func.sum(StudentAttendanceDaily.present_count).filter(is_recent).label("recent_present"),
+                func.sum(StudentAttendanceDaily.present_count + StudentAttendanceDaily.absent_count)
+                .filter(is_recent).label("recent_marked"),
+                func.sum(StudentAttendanceDaily.present_count).filter(~is_recent).label("prior_present"),
+                func.sum(StudentAttendanceDaily.present_count + StudentAttendanceDaily.absent_count)
+                .filter(~is_recent).label("prior_marked")
+            ).where(StudentAttendanceDaily.day >= prior_day).group_by(StudentAttendanceDaily.student_id)
+        )).all()
+        counts = np.zeros((4, size))
+        for row in attendance:
+            index = index_by_user.get(row.student_id)
+            if index is not None:
+                counts[:, index] = [row.recent_present or 0, row.recent_marked or 0,
+                                    row.prior_present or 0, row.prior_marked or 0]
+        recent_rate = np.full(size, np.nan)
+        prior_rate = np.full(size, np.nan)
+        np.divide(100 * counts[0], counts[1], out=recent_rate, where=counts[1] > 0)
+        np.divide(100 * counts[2], counts[3], out=prior_rate, where=counts[3] > 0)
+
+        overdue = np.zeros(size)
+        homework = (await self.session.execute(self._homework_completion_query(HOMEWORK_WINDOW_DAYS))).all()
+        for row in homework:
+            overdue[np.searchsorted(student_ids, row.id)] = row.overdue
+
+        # One entry per (student, past lesson of their class), newest first
+        graded = select(Grade.id).where(
+            Grade.student_id == Student.id, Grade.subject == Lesson.subject, GRADE_DAY == func.date(Lesson.date, type_=Date)
+        ).exists()
+        result = await self.session.stream(
+            select(Student.id, graded.label("graded"))
+            .join(Lesson, Lesson.class_name == Student.class_name)
+            .where(Lesson.date >= now - timedelta(days=STREAK_WINDOW_DAYS), Lesson.date <= now)
+            .order_by(Student.id, Lesson.date.desc(), Lesson.id.desc())
+            .execution_options(yield_per=10000)
+        )
+        lesson_student = []
+        lesson_graded = []
+        async for chunk in result.partitions():
+            lesson_student.extend(row.id for row in chunk)
+            lesson_graded.extend(bool(row.graded) for row in chunk)
+        streaks = missing_grade_streaks(
+            np.searchsorted(student_ids, np.array(lesson_student, dtype=np.int64)),
+            np.array(lesson_graded, dtype=bool), size
+        )
+
+        return RiskSignals(grade_slope, recent_rate, prior_rate - recent_rate, overdue, streaks)
+
+    async def refresh_student_risk(self) -> int:
+        """
+        Score every student (see app.services.risk) and replace the student_risk table in one
+        transaction. Returns the number of students scored.
+        """
+        students = (await self.session.execute(
+            select(Student.id, Student.user_id, Student.class_name).order_by(Student.id)
+        )).all()
+        signals = await self._load_risk_signals(students)
+        score, rank = score_risk(signals)
+        computed_at = datetime.now()
+
+        def optional(value: float) -> Optional[float]:
+            return None if np.isnan(value) else round(float(value), 4)
+
+        rows = [
+            {
+                "student_id": student.id, "user_id": student.user_id, "class_name": student.class_name,
+                "rank": int(rank[i]), "score": round(float(score[i]), 4),
+                "grade_slope": optional(signals.grade_slope[i]),
+                "attendance_rate": optional(signals.attendance_rate[i]),
+                "attendance_drop": optional(signals.attendance_drop[i]),
+                "overdue_count": int(signals.overdue_count[i]),
+                "missing_grade_streak": int(signals.missing_grade_streak[i]),
+                "computed_at": computed_at,
+            }
+            for i, student in enumerate(students)
+        ]
+        try:
+            await self.session.execute(delete(StudentRisk))
+            if rows:
+                await self.session.execute(insert(StudentRisk), rows)
+            await self._commit()
+        except Exception:
+            await self._rollback()
+            raise
+        return len(rows)
+
+    async def get_student_risk(
+        self,
+        limit: Optional[int] = 50,
+        class_name: Optional[str] = None,
+        min_score: Optional[float] = None
+    ) -> List[StudentRisk]:
+        """Rows of the last risk run, highest risk first (all of them with `limit=None`)."""
+        query = select(StudentRisk)
+        if class_name is not None:
+            query = query.where(StudentRisk.class_name == class_name)
+        if min_score is not None:
+            query = query.where(StudentRisk.score >= min_score)
+        query = query.order_by(StudentRisk.rank)
+        if limit is not None:
+            query = query.limit(limit)
+        result = await self.session.execute(query)
+        return result.scalars().all()
@@ -0,0 +1,48 @@
+import re
+from functools import lru_cache
+from typing import Optional
+from app.core.config import settings
+
+# Supported grading scales: (lowest, highest, allows +/- modifiers)
+GRADING_SCALES = {
+    "five_point": (1.0, 5.0, True),
+    "ten_point": (1.0, 10.0, True),
+    "percent": (0.0, 100.0, False),
+}
+
+# How much a "+" or "-" modifier moves a mark, e.g. "4+" -> 4.25
+MODIFIER_STEP = 0.25
+
+_MARK_PATTERN = re.compile(r"^(\d+(?:[.,]\d+)?)\s*(%|\+|-)?$")
+
+
+@lru_cache(maxsize=4096)
+def parse_grade(mark: Optional[str], scale: Optional[str] = None) -> Optional[float]:
+    """
+    Convert a mark string such as "5", "4+", "7-" or "85%" into a numeric score
+    on the given scale (defaults to settings.GRADING_SCALE).
+    Returns None for marks that are not numeric or fall outside the scale.
+    """
+    if mark is None:
+        return None
+    scale = scale or settings.GRADING_SCALE
+    if scale not in GRADING_SCALES:
+        raise ValueError(f"Unknown grading scale: {scale}")
+    lowest, highest, allows_modifiers = GRADING_SCALES[scale]
+
+    match = _MARK_PATTERN.match(mark.strip())
+    if not match:
+        return None
+    value = float(match.group(1).replace(",", "."))
+    suffix = match.group(2)
+
+    if value < lowest or value > highest:
+        return None
+    if suffix == "%":
+        return value if scale == "percent" else None
+    if suffix:
+        if not allows_modifiers:
+            return None
+        value += MODIFIER_STEP if suffix == "+" else -MODIFIER_STEP
+        value = min(max(value, lowest), highest)
+    return value
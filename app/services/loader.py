@@ -0,0 +1,68 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, List, Optional
+
+
+class BatchLoader:
+    """
+    Request-scoped DataLoader. load() calls made in the same event-loop tick are
+    resolved together by a single `batch_fn(keys) -> {key: value}` call, and each
+    key is fetched at most once per loader (missing keys resolve to None).
+
+    The batch runs in its own task, so callers sharing one AsyncSession must not
+    use the session concurrently with pending loads.
+    """
+
+    def __init__(self, batch_fn: Callable[[List[Hashable]], Awaitable[Dict[Hashable, Any]]]):
+        self._batch_fn = batch_fn
+        self._cache: Dict[Hashable, asyncio.Future] = {}
+        self._queue: List[Hashable] = []
+        self._dispatch_task: Optional[asyncio.Task] = None
+
+    async def load(self, key: Hashable) -> Any:
+        future = self._cache.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = self._cache[key] = loop.create_future()
+            self._queue.append(key)
+            if len(self._queue) == 1:
+                self._dispatch_task = loop.create_task(self._dispatch())
+        # Shielded so one cancelled caller does not cancel the lookup for the others
+        return await asyncio.shield(future)
+
+    async def load_many(self, keys: Iterable[Hashable]) -> List[Any]:
+        return list(await asyncio.gather(*(self.load(key) for key in keys)))
+
+    def prime(self, key: Hashable, value: Any):
+        """Store a known value (e.g. a row just written) without querying."""
+        future = self._cache.get(key)
+        if future is not None and not future.done():
+            return
+        future = asyncio.get_running_loop().create_future()
+        future.set_result(value)
+        self._cache[key] = future
+
+    def clear(self, key: Optional[Hashable] = None):
+        """Forget one key, or everything when no key is given."""
+        if key is None:
+            self._cache = {key: f for key, f in self._cache.items() if not f.done()}
+        else:
+            future = self._cache.get(key)
+            if future is not None and future.done():
+                del self._cache[key]
+
+    async def _dispatch(self):
+        keys, self._queue = self._queue, []
+        futures = [(key, self._cache[key]) for key in keys]
+        try:
+            values = await self._batch_fn(keys)
+        except Exception as e:
+            for key, future in futures:
+                # Failures are not memoized; the next load() retries
+                if self._cache.get(key) is future:
+                    del self._cache[key]
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for key, future in futures:
+            if not future.done():
+                future.set_result(values.get(key))
@@ -0,0 +1,179 @@
+"""
+Term partitions for the grades and attendance tables (Postgres only).
+
+Both tables are range-partitioned on `date`, one partition per academic term
+(see app.core.terms) plus a DEFAULT partition that catches out-of-range dates.
+Queries with a date range only scan the partitions for those terms.
+"""
+import logging
+import os
+import re
+from datetime import date
+from typing import List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.core.database import Base
+from app.core.terms import Term, term_for, following_terms
+
+logger = logging.getLogger(__name__)
+
+PARTITIONED_TABLES = ("grades", "attendance")
+
+_BOUND_PATTERN = re.compile(r"FROM \('([^']+)'\) TO \('([^']+)'\)")
+
+
+class Partition(NamedTuple):
+    name: str
+    start: Optional[date]  # None for the DEFAULT partition
+    end: Optional[date]
+
+
+def partition_name(table: str, term: Term) -> str:
+    return f"{table}_{term.label}"
+
+
+def default_partition_name(table: str) -> str:
+    return f"{table}_default"
+
+
+def create_partition_sql(table: str, term: Term) -> List[str]:
+    """
+    Statements creating and attaching the partition for `term`. Rows that were
+    written to the DEFAULT partition before it existed are moved into it first.
+    """
+    name = partition_name(table, term)
+    start, end = term.start.isoformat(), term.end.isoformat()
+    return [
+        f"CREATE TABLE {name} (LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)",
+        f"WITH moved AS (DELETE FROM {default_partition_name(table)} "
+        f"WHERE date >= '{start}' AND date < '{end}' RETURNING *) "
+        f"INSERT INTO {name} SELECT * FROM moved",
+        f"ALTER TABLE {table} ATTACH PARTITION {name} FOR VALUES FROM ('{start}') TO ('{end}')",
+    ]
+
+
+def is_postgres(session) -> bool:
+    return session.get_bind().dialect.name == "postgresql"
+
+
+async def list_partitions(session, table: str) -> List[Partition]:
+    """Partitions currently attached to `table`, oldest first (DEFAULT last)."""
+    result = await session.execute(
+        text(
+            "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid WHERE i.inhparent = CAST(:table AS regclass)"
+        ),
+        {"table": table}
+    )
+    partitions = []
+    for name, bound in result.all():
+        match = _BOUND_PATTERN.search(bound)
+        if match:
+            start, end = (date.fromisoformat(value[:10]) for value in match.groups())
+            partitions.append(Partition(name, start, end))
+        else:
+            partitions.append(Partition(name, None, None))
+    return sorted(partitions, key=lambda p: (p.start is None, p.start))
+
+
+async def ensure_term_partitions(session, today: Optional[date] = None, ahead: Optional[int] = None) -> List[str]:
+    """
+    Create any missing partitions from the current term through `ahead` terms later
+    (settings.PARTITION_TERMS_AHEAD). Returns the names of the partitions created.
+    """
+    if not is_postgres(session):
+        return []
+    current = term_for(today or date.today())
+    terms = [current] + following_terms(current, settings.PARTITION_TERMS_AHEAD if ahead is None else ahead)
+
+    created = []
+    for table in PARTITIONED_TABLES:
+        existing = {p.name for p in await list_partitions(session, table)}
+        for term in terms:
+            name = partition_name(table, term)
+            if name in existing:
+                continue
+            for statement in create_partition_sql(table, term):
+                await session.execute(text(statement))
+            created.append(name)
+            logger.info(f"Created partition {name} for {term.start} - {term.end}")
+    await session.commit()
+    return created
+
+
+def _arrow_schema(table: str):
+    """Parquet schema matching the model's column types."""
+    import pyarrow as pa
+    from sqlalchemy import Boolean, DateTime, Float, Integer
+
+    fields = []
+    for column in Base.metadata.tables[table].columns:
+        if isinstance(column.type, Boolean):
+            arrow_type = pa.bool_()
+        elif isinstance(column.type, Integer):
+            arrow_type = pa.int64()
+        elif isinstance(column.type, Float):
+            arrow_type = pa.float64()
+        elif isinstance(column.type, DateTime):
+            arrow_type = pa.timestamp("us")
+        else:
+            arrow_type = pa.string()
+        fields.append(pa.field(column.name, arrow_type, nullable=column.nullable))
+    return pa.schema(fields)
+
+
+async def archive_partition(
+    session,
+    table: str,
+    partition: Partition,
+    output_dir: str,
+    drop: bool = False,
+    batch_size: int = 10000
+) -> Tuple[str, int]:
+    """
+    Export a closed term partition to a zstd-compressed Parquet file, then detach it
+    from `table` (and drop it if `drop`). Daily rollups are left in place, so history
+    stays available to analytics. Returns (file path, row count).
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise RuntimeError("Archiving partitions requires pyarrow (pip install pyarrow)") from e
+
+    schema = _arrow_schema(table)
+    path = os.path.join(output_dir, f"{partition.name}.parquet")
+    partial_path = path + ".partial"
+    rows_written = 0
+
+    result = await session.stream(
+        text(f"SELECT {', '.join(schema.names)} FROM {partition.name} ORDER BY id")
+        .execution_options(yield_per=batch_size)
+    )
+    with pq.ParquetWriter(partial_path, schema, compression="zstd") as writer:
+        async for rows in result.mappings().partitions():
+            writer.write_table(pa.Table.from_pylist([dict(row) for row in rows], schema=schema))
+            rows_written += len(rows)
+
+    expected = (await session.execute(text(f"SELECT count(*) FROM {partition.name}"))).scalar_one()
+    if rows_written != expected:
+        os.remove(partial_path)
+        raise RuntimeError(f"Exported {rows_written} of {expected} rows from {partition.name}")
+    os.replace(partial_path, path)
+
+    await session.execute(text(f"ALTER TABLE {table} DETACH PARTITION {partition.name}"))
+    if drop:
+        await session.execute(text(f"DROP TABLE {partition.name}"))
+    await session.commit()
+    logger.info(f"Archived {rows_written} rows from {partition.name} to {path}")
+    return path, rows_written
+
+
+async def closed_partitions(session, table: str, before: date) -> List[Partition]:
+    """Term partitions of `table` that end on or before `before`."""
+    return [
+        p for p in await list_partitions(session, table)
+        if p.end is not None and p.end <= before
+    ]
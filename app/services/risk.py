@@ -0,0 +1,106 @@
+"""
+Early-warning risk scores for every student at once.
+
+Each signal is turned into a school-wide z-score oriented so that higher means
+riskier; a student's score is the weighted sum of the positive parts, so being
+unusually good on one signal does not hide a problem on another. Students are
+ranked by score (1 = highest risk). All steps are array operations over the
+whole school; see DatabaseService.refresh_student_risk for the inputs.
+"""
+from typing import Dict, NamedTuple
+
+import numpy as np
+
+from app.services.cohort import CohortStats
+
+GRADE_WINDOW_DAYS = 30  # grade slopes over this window
+ATTENDANCE_RECENT_DAYS = 7  # recent attendance rate ...
+ATTENDANCE_PRIOR_DAYS = 28  # ... compared with the rate over the days before it
+HOMEWORK_WINDOW_DAYS = 7  # overdue homework due within this window
+STREAK_WINDOW_DAYS = 30  # missing-grade streaks over the class's lessons in this window
+
+# Alert thresholds, shared with AnalysisService's per-student analyses
+ATTENDANCE_ALERT_RATE = 75  # alert below this recent attendance %
+OVERDUE_ALERT_COUNT = 2  # alert above this many overdue assignments
+
+# Weight of each signal's z-score, and its direction (+1: higher values are riskier)
+RISK_WEIGHTS: Dict[str, float] = {
+    "grade_slope": 1.0,
+    "attendance_drop": 1.0,
+    "overdue_count": 1.0,
+    "missing_grade_streak": 1.0,
+}
+RISK_DIRECTION: Dict[str, int] = {
+    "grade_slope": -1,
+    "attendance_drop": 1,
+    "overdue_count": 1,
+    "missing_grade_streak": 1,
+}
+
+
+class RiskSignals(NamedTuple):
+    """One entry per student, aligned with the students array. NaN means no data."""
+    grade_slope: np.ndarray  # mean score change per day across subjects, weighted by grade count
+    attendance_rate: np.ndarray  # % present over the recent window
+    attendance_drop: np.ndarray  # prior window rate - recent rate, in percentage points
+    overdue_count: np.ndarray
+    missing_grade_streak: np.ndarray  # latest class lessons in a row without a grade for the student
+
+
+def zscores(values: np.ndarray) -> np.ndarray:
+    """Z-scores over the non-NaN entries; NaN entries and constant signals score 0."""
+    known = ~np.isnan(values)
+    out = np.zeros(len(values))
+    if known.sum() < 2:
+        return out
+    std = values[known].std()
+    if std > 0:
+        out[known] = (values[known] - values[known].mean()) / std
+    return out
+
+
+def score_risk(signals: RiskSignals):
+    """(score, rank) arrays: weighted sum of positive risk z-scores, and 1-based rank by score."""
+    size = len(signals.grade_slope)
+    score = np.zeros(size)
+    for name, weight in RISK_WEIGHTS.items():
+        score += weight * np.clip(RISK_DIRECTION[name] * zscores(getattr(signals, name)), 0, None)
+    # Ties keep student order
+    order = np.lexsort((np.arange(size), -score))
+    rank = np.empty(size, dtype=np.int64)
+    rank[order] = np.arange(1, size + 1)
+    return score, rank
+
+
+def mean_slope_per_student(stats: CohortStats, student_ids: np.ndarray) -> np.ndarray:
+    """Grade-count-weighted mean of each student's per-subject slopes; `student_ids` must be sorted."""
+    index = np.searchsorted(student_ids, stats.student_id)
+    valid = ~np.isnan(stats.slope) & (index < len(student_ids))
+    valid[valid] &= student_ids[index[valid]] == stats.student_id[valid]
+    weight = np.where(valid, stats.count, 0).astype(np.float64)
+    total = np.bincount(index[valid], weights=(stats.slope * weight)[valid], minlength=len(student_ids))
+    weights = np.bincount(index[valid], weights=weight[valid], minlength=len(student_ids))
+    out = np.full(len(student_ids), np.nan)
+    np.divide(total, weights, out=out, where=weights > 0)
+    return out
+
+
+def missing_grade_streaks(student_index: np.ndarray, graded: np.ndarray, size: int) -> np.ndarray:
+    """
+    Per student, the number of their class's latest lessons in a row without a grade.
+    Entries are one per (student, lesson), sorted by student and then newest lesson first.
+    """
+    streaks = np.zeros(size)
+    if not len(student_index):
+        return streaks
+    new_student = np.empty(len(student_index), dtype=bool)
+    new_student[0] = True
+    new_student[1:] = student_index[1:] != student_index[:-1]
+    starts = np.flatnonzero(new_student)
+    lengths = np.diff(np.append(starts, len(student_index)))
+    group = np.cumsum(new_student) - 1
+    position = np.arange(len(student_index)) - starts[group]
+    # The first graded lesson ends the streak; with none, every lesson counts
+    first_graded = np.minimum.reduceat(np.where(graded, position, lengths[group]), starts)
+    streaks[student_index[starts]] = first_graded
+    return streaks
@@ -1,18 +1,29 @@
 import asyncio
 import schedule
 import logging
-from typing import Optional
+from datetime import datetime, timedelta
+from typing import List, Optional, Set
 from app.integrations.mojo_client import MojoClient
+from app.models.rollup import StudentRisk
 from app.services.analysis_service import AnalysisService
+from app.services.database_service import DatabaseService
+from app.services.partitions import ensure_term_partitions
+from app.services.risk import ATTENDANCE_ALERT_RATE, OVERDUE_ALERT_COUNT
+from app.core.database import AsyncSession
 
 logger = logging.getLogger(__name__)
 
+# Alerts are skipped when the last risk run is older than this (e.g. the job failed)
+RISK_MAX_AGE = timedelta(hours=36)
+
 class SchedulerService:
     def __init__(self, mojo_client: MojoClient):
         self.mojo_client = mojo_client
         self.analysis_service = AnalysisService(mojo_client)
         self.is_running = False
         self.task: Optional[asyncio.Task] = None
+        # The event loop only keeps weak references to tasks, so running jobs are held here
+        self.jobs: Set[asyncio.Task] = set()
     
     async def start(self):
         """Start the scheduler"""
@@ -29,11 +40,13 @@ class SchedulerService:
     
     async def _run_scheduler(self):
         """Main scheduler loop"""
-        # Schedule tasks
-        schedule.every(10).minutes.do(self._check_grading_timeliness)
-        schedule.every().monday.at("09:00").do(self._send_weekly_reports)
-        schedule.every().day.at("08:00").do(self._check_attendance_alerts)
-        schedule.every().day.at("18:00").do(self._check_homework_alerts)
+        # Schedule tasks (jobs are coroutines, so each run is spawned as a task)
+        schedule.every(10).minutes.do(self._spawn, self._check_grading_timeliness)
+        schedule.every().monday.at("09:00").do(self._spawn, self._send_weekly_reports)
+        schedule.every().day.at("08:00").do(self._spawn, self._check_attendance_alerts)
+        schedule.every().day.at("18:00").do(self._spawn, self._check_homework_alerts)
+        schedule.every().day.at("02:00").do(self._spawn, self._ensure_partitions)
+        schedule.every().day.at("03:00").do(self._spawn, self._score_student_risk)
         
         while self.is_running:
             try:
@@ -43,6 +56,28 @@ class SchedulerService:
                 logger.error(f"Scheduler error: {e}")
                 await asyncio.sleep(60)
     
+    def _spawn(self, job):
+        """Run an async job in the background from the synchronous schedule loop"""
+        task = asyncio.create_task(job())
+        self.jobs.add(task)
+        task.add_done_callback(self._job_done)
+    
+    def _job_done(self, task: asyncio.Task):
+        """Release a finished job and log anything it raised"""
+        self.jobs.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Scheduled job {task.get_coro().__qualname__} failed: {task.exception()!r}")
+    
+    async def _ensure_partitions(self):
+        """Create upcoming term partitions for grades and attendance"""
+        try:
+            async with AsyncSession() as session:
+                created = await ensure_term_partitions(session)
+            if created:
+                logger.info(f"Created partitions: {', '.join(created)}")
+        except Exception as e:
+            logger.error(f"Error creating partitions: {e}")
+    
     async def _check_grading_timeliness(self):
         """Check for missing grades"""
         logger.info("Checking grading timeliness...")
@@ -55,56 +90,68 @@ class SchedulerService:
         """Send weekly reports to parents"""
         logger.info("Sending weekly reports...")
         try:
-            await self.analysis_service.generate_weekly_reports()
+            async with AsyncSession() as session:
+                await AnalysisService(self.mojo_client, session).generate_weekly_reports()
         except Exception as e:
             logger.error(f"Error sending weekly reports: {e}")
     
+    async def _score_student_risk(self):
+        """Recompute the school-wide early-warning risk scores"""
+        logger.info("Scoring student risk...")
+        try:
+            async with AsyncSession() as session:
+                scored = await DatabaseService(session).refresh_student_risk()
+            logger.info(f"Scored risk for {scored} students")
+        except Exception as e:
+            logger.error(f"Error scoring student risk: {e}")
+    
+    async def _current_risk(self) -> List[StudentRisk]:
+        """All rows of the last risk run, highest risk first; empty if that run is out of date."""
+        async with AsyncSession() as session:
+            rows = await DatabaseService(session).get_student_risk(limit=None)
+        if rows and rows[0].computed_at < datetime.now() - RISK_MAX_AGE:
+            logger.warning(f"Risk scores from {rows[0].computed_at} are out of date; skipping alerts")
+            return []
+        return rows
+    
     async def _check_attendance_alerts(self):
-        """Check for attendance issues and send alerts"""
+        """Send attendance alerts from the nightly risk scores, highest risk first"""
         logger.info("Checking attendance patterns...")
         try:
-            students = await self.mojo_client.get_students()
-            
-            for student in students:
-                # Analyze last 7 days of attendance
-                attendance_analysis = await self.analysis_service.analyze_student_attendance(
-                    student['id'], 
-                    days=7
+            for risk in await self._current_risk():
+                if risk.attendance_rate is None or risk.attendance_rate >= ATTENDANCE_ALERT_RATE:
+                    continue
+                alert_data = await self.analysis_service.llm_service.generate_alert(
+                    "low_attendance",
+                    {"attendance_rate": risk.attendance_rate}
                 )
-                
-                # Send alerts if any issues detected
-                alerts = attendance_analysis.get("alerts", [])
-                for alert in alerts:
-                    if alert:
-                        await self.mojo_client.send_message(
-                            student['id'], 
-                            f"⚠️ Attendance Alert:\n{alert}",
-                            "alert"
-                        )
+                alert = alert_data.get("alert")
+                if alert:
+                    await self.mojo_client.send_message(
+                        risk.user_id, 
+                        f"⚠️ Attendance Alert:\n{alert}",
+                        "alert"
+                    )
         except Exception as e:
             logger.error(f"Error checking attendance alerts: {e}")
     
     async def _check_homework_alerts(self):
-        """Check for homework completion issues and send alerts"""
+        """Send homework alerts from the nightly risk scores, highest risk first"""
         logger.info("Checking homework completion...")
         try:
-            students = await self.mojo_client.get_students()
-            
-            for student in students:
-                # Analyze homework completion
-                homework_analysis = await self.analysis_service.analyze_homework_completion(
-                    student['id'], 
-                    days=7
+            for risk in await self._current_risk():
+                if risk.overdue_count <= OVERDUE_ALERT_COUNT:
+                    continue
+                alert_data = await self.analysis_service.llm_service.generate_alert(
+                    "missing_homework",
+                    {"overdue_count": risk.overdue_count}
                 )
-                
-                # Send alerts if any overdue homework
-                alerts = homework_analysis.get("alerts", [])
-                for alert in alerts:
-                    if alert:
-                        await self.mojo_client.send_message(
-                            student['id'], 
-                            f"📚 Homework Alert:\n{alert}",
-                            "alert"
-                        )
+                alert = alert_data.get("alert")
+                if alert:
+                    await self.mojo_client.send_message(
+                        risk.user_id, 
+                        f"📚 Homework Alert:\n{alert}",
+                        "alert"
+                    )
         except Exception as e:
             logger.error(f"Error checking homework alerts: {e}")
@@ -0,0 +1,119 @@
+"""
+Ranked text search over lesson topics, homework text and grade lesson topics,
+backed by the indexes in app.models.search.
+
+Every word of the query must match (as a prefix, so "fract" finds "fractions").
+Results are ordered by rank, best first, then by (kind, id), and paginated with
+a keyset cursor over (rank, kind, id).
+"""
+import re
+from typing import List, Optional, Sequence
+
+from sqlalchemy import Float, and_, column, func, literal_column, or_, select, table, union_all
+
+from app.core.pagination import InvalidCursorError, decode_cursor
+from app.models.grade import Grade
+from app.models.homework import Homework
+from app.models.lesson import Lesson
+from app.models.search import SEARCH_INDEX_TABLE, SEARCH_KINDS, TEXT_SEARCH_CONFIG, search_vector
+
+# Per kind: model, displayed text and date column
+_RESULT_COLUMNS = {
+    "lesson": (Lesson, Lesson.topic, Lesson.date),
+    "homework": (Homework, Homework.title, Homework.due_date),
+    "grade": (Grade, Grade.lesson_topic, Grade.date),
+}
+
+_WORD = re.compile(r"\w+")
+
+CURSOR_ATTRS = ("rank", "kind", "id")
+
+
+def search_terms(query: str) -> List[str]:
+    return _WORD.findall(query.lower())
+
+
+def _postgres_hits(terms: List[str], kinds: Sequence[str]):
+    tsquery = func.to_tsquery(
+        literal_column(f"'{TEXT_SEARCH_CONFIG}'"), " & ".join(f"{term}:*" for term in terms)
+    )
+    selects = []
+    for kind in kinds:
+        model, text, day = _RESULT_COLUMNS[kind]
+        vector = literal_column(search_vector(kind, f"{model.__tablename__}."))
+        selects.append(
+            select(
+                literal_column(f"'{kind}'").label("kind"),
+                model.id.label("id"),
+                text.label("text"),
+                day.label("date"),
+                func.ts_rank(vector, tsquery).cast(Float).label("rank")
+            ).where(vector.op("@@")(tsquery))
+        )
+    return selects
+
+
+def _sqlite_hits(terms: List[str], kinds: Sequence[str]):
+    index = table(SEARCH_INDEX_TABLE, column("rowid"))
+    slots = len(SEARCH_KINDS)
+    matches = select(
+        index.c.rowid.label("rowid"),
+        # bm25() is lower for better matches
+        (-func.bm25(literal_column(SEARCH_INDEX_TABLE))).label("rank")
+    ).where(
+        literal_column(SEARCH_INDEX_TABLE).op("MATCH")(" ".join(f'"{term}"*' for term in terms))
+    ).cte("matches")
+
+    selects = []
+    for kind in kinds:
+        model, text, day = _RESULT_COLUMNS[kind]
+        selects.append(
+            select(
+                literal_column(f"'{kind}'").label("kind"),
+                model.id.label("id"),
+                text.label("text"),
+                day.label("date"),
+                matches.c.rank.label("rank")
+            ).join_from(matches, model, model.id == matches.c.rowid // slots)
+            .where(matches.c.rowid % slots == SEARCH_KINDS.index(kind))
+        )
+    return selects
+
+
+async def search(
+    session,
+    query: str,
+    kinds: Optional[Sequence[str]] = None,
+    limit: int = 20,
+    cursor: Optional[str] = None
+) -> List:
+    """
+    Rows (kind, id, text, date, rank) matching every word of `query`, limited to
+    `kinds` (default: all of SEARCH_KINDS). Raises InvalidCursorError for a bad cursor.
+    """
+    terms = search_terms(query)
+    kinds = [kind for kind in SEARCH_KINDS if not kinds or kind in kinds]
+    if not terms or not kinds:
+        return []
+
+    dialect = session.get_bind().dialect.name
+    if dialect == "postgresql":
+        selects = _postgres_hits(terms, kinds)
+    elif dialect == "sqlite":
+        selects = _sqlite_hits(terms, kinds)
+    else:
+        raise NotImplementedError(f"Text search is not supported on {dialect}")
+
+    hits = union_all(*selects).subquery("hits")
+    stmt = select(hits)
+    if cursor:
+        rank, kind, row_id = decode_cursor(cursor, [hits.c.rank, hits.c.kind, hits.c.id])
+        if not isinstance(rank, (int, float)) or kind not in SEARCH_KINDS or not isinstance(row_id, int):
+            raise InvalidCursorError(f"Invalid cursor: {cursor}")
+        stmt = stmt.where(or_(
+            hits.c.rank < rank,
+            and_(hits.c.rank == rank, or_(hits.c.kind > kind, and_(hits.c.kind == kind, hits.c.id > row_id)))
+        ))
+    stmt = stmt.order_by(hits.c.rank.desc(), hits.c.kind, hits.c.id).limit(limit)
+    result = await session.execute(stmt)
+    return result.all()
@@ -0,0 +1,78 @@
+"""
+Mergeable score distributions for percentile ranks.
+
+Scores live on a bounded grading scale, so a fixed-bin histogram over the scale is a
+quantile sketch with a known error (one bin, 1/SKETCH_BINS of the scale) that, unlike
+t-digest or KLL, also supports removals: a student's entry can move when their average
+changes. Sketches of the same scale merge by adding counts, so class sketches combine
+into grade-level and school-level ones.
+"""
+import re
+from typing import Iterable, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.grading import GRADING_SCALES
+
+SKETCH_BINS = 100
+
+_GRADE_LEVEL = re.compile(r"^\d+")
+
+
+def sketch_bin(value: float, scale: Optional[str] = None) -> int:
+    """Bin of `value` on the grading scale (defaults to settings.GRADING_SCALE)."""
+    lowest, highest, _ = GRADING_SCALES[scale or settings.GRADING_SCALE]
+    position = int((value - lowest) / (highest - lowest) * SKETCH_BINS)
+    return min(max(position, 0), SKETCH_BINS - 1)
+
+
+def grade_level(class_name: str) -> Optional[str]:
+    """Leading number of a class name ("5" for "5A"), or None if it has none."""
+    match = _GRADE_LEVEL.match(class_name)
+    return match.group(0) if match else None
+
+
+class ScoreSketch:
+    """Counts of values per bin of the grading scale."""
+
+    def __init__(self, counts: Optional[np.ndarray] = None, scale: Optional[str] = None):
+        self.scale = scale or settings.GRADING_SCALE
+        self.counts = np.zeros(SKETCH_BINS, dtype=np.int64) if counts is None else counts
+
+    @classmethod
+    def from_bins(cls, bins: Iterable[Tuple[int, int]], scale: Optional[str] = None) -> "ScoreSketch":
+        """Sketch from (bin, count) pairs."""
+        sketch = cls(scale=scale)
+        for index, count in bins:
+            sketch.counts[index] += count
+        return sketch
+
+    def __add__(self, other: "ScoreSketch") -> "ScoreSketch":
+        if other.scale != self.scale:
+            raise ValueError(f"Cannot merge sketches on different scales: {self.scale}, {other.scale}")
+        return ScoreSketch(self.counts + other.counts, self.scale)
+
+    @property
+    def total(self) -> int:
+        return int(self.counts.sum())
+
+    def percentile_rank(self, value: float) -> Optional[float]:
+        """
+        Percentage of entries below `value`, counting entries in its bin as half below
+        (so the middle of a uniform distribution ranks 50). None for an empty sketch.
+        """
+        if not self.total:
+            return None
+        index = sketch_bin(value, self.scale)
+        below = self.counts[:index].sum() + self.counts[index] / 2
+        return round(float(below / self.total * 100), 1)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Approximate `q`-quantile (0..1): the midpoint of the bin holding it. None when empty."""
+        if not self.total:
+            return None
+        lowest, highest, _ = GRADING_SCALES[self.scale]
+        index = int(np.searchsorted(np.cumsum(self.counts), q * self.total, side="left"))
+        index = min(index, SKETCH_BINS - 1)
+        return round(lowest + (index + 0.5) * (highest - lowest) / SKETCH_BINS, 2)
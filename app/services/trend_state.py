@@ -0,0 +1,81 @@
+"""
+Online grade statistics per student x subject, stored in student_subject_trend.
+
+Each scored grade is folded into the state in O(1): a Welford running mean and
+sum of squared deviations, an exponentially weighted moving average (EWMA) and
+the last RECENT_SCORES scores. Grades are folded in (date, id) order, so a new
+grade dated after the pair's latest one is applied incrementally; corrections,
+deletions and back-dated grades rebuild the pair from its grades.
+"""
+import math
+from datetime import datetime
+from typing import Dict, Iterable, Optional
+
+EWMA_ALPHA = 0.4  # weight of the newest score in the EWMA
+RECENT_SCORES = 10
+# The EWMA must sit this far above (below) the all-time mean to count as improving (declining)
+EWMA_TREND_THRESHOLD = 0.3
+
+STATE_COLUMNS = ["score_count", "mean", "m2", "ewma", "recent", "last_date", "last_grade_id"]
+
+
+def empty_state() -> Dict:
+    return {"score_count": 0, "mean": 0.0, "m2": 0.0, "ewma": None, "recent": [], "last_date": None, "last_grade_id": None}
+
+
+def follows(state: Dict, date: datetime, grade_id: int) -> bool:
+    """True if a grade at (date, grade_id) comes after every grade already folded into `state`."""
+    return state["last_date"] is None or (date, grade_id) > (state["last_date"], state["last_grade_id"])
+
+
+def add_score(state: Dict, score: float, date: datetime, grade_id: int) -> Dict:
+    """Fold one scored grade into `state` (which must not contain later grades)."""
+    count = state["score_count"] + 1
+    delta = score - state["mean"]
+    mean = state["mean"] + delta / count
+    ewma = score if state["ewma"] is None else EWMA_ALPHA * score + (1 - EWMA_ALPHA) * state["ewma"]
+    return {
+        "score_count": count,
+        "mean": mean,
+        "m2": state["m2"] + delta * (score - mean),
+        "ewma": ewma,
+        "recent": (state["recent"] + [score])[-RECENT_SCORES:],
+        "last_date": date,
+        "last_grade_id": grade_id,
+    }
+
+
+def fold(grades: Iterable, state: Optional[Dict] = None) -> Dict:
+    """Fold (score, date, id) rows, in (date, id) order, into `state` (default: empty)."""
+    state = state or empty_state()
+    for score, date, grade_id in grades:
+        if score is not None:
+            state = add_score(state, score, date, grade_id)
+    return state
+
+
+def trend_label(state: Dict) -> str:
+    if state["score_count"] == 0:
+        return "no_data"
+    if state["score_count"] < 2:
+        return "insufficient_data"
+    if state["ewma"] > state["mean"] + EWMA_TREND_THRESHOLD:
+        return "improving"
+    if state["ewma"] < state["mean"] - EWMA_TREND_THRESHOLD:
+        return "declining"
+    return "stable"
+
+
+def describe(subject: str, state: Dict) -> Dict:
+    """API view of a pair's state."""
+    count = state["score_count"]
+    return {
+        "subject": subject,
+        "count": count,
+        "average": round(state["mean"], 2) if count else 0,
+        "std_dev": round(math.sqrt(state["m2"] / (count - 1)), 2) if count > 1 else None,
+        "ewma": round(state["ewma"], 2) if state["ewma"] is not None else None,
+        "recent_scores": list(state["recent"]),
+        "latest_grade": state["recent"][-1] if state["recent"] else None,
+        "trend": trend_label(state),
+    }
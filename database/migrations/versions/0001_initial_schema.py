@@ -0,0 +1,118 @@
+"""Initial schema (tables previously created by Base.metadata.create_all at startup)
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17 09:00:00
+
+Existing databases that were bootstrapped by the old startup hook already
+have these tables: run `alembic stamp 0001` once, then `alembic upgrade head`.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'users',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('name', sa.String(), nullable=True),
+        sa.Column('email', sa.String(), nullable=True),
+        sa.Column('role', sa.Enum('teacher', 'parent', 'student', name='role'), nullable=False),
+    )
+    op.create_index('ix_users_id', 'users', ['id'])
+    op.create_index('ix_users_name', 'users', ['name'])
+    op.create_index('ix_users_email', 'users', ['email'], unique=True)
+
+    op.create_table(
+        'students',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=False),
+        sa.Column('class_name', sa.String(), nullable=False),
+    )
+    op.create_index('ix_students_id', 'students', ['id'])
+
+    op.create_table(
+        'teachers',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=False),
+        sa.Column('subjects', sa.JSON(), nullable=False),
+    )
+    op.create_index('ix_teachers_id', 'teachers', ['id'])
+
+    op.create_table(
+        'grades',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('student_id', sa.Integer(), sa.ForeignKey('students.id'), nullable=False),
+        sa.Column('teacher_id', sa.Integer(), sa.ForeignKey('teachers.id'), nullable=False),
+        sa.Column('subject', sa.String(), nullable=False),
+        sa.Column('grade', sa.String(), nullable=False),
+        sa.Column('date', sa.DateTime(), nullable=False),
+        sa.Column('lesson_topic', sa.String(), nullable=True),
+    )
+    op.create_index('ix_grades_id', 'grades', ['id'])
+
+    op.create_table(
+        'lessons',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('subject', sa.String(), nullable=False),
+        sa.Column('date', sa.DateTime(), nullable=False),
+        sa.Column('topic', sa.String(), nullable=False),
+        sa.Column('class_name', sa.String(), nullable=False),
+        sa.Column('teacher_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=False),
+    )
+    op.create_index('ix_lessons_id', 'lessons', ['id'])
+
+    op.create_table(
+        'attendance',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('student_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=False),
+        sa.Column('lesson_id', sa.Integer(), sa.ForeignKey('lessons.id'), nullable=False),
+        sa.Column('present', sa.Boolean(), nullable=True),
+        sa.Column('date', sa.DateTime(), nullable=False),
+    )
+    op.create_index('ix_attendance_id', 'attendance', ['id'])
+
+    op.create_table(
+        'homework',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('title', sa.String(), nullable=False),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('due_date', sa.DateTime(), nullable=False),
+        sa.Column('lesson_id', sa.Integer(), sa.ForeignKey('lessons.id'), nullable=False),
+        sa.Column('teacher_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=False),
+    )
+    op.create_index('ix_homework_id', 'homework', ['id'])
+
+    op.create_table(
+        'homework_submissions',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('homework_id', sa.Integer(), sa.ForeignKey('homework.id'), nullable=False),
+        sa.Column('student_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=False),
+        sa.Column('submitted_at', sa.DateTime(), nullable=True),
+        sa.Column('content', sa.Text(), nullable=True),
+        sa.Column('grade', sa.Integer(), nullable=True),
+        sa.Column('feedback', sa.Text(), nullable=True),
+        sa.Column('is_completed', sa.Boolean(), nullable=True),
+    )
+    op.create_index('ix_homework_submissions_id', 'homework_submissions', ['id'])
+
+
+def downgrade() -> None:
+    op.drop_table('homework_submissions')
+    op.drop_table('homework')
+    op.drop_table('attendance')
+    op.drop_table('lessons')
+    op.drop_table('grades')
+    op.drop_table('teachers')
+    op.drop_table('students')
+    op.drop_table('users')
+    sa.Enum(name='role').drop(op.get_bind(), checkfirst=True)
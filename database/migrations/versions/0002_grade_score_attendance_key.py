@@ -0,0 +1,39 @@
+"""Numeric grade score and one attendance row per (student, lesson)
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17 09:10:00
+
+Run scripts/data/backfill_grade_scores.py afterwards to fill grades.score
+for existing rows.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('grades', sa.Column('score', sa.Float(), nullable=True))
+
+    # Keep the latest mark for each (student, lesson) before enforcing uniqueness
+    op.execute(
+        "DELETE FROM attendance WHERE id NOT IN "
+        "(SELECT MAX(id) FROM attendance GROUP BY student_id, lesson_id)"
+    )
+    with op.batch_alter_table('attendance') as batch_op:
+        batch_op.create_unique_constraint('uq_attendance_student_lesson', ['student_id', 'lesson_id'])
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('attendance') as batch_op:
+        batch_op.drop_constraint('uq_attendance_student_lesson', type_='unique')
+    with op.batch_alter_table('grades') as batch_op:
+        batch_op.drop_column('score')
@@ -0,0 +1,43 @@
+"""Composite indexes for analytics queries (student + date filters, class lookups)
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17 09:20:00
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+INDEXES = [
+    ('ix_grades_student_date', 'grades', ['student_id', 'date']),
+    ('ix_grades_student_subject_date', 'grades', ['student_id', 'subject', 'date']),
+    ('ix_attendance_student_date', 'attendance', ['student_id', 'date']),
+    ('ix_homework_due_date', 'homework', ['due_date']),
+    ('ix_homework_submissions_student_homework', 'homework_submissions', ['student_id', 'homework_id']),
+    ('ix_lessons_class_date', 'lessons', ['class_name', 'date']),
+    ('ix_students_class_name', 'students', ['class_name']),
+]
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        # Build without blocking writes on large, live tables
+        with op.get_context().autocommit_block():
+            for name, table, columns in INDEXES:
+                op.create_index(name, table, columns, postgresql_concurrently=True, if_not_exists=True)
+    else:
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns)
+
+
+def downgrade() -> None:
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
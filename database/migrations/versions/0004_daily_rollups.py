@@ -0,0 +1,59 @@
+"""Daily rollup tables for grade and attendance analytics
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17 09:30:00
+
+Tables are populated from existing rows here; afterwards DatabaseService keeps
+them current on every grade/attendance write.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'student_subject_daily',
+        sa.Column('student_id', sa.Integer(), primary_key=True),
+        sa.Column('subject', sa.String(), primary_key=True),
+        sa.Column('day', sa.Date(), primary_key=True),
+        sa.Column('grade_count', sa.Integer(), nullable=False),
+        sa.Column('score_count', sa.Integer(), nullable=False),
+        sa.Column('score_sum', sa.Float(), nullable=False),
+        sa.Column('score_min', sa.Float(), nullable=True),
+        sa.Column('score_max', sa.Float(), nullable=True),
+    )
+    op.create_table(
+        'student_attendance_daily',
+        sa.Column('student_id', sa.Integer(), primary_key=True),
+        sa.Column('day', sa.Date(), primary_key=True),
+        sa.Column('present_count', sa.Integer(), nullable=False),
+        sa.Column('absent_count', sa.Integer(), nullable=False),
+    )
+
+    op.execute(
+        "INSERT INTO student_subject_daily "
+        "(student_id, subject, day, grade_count, score_count, score_sum, score_min, score_max) "
+        "SELECT student_id, subject, date(date), count(id), count(score), coalesce(sum(score), 0), "
+        "min(score), max(score) FROM grades GROUP BY student_id, subject, date(date)"
+    )
+    op.execute(
+        "INSERT INTO student_attendance_daily (student_id, day, present_count, absent_count) "
+        "SELECT student_id, date(date), "
+        "sum(CASE WHEN present THEN 1 ELSE 0 END), sum(CASE WHEN present THEN 0 ELSE 1 END) "
+        "FROM attendance GROUP BY student_id, date(date)"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('student_attendance_daily')
+    op.drop_table('student_subject_daily')
@@ -0,0 +1,108 @@
+"""Partition grades and attendance by academic term (Postgres)
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17 09:40:00
+
+On Postgres both tables are rebuilt as range-partitioned on `date`: one partition
+per term from the oldest row through PARTITION_TERMS_AHEAD terms past today,
+plus a DEFAULT partition. Partitioned tables need the partition key in every
+unique constraint, so the primary keys become (id, date) and the attendance key
+becomes (student_id, lesson_id, date) on every backend.
+
+Later terms are created by the scheduler (app.services.partitions); closed terms
+are archived with scripts/data/archive_terms.py.
+"""
+from datetime import date
+from typing import Sequence, Union
+
+from alembic import context, op
+
+from app.core.config import settings
+from app.core.terms import terms_between, following_terms
+from app.services.partitions import create_partition_sql, default_partition_name
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+TABLES = {
+    'grades': {
+        'indexes': [
+            ('ix_grades_id', ['id']),
+            ('ix_grades_student_date', ['student_id', 'date']),
+            ('ix_grades_student_subject_date', ['student_id', 'subject', 'date']),
+        ],
+        'foreign_keys': [('student_id', 'students'), ('teacher_id', 'teachers')],
+    },
+    'attendance': {
+        'indexes': [
+            ('ix_attendance_id', ['id']),
+            ('ix_attendance_student_date', ['student_id', 'date']),
+        ],
+        'foreign_keys': [('student_id', 'users'), ('lesson_id', 'lessons')],
+    },
+}
+
+ATTENDANCE_KEY = 'uq_attendance_student_lesson'
+
+
+def _rebuild(table: str, partitioned: bool, attendance_key: Sequence[str]) -> None:
+    """Copy `table` into a new (partitioned or plain) table with the same name."""
+    spec = TABLES[table]
+    old = f'{table}_old'
+    op.execute(f'ALTER TABLE {table} RENAME TO {old}')
+    op.execute(f'ALTER SEQUENCE {table}_id_seq OWNED BY NONE')
+    op.execute(
+        f'CREATE TABLE {table} (LIKE {old} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)'
+        + (' PARTITION BY RANGE (date)' if partitioned else '')
+    )
+
+    if partitioned:
+        op.execute(f'CREATE TABLE {default_partition_name(table)} PARTITION OF {table} DEFAULT')
+        oldest = None
+        if not context.is_offline_mode():
+            oldest = op.get_bind().exec_driver_sql(f'SELECT min(date) FROM {old}').scalar()
+        oldest = oldest or date.today()
+        terms = terms_between(oldest, date.today())
+        terms += following_terms(terms[-1], settings.PARTITION_TERMS_AHEAD)
+        for term in terms:
+            for statement in create_partition_sql(table, term):
+                op.execute(statement)
+
+    op.execute(f'INSERT INTO {table} SELECT * FROM {old}')
+    op.execute(f'DROP TABLE {old}')
+    op.execute(f'ALTER SEQUENCE {table}_id_seq OWNED BY {table}.id')
+
+    op.create_primary_key(f'{table}_pkey', table, ['id', 'date'] if partitioned else ['id'])
+    for name, columns in spec['indexes']:
+        op.create_index(name, table, columns)
+    for column, target in spec['foreign_keys']:
+        op.create_foreign_key(f'{table}_{column}_fkey', table, target, [column], ['id'])
+    if table == 'attendance':
+        op.create_unique_constraint(ATTENDANCE_KEY, table, list(attendance_key))
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        for table in TABLES:
+            _rebuild(table, partitioned=True, attendance_key=['student_id', 'lesson_id', 'date'])
+    else:
+        with op.batch_alter_table('attendance') as batch_op:
+            batch_op.drop_constraint(ATTENDANCE_KEY, type_='unique')
+            batch_op.create_unique_constraint(ATTENDANCE_KEY, ['student_id', 'lesson_id', 'date'])
+
+
+def downgrade() -> None:
+    # Partitions already detached by archive_terms.py are not restored
+    if op.get_bind().dialect.name == 'postgresql':
+        for table in TABLES:
+            _rebuild(table, partitioned=False, attendance_key=['student_id', 'lesson_id'])
+    else:
+        with op.batch_alter_table('attendance') as batch_op:
+            batch_op.drop_constraint(ATTENDANCE_KEY, type_='unique')
+            batch_op.create_unique_constraint(ATTENDANCE_KEY, ['student_id', 'lesson_id'])
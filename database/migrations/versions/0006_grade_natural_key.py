@@ -0,0 +1,61 @@
+"""Natural key on grades for idempotent upserts
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17 10:20:00
+
+Replayed feeds left duplicate grades behind; they are collapsed to the newest
+row per (student_id, subject, date, teacher_id) before the key is added, and the
+grade rollups are rebuilt if anything was removed. The key contains the partition
+column, so on Postgres it is created on the partitioned table and every partition.
+"""
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+GRADE_KEY = 'uq_grades_natural_key'
+GRADE_KEY_COLUMNS = ['student_id', 'subject', 'date', 'teacher_id']
+
+
+def upgrade() -> None:
+    deduplicate = sa.text(
+        "DELETE FROM grades WHERE id NOT IN ("
+        "SELECT max(id) FROM grades GROUP BY student_id, subject, date, teacher_id)"
+    )
+    if context.is_offline_mode():
+        op.execute(deduplicate)
+        removed = True
+    else:
+        removed = op.get_bind().execute(deduplicate).rowcount > 0
+
+    if removed:
+        op.execute("DELETE FROM student_subject_daily")
+        op.execute(
+            "INSERT INTO student_subject_daily "
+            "(student_id, subject, day, grade_count, score_count, score_sum, score_min, score_max) "
+            "SELECT student_id, subject, date(date), count(id), count(score), coalesce(sum(score), 0), "
+            "min(score), max(score) FROM grades GROUP BY student_id, subject, date(date)"
+        )
+
+    if op.get_bind().dialect.name == 'postgresql':
+        op.create_unique_constraint(GRADE_KEY, 'grades', GRADE_KEY_COLUMNS)
+    else:
+        with op.batch_alter_table('grades') as batch_op:
+            batch_op.create_unique_constraint(GRADE_KEY, GRADE_KEY_COLUMNS)
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        op.drop_constraint(GRADE_KEY, 'grades', type_='unique')
+    else:
+        with op.batch_alter_table('grades') as batch_op:
+            batch_op.drop_constraint(GRADE_KEY, type_='unique')
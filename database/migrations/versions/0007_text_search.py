@@ -0,0 +1,47 @@
+"""Text search indexes over lesson topics, homework and grade topics
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-17 10:50:00
+
+Postgres gets GIN indexes on to_tsvector expressions; SQLite gets an FTS5 table
+kept current by triggers (see app.models.search). Batch-mode migrations that
+recreate lessons, homework or grades on SQLite drop those triggers and must
+re-run sqlite_search_index_sql().
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+from app.models.search import (
+    SEARCH_INDEX_TABLE, SEARCH_SOURCES, postgres_search_index_sql, sqlite_search_index_sql
+)
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0007'
+down_revision: Union[str, None] = '0006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        for statement in postgres_search_index_sql():
+            op.execute(statement)
+    elif dialect == 'sqlite':
+        for statement in sqlite_search_index_sql(populate=True):
+            op.execute(statement)
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        for source in SEARCH_SOURCES.values():
+            op.execute(f'DROP INDEX {source.index}')
+    elif dialect == 'sqlite':
+        for source in SEARCH_SOURCES.values():
+            for suffix in ('ai', 'au', 'ad'):
+                op.execute(f'DROP TRIGGER IF EXISTS {SEARCH_INDEX_TABLE}_{source.table}_{suffix}')
+        op.execute(f'DROP TABLE IF EXISTS {SEARCH_INDEX_TABLE}')
@@ -0,0 +1,58 @@
+"""Online grade trend state per student and subject
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-17 11:20:00
+
+The table is filled from existing grades here (online mode only; after an offline
+upgrade run DatabaseService.rebuild_rollups()). Afterwards DatabaseService keeps it
+current on every grade write.
+"""
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+from app.services.trend_state import add_score, empty_state
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0008'
+down_revision: Union[str, None] = '0007'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    trend = op.create_table(
+        'student_subject_trend',
+        sa.Column('student_id', sa.Integer(), primary_key=True),
+        sa.Column('subject', sa.String(), primary_key=True),
+        sa.Column('score_count', sa.Integer(), nullable=False),
+        sa.Column('mean', sa.Float(), nullable=False),
+        sa.Column('m2', sa.Float(), nullable=False),
+        sa.Column('ewma', sa.Float(), nullable=True),
+        sa.Column('recent', sa.JSON(), nullable=False),
+        sa.Column('last_date', sa.DateTime(), nullable=True),
+        sa.Column('last_grade_id', sa.Integer(), nullable=True),
+    )
+    if context.is_offline_mode():
+        return
+
+    rows = op.get_bind().execute(sa.text(
+        "SELECT student_id, subject, score, date, id FROM grades WHERE score IS NOT NULL "
+        "ORDER BY student_id, subject, date, id"
+    ).columns(date=sa.DateTime()))
+    states = {}
+    for student_id, subject, score, date, grade_id in rows:
+        pair = (student_id, subject)
+        states[pair] = add_score(states.get(pair) or empty_state(), score, date, grade_id)
+    if states:
+        op.bulk_insert(trend, [
+            {"student_id": student_id, "subject": subject, **state}
+            for (student_id, subject), state in states.items()
+        ])
+
+
+def downgrade() -> None:
+    op.drop_table('student_subject_trend')
@@ -0,0 +1,32 @@
+"""Per-student data version for analytics snapshot caching
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-17 11:50:00
+
+Students without a row are at version 0; DatabaseService creates and bumps rows
+on grade and attendance writes.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0009'
+down_revision: Union[str, None] = '0008'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'student_data_version',
+        sa.Column('student_id', sa.Integer(), primary_key=True),
+        sa.Column('version', sa.Integer(), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('student_data_version')
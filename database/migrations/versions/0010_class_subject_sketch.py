@@ -0,0 +1,61 @@
+"""Score sketches of term averages per class and subject
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-17 12:20:00
+
+Filled from the grade rollups here (online mode only; after an offline upgrade run
+DatabaseService.rebuild_rollups()). Afterwards DatabaseService keeps it current on
+every grade write and class change.
+"""
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+from app.core.terms import term_for
+from app.services.sketch import sketch_bin
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0010'
+down_revision: Union[str, None] = '0009'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    sketch = op.create_table(
+        'class_subject_sketch',
+        sa.Column('class_name', sa.String(), primary_key=True),
+        sa.Column('subject', sa.String(), primary_key=True),
+        sa.Column('term_start', sa.Date(), primary_key=True),
+        sa.Column('bin', sa.Integer(), primary_key=True),
+        sa.Column('count', sa.Integer(), nullable=False),
+    )
+    if context.is_offline_mode():
+        return
+
+    rows = op.get_bind().execute(sa.text(
+        "SELECT s.class_name, d.student_id, d.subject, d.day, d.score_sum, d.score_count "
+        "FROM student_subject_daily d JOIN students s ON s.id = d.student_id WHERE d.score_count > 0"
+    ).columns(day=sa.Date()))
+    sums = {}
+    for class_name, student_id, subject, day, score_sum, score_count in rows:
+        total = sums.setdefault((class_name, subject, term_for(day).start, student_id), [0.0, 0])
+        total[0] += score_sum
+        total[1] += score_count
+
+    counts = {}
+    for (class_name, subject, term_start, _), (score_sum, score_count) in sums.items():
+        key = (class_name, subject, term_start, sketch_bin(score_sum / score_count))
+        counts[key] = counts.get(key, 0) + 1
+    if counts:
+        op.bulk_insert(sketch, [
+            {"class_name": class_name, "subject": subject, "term_start": term_start, "bin": index, "count": count}
+            for (class_name, subject, term_start, index), count in counts.items()
+        ])
+
+
+def downgrade() -> None:
+    op.drop_table('class_subject_sketch')
@@ -0,0 +1,43 @@
+"""Early-warning student risk scores
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-17 12:50:00
+
+Written by the nightly risk job (DatabaseService.refresh_student_risk); empty
+until its first run.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0011'
+down_revision: Union[str, None] = '0010'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'student_risk',
+        sa.Column('student_id', sa.Integer(), primary_key=True),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('class_name', sa.String(), nullable=False),
+        sa.Column('rank', sa.Integer(), nullable=False),
+        sa.Column('score', sa.Float(), nullable=False),
+        sa.Column('grade_slope', sa.Float(), nullable=True),
+        sa.Column('attendance_rate', sa.Float(), nullable=True),
+        sa.Column('attendance_drop', sa.Float(), nullable=True),
+        sa.Column('overdue_count', sa.Integer(), nullable=False),
+        sa.Column('missing_grade_streak', sa.Integer(), nullable=False),
+        sa.Column('computed_at', sa.DateTime(), nullable=False),
+    )
+    op.create_index('ix_student_risk_rank', 'student_risk', ['rank'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_student_risk_rank', table_name='student_risk')
+    op.drop_table('student_risk')
@@ -0,0 +1,35 @@
+"""Record of archived term partitions
+
+Revision ID: 0012
+Revises: 0011
+Create Date: 2026-10-17 14:30:00
+
+Filled by scripts/data/archive_terms.py. DatabaseService rejects writes dated in a
+recorded term and keeps those terms' rollups when rebuilding. Terms archived before
+this revision are not recorded; add their rows by hand.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0012'
+down_revision: Union[str, None] = '0011'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'archived_terms',
+        sa.Column('table_name', sa.String(), primary_key=True),
+        sa.Column('term_start', sa.Date(), primary_key=True),
+        sa.Column('term_end', sa.Date(), nullable=False),
+        sa.Column('archived_at', sa.DateTime(), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('archived_terms')
@@ -0,0 +1,40 @@
+"""Trend state of archived grades
+
+Revision ID: 0013
+Revises: 0012
+Create Date: 2026-10-17 15:10:00
+
+Written by scripts/data/archive_terms.py for each archived grades term; trend state
+rebuilds start from it. Created empty: terms archived before this revision cannot be
+folded in any more (their grades are gone), so rebuilds of those pairs lose them.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0013'
+down_revision: Union[str, None] = '0012'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'student_subject_trend_base',
+        sa.Column('student_id', sa.Integer(), primary_key=True),
+        sa.Column('subject', sa.String(), primary_key=True),
+        sa.Column('score_count', sa.Integer(), nullable=False),
+        sa.Column('mean', sa.Float(), nullable=False),
+        sa.Column('m2', sa.Float(), nullable=False),
+        sa.Column('ewma', sa.Float(), nullable=True),
+        sa.Column('recent', sa.JSON(), nullable=False),
+        sa.Column('last_date', sa.DateTime(), nullable=True),
+        sa.Column('last_grade_id', sa.Integer(), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('student_subject_trend_base')
@@ -0,0 +1,54 @@
+"""
+Archive closed academic terms of grades and attendance (Postgres only).
+
+Usage:
+    python -m scripts.data.archive_terms --output-dir /backups/terms [--before 2025-09-01] [--drop]
+
+Each term partition that ended on or before --before (default: start of the
+current term) is exported to <output-dir>/<partition>.parquet (zstd-compressed)
+and detached from its table. With --drop the detached table is dropped as well.
+Daily rollups are kept, so analytics over archived terms keep working.
+Requires pyarrow.
+
+Each archived term is recorded in archived_terms, and a grades term's trend state in
+student_subject_trend_base, in the same transaction as the detach. Afterwards the
+rollups, trend state and score sketches are the only copy of the archived terms in
+the database: DatabaseService rejects writes dated in them, keeps their rollups when
+rebuilding, and rebuilds trend state on top of the stored archived state.
+"""
+import argparse
+import asyncio
+import logging
+import os
+from datetime import date
+from typing import Optional
+from app.core.database import AsyncSession
+from app.core.terms import term_for
+from app.services.database_service import DatabaseService
+from app.services.partitions import PARTITIONED_TABLES, archive_partition, closed_partitions, is_postgres
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+async def main(output_dir: str, before: Optional[date], drop: bool):
+    before = before or term_for(date.today()).start
+    os.makedirs(output_dir, exist_ok=True)
+    async with AsyncSession() as session:
+        if not is_postgres(session):
+            raise SystemExit("Term partitions exist only on PostgreSQL")
+        for table in PARTITIONED_TABLES:
+            for partition in await closed_partitions(session, table, before):
+                # Committed by archive_partition together with the detach
+                await DatabaseService(session).record_archived_term(table, partition.start, partition.end)
+                await archive_partition(session, table, partition, output_dir, drop=drop)
+    logger.info(f"Archived all terms ending on or before {before}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output-dir", required=True)
+    parser.add_argument("--before", type=date.fromisoformat, default=None)
+    parser.add_argument("--drop", action="store_true")
+    args = parser.parse_args()
+    asyncio.run(main(args.output_dir, args.before, args.drop))
@@ -0,0 +1,30 @@
+"""
+Backfill grades.score for rows created before the column existed.
+
+Usage:
+    python -m scripts.data.backfill_grade_scores [--chunk-size 1000] [--after-id 0]
+
+Each chunk is committed separately, so the script can be stopped and rerun.
+"""
+import argparse
+import asyncio
+import logging
+from app.core.database import AsyncSession
+from app.services.database_service import DatabaseService
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+async def main(chunk_size: int, after_id: int):
+    async with AsyncSession() as session:
+        updated = await DatabaseService(session).backfill_grade_scores(chunk_size=chunk_size, after_id=after_id)
+    logger.info(f"Backfill complete: {updated} grades updated")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--after-id", type=int, default=0)
+    args = parser.parse_args()
+    asyncio.run(main(args.chunk_size, args.after_id))
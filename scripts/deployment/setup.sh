@@ -6,7 +6,7 @@ echo "Setting up AI Mojo Assistant..."
 # Install dependencies
 pip install -r requirements.txt
 
-# Run migrations (if any)
-# alembic upgrade head
+# Run database migrations
+alembic upgrade head
 
 echo "Setup complete."
\ No newline at end of file
@@ -78,3 +78,12 @@ def client():
     """
     with TestClient(app) as c:
         yield c
+
+
+@pytest.fixture(scope="function")
+async def db_session():
+    """
+    Сессия тестовой БД для проверок запросов DatabaseService на реальном SQL.
+    """
+    async with TestingSessionLocal() as session:
+        yield session
@@ -2,6 +2,8 @@ import pytest
 from unittest.mock import Mock, AsyncMock, patch
 from app.services.analysis_service import AnalysisService
 from app.integrations.mojo_client import MojoClient
+from app.services.cohort import GradeColumns
+from datetime import datetime
 
 
 @pytest.fixture
@@ -78,8 +80,8 @@ async def test_generate_weekly_reports(analysis_service, mock_mojo_client):
 @pytest.mark.asyncio
 async def test_analyze_student_grades_no_data(analysis_service):
     """Test analyze_student_grades with no grade data"""
-    with patch.object(analysis_service.db_service, 'get_grades_by_student',
-                     new=AsyncMock(return_value=[])):
+    with patch.object(analysis_service.db_service, 'load_grade_columns',
+                     new=AsyncMock(return_value=GradeColumns.from_rows([]))):
         result = await analysis_service.analyze_student_grades(1)
         
         assert result["status"] == "no_data"
@@ -89,30 +91,23 @@ async def test_analyze_student_grades_no_data(analysis_service):
 @pytest.mark.asyncio
 async def test_analyze_student_grades_with_data(analysis_service):
     """Test analyze_student_grades with grade data"""
-    mock_grades = [
-        {"id": 1, "value": 5.0, "subject": "Math", "date": "2024-01-15"},
-        {"id": 2, "value": 4.5, "subject": "Math", "date": "2024-01-20"},
-        {"id": 3, "value": 4.0, "subject": "Physics", "date": "2024-01-18"}
-    ]
-    
-    mock_trend = {
-        "subject": "Math",
-        "average": 4.75,
-        "trend": "stable",
-        "count": 2
-    }
+    mock_grades = GradeColumns.from_rows([
+        (1, "Math", datetime(2024, 1, 15), 5.0),
+        (1, "Math", datetime(2024, 1, 20), 4.5),
+        (1, "Physics", datetime(2024, 1, 18), 4.0)
+    ])
     
-    with patch.object(analysis_service.db_service, 'get_grades_by_student',
+    with patch.object(analysis_service.db_service, 'load_grade_columns',
                      new=AsyncMock(return_value=mock_grades)):
-        with patch.object(analysis_service.db_service, 'get_grade_trends',
-                         new=AsyncMock(return_value=mock_trend)):
-            result = await analysis_service.analyze_student_grades(1)
-            
-            assert result["status"] == "success"
-            assert result["student_id"] == 1
-            assert result["total_grades"] == 3
-            assert result["subjects_count"] == 2
-            assert "grade_trends" in result
+        result = await analysis_service.analyze_student_grades(1)
+        
+        assert result["status"] == "success"
+        assert result["student_id"] == 1
+        assert result["total_grades"] == 3
+        assert result["subjects_count"] == 2
+        assert result["average_grade"] == 4.5
+        assert result["grade_trends"]["Math"]["average"] == 4.75
+        assert result["grade_trends"]["Math"]["trend"] == "stable"
 
 
 @pytest.mark.asyncio
@@ -287,3 +282,76 @@ async def test_identify_improvements(analysis_service):
     assert any("Math" in i for i in improvements)
     assert any("Attendance" in i for i in improvements)
     assert any("Homework" in i for i in improvements)
+
+
+@pytest.mark.asyncio
+async def test_student_analysis_snapshots_follow_data_version(mock_mojo_client, db_session):
+    """Test that repeated analyses are served from the snapshot cache until the student's data changes"""
+    from datetime import timedelta
+    from app.services.analysis_service import snapshot_cache
+    snapshot_cache.clear()
+    service = AnalysisService(mock_mojo_client, db_session)
+    db_service = service.db_service
+    now = datetime.now()
+    await db_service.create_grade(1, 1, "Math", "4", now - timedelta(days=2))
+    
+    first = await service.analyze_student_grades(1)
+    with patch.object(db_service, 'load_grade_columns', new=AsyncMock(side_effect=AssertionError("not cached"))):
+        assert await service.analyze_student_grades(1) is first
+    assert (await service.analyze_student_grades(1, days=7)) is not first
+    
+    await db_service.create_grade(1, 1, "Math", "2", now - timedelta(days=1))
+    assert await db_service.get_data_version(1) == 2
+    assert (await service.analyze_student_grades(1))["total_grades"] == 2
+    
+    lesson = await db_service.create_lesson(now, "Math", "5A", 1, topic="Fractions")
+    await db_service.mark_attendance(1, lesson.id, present=False)
+    assert await db_service.get_data_version(1) == 3
+    assert await db_service.get_data_version(2) == 0
+
+
+@pytest.mark.asyncio
+async def test_comprehensive_report_runs_stages_concurrently(mock_mojo_client, db_session):
+    """Test that analyses run on their own sessions and the LLM calls overlap, with stage timings"""
+    import asyncio
+    from datetime import timedelta
+    from tests.conftest import TestingSessionLocal
+    from app.services.analysis_service import snapshot_cache
+    snapshot_cache.clear()
+    await AnalysisService(mock_mojo_client, db_session).db_service.create_grade(
+        1, 1, "Math", "5", datetime.now() - timedelta(days=1)
+    )
+    service = AnalysisService(mock_mojo_client, db_session, session_factory=TestingSessionLocal)
+    homework_started = asyncio.Event()
+    recommendations_started = asyncio.Event()
+    
+    async def attendance(student_id, days):
+        # Completes only if the homework analysis starts while this one is still running
+        await asyncio.wait_for(homework_started.wait(), 1)
+        return {"status": "success", "attendance_stats": {"attendance_rate": 100.0}, "alerts": []}
+    
+    async def homework(student_id, days):
+        homework_started.set()
+        return {"status": "success", "homework_stats": {"completion_rate": 100.0, "overdue_count": 0}, "alerts": []}
+    
+    async def insights(data):
+        await asyncio.wait_for(recommendations_started.wait(), 1)
+        return {"insights": "Good progress"}
+    
+    async def recommendations(profile):
+        recommendations_started.set()
+        return {"recommendations": "Keep it up"}
+    
+    with patch.object(service, 'analyze_student_attendance', new=attendance), \
+            patch.object(service, 'analyze_homework_completion', new=homework), \
+            patch.object(service.llm_service, 'generate_insights', new=insights), \
+            patch.object(service.llm_service, 'generate_recommendations', new=recommendations):
+        result = await service.generate_comprehensive_report(1)
+    
+    assert result["status"] == "success"
+    assert result["grades"]["total_grades"] == 1
+    assert result["ai_insights"] == "Good progress"
+    assert set(result["timings_ms"]) == {
+        "grades", "attendance", "homework", "analyses", "insights", "recommendations", "llm", "total"
+    }
+    assert result["timings_ms"]["total"] >= result["timings_ms"]["analyses"]
@@ -1,6 +1,9 @@
 import pytest
+import json
+from datetime import datetime, timedelta
 from httpx import AsyncClient, ASGITransport
 from app.main import app
+from app.core.pagination import encode_cursor
 
 
 @pytest.mark.asyncio
@@ -71,3 +74,440 @@ async def test_analytics_summary():
     assert "total_students" in data["summary"]
     assert "total_teachers" in data["summary"]
 
+
+
+@pytest.mark.asyncio
+async def test_list_users_cursor_pagination():
+    """Test paging through users with next_cursor and opt-in totals"""
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        for i in range(5):
+            response = await ac.post(
+                "/api/users",
+                json={"name": f"Paged User {i}", "email": f"paged{i}@example.com", "role": "student"}
+            )
+            assert response.status_code == 201
+        
+        first = await ac.get("/api/users", params={"limit": 2, "with_total": True})
+        assert first.status_code == 200
+        first_data = first.json()
+        assert first_data["total"] == 5
+        assert len(first_data["users"]) == 2
+        assert first_data["next_cursor"]
+        
+        seen = [u["id"] for u in first_data["users"]]
+        cursor = first_data["next_cursor"]
+        while cursor:
+            page = (await ac.get("/api/users", params={"limit": 2, "cursor": cursor})).json()
+            assert page["total"] is None
+            seen.extend(u["id"] for u in page["users"])
+            cursor = page["next_cursor"]
+        
+        invalid = await ac.get("/api/users", params={"cursor": "not-a-cursor"})
+        tampered = await ac.get("/api/users", params={"cursor": encode_cursor(["1"])})
+        bad_date = await ac.get("/api/grades/", params={"cursor": encode_cursor(["yesterday", 1])})
+        null_id = await ac.get("/api/grades/", params={"cursor": encode_cursor([None, 1])})
+    assert seen == sorted(seen)
+    assert len(set(seen)) == 5
+    assert invalid.status_code == 400
+    assert tampered.status_code == 400
+    assert bad_date.status_code == 400
+    assert null_id.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_create_grades_bulk():
+    """Test bulk grade ingestion with per-item errors"""
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        student_user = (await ac.post(
+            "/api/users", json={"name": "Bulk Student", "email": "bulk.s@example.com", "role": "student"}
+        )).json()
+        teacher_user = (await ac.post(
+            "/api/users", json={"name": "Bulk Teacher", "email": "bulk.t@example.com", "role": "teacher"}
+        )).json()
+        student = (await ac.post(
+            "/api/students/", json={"user_id": student_user["id"], "class_name": "5A"}
+        )).json()
+        teacher = (await ac.post(
+            "/api/teachers/", json={"user_id": teacher_user["id"], "subjects": ["Math"]}
+        )).json()
+        
+        items = [
+            {"student_id": student["id"], "teacher_id": teacher["id"], "subject": "Math",
+             "grade": str(3 + i % 3), "date": f"2025-10-{10 + i}T10:00:00"}
+            for i in range(4)
+        ]
+        items.insert(2, {"student_id": 9999, "teacher_id": teacher["id"], "subject": "Math",
+                         "grade": "5", "date": "2025-10-12T10:00:00"})
+        
+        response = await ac.post("/api/grades/bulk", json={"grades": items})
+        # Items 0 and 2 share a natural key: the whole batch is rejected before any insert
+        new_items = [{**item, "date": f"2025-11-0{1 + i}T10:00:00"} for i, item in enumerate(items[:2])]
+        clashing = await ac.post("/api/grades/bulk", json={"grades": new_items + [{**new_items[0], "grade": "2"}]})
+        retried = await ac.post("/api/grades/bulk", json={"grades": new_items})
+        # One item's key is already stored: only that item is reported, the rest is created
+        existing = await ac.post("/api/grades/bulk", json={"grades": [
+            {**items[0], "date": "2025-11-05T10:00:00"}, items[0]
+        ]})
+    assert clashing.status_code == 422
+    assert clashing.json()["detail"].endswith("(student_id, subject, date, teacher_id): 0, 2")
+    assert retried.json()["created_count"] == 2
+    assert existing.status_code == 201
+    assert (existing.json()["created_count"], existing.json()["errors"]) == (
+        1, [{"index": 1, "detail": "Grade with this student, subject, date and teacher already exists"}]
+    )
+    assert response.status_code == 201
+    data = response.json()
+    assert data["created_count"] == 4
+    assert data["error_count"] == 1
+    assert data["errors"][0]["index"] == 2
+    assert [g["grade"] for g in data["created"]] == ["3", "4", "5", "3"]
+
+
+@pytest.mark.asyncio
+async def test_mark_lesson_attendance_is_idempotent():
+    """Test marking a whole lesson's roster and re-submitting a correction"""
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        teacher = (await ac.post(
+            "/api/users", json={"name": "Roster Teacher", "email": "roster.t@example.com", "role": "teacher"}
+        )).json()
+        students = [
+            (await ac.post(
+                "/api/users", json={"name": f"Roster {i}", "email": f"roster{i}@example.com", "role": "student"}
+            )).json()
+            for i in range(3)
+        ]
+        lesson = (await ac.post("/api/lessons/", json={
+            "subject": "Math", "date": "2025-10-15T10:00:00", "topic": "Fractions",
+            "class_name": "5A", "teacher_id": teacher["id"]
+        })).json()
+        
+        roster = {str(s["id"]): True for s in students}
+        first = await ac.post(f"/api/attendance/lesson/{lesson['id']}", json={"attendance": roster})
+        
+        roster[str(students[1]["id"])] = False
+        second = await ac.post(f"/api/attendance/lesson/{lesson['id']}", json={"attendance": roster})
+        
+        listing = await ac.get("/api/attendance/", params={"with_total": True})
+        missing = await ac.post("/api/attendance/lesson/9999", json={"attendance": roster})
+    assert first.status_code == 200
+    assert second.status_code == 200
+    records = second.json()["attendance_records"]
+    assert [r["present"] for r in records] == [True, False, True]
+    assert listing.json()["total"] == 3
+    assert missing.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_classes_overview():
+    """Test per-student class overview for several classes in one request"""
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        teacher_user = (await ac.post(
+            "/api/users", json={"name": "Overview Teacher", "email": "ov.t@example.com", "role": "teacher"}
+        )).json()
+        teacher = (await ac.post(
+            "/api/teachers/", json={"user_id": teacher_user["id"], "subjects": ["Math"]}
+        )).json()
+        students = []
+        for i, class_name in enumerate(["5A", "5A", "5B"]):
+            user = (await ac.post(
+                "/api/users", json={"name": f"Overview {i}", "email": f"ov{i}@example.com", "role": "student"}
+            )).json()
+            students.append((await ac.post(
+                "/api/students/", json={"user_id": user["id"], "class_name": class_name}
+            )).json())
+        
+        now = datetime.now().replace(microsecond=0)
+        await ac.post("/api/grades/bulk", json={"grades": [
+            {"student_id": students[0]["id"], "teacher_id": teacher["id"], "subject": "Math", "grade": g,
+             "date": (now - timedelta(seconds=i)).isoformat()}
+            for i, g in enumerate(["5", "4"])
+        ]})
+        
+        response = await ac.get("/api/analytics/classes/overview", params={"class_names": ["5A", "5B"]})
+        single = await ac.get("/api/analytics/class/5A/overview")
+        missing = await ac.get("/api/analytics/class/9Z/overview")
+    assert response.status_code == 200
+    classes = {c["class_name"]: c for c in response.json()["classes"]}
+    assert classes["5A"]["student_count"] == 2
+    assert classes["5B"]["student_count"] == 1
+    assert classes["5A"]["recent_grades_count"] == 2
+    first = classes["5A"]["students"][0]
+    assert first["grade_count"] == 2
+    assert first["average_score"] == 4.5
+    assert first["attendance_rate"] is None
+    assert single.json()["recent_grades_count"] == 2
+    assert missing.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_reads_use_replica_unless_pinned_after_write(monkeypatch, tmp_path):
+    """List reads go to the replica, except right after the same client wrote"""
+    from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+    from sqlalchemy.orm import sessionmaker
+    from app.core import database
+    
+    replica = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'replica.db'}")
+    async with replica.begin() as conn:
+        await conn.run_sync(database.Base.metadata.create_all)
+    monkeypatch.setattr(
+        database, "ReadSession", sessionmaker(replica, class_=AsyncSession, expire_on_commit=False)
+    )
+    
+    transport = ASGITransport(app=app)
+    try:
+        async with AsyncClient(transport=transport, base_url="http://test") as ac:
+            created = await ac.post(
+                "/api/users", json={"name": "Pinned", "email": "pinned@example.com", "role": "student"}
+            )
+            assert database.PRIMARY_PIN_COOKIE in created.cookies
+            pinned = await ac.get("/api/users")
+            
+            ac.cookies.clear()
+            replicated = await ac.get("/api/users")
+    finally:
+        await replica.dispose()
+    assert [u["email"] for u in pinned.json()["users"]] == ["pinned@example.com"]
+    assert replicated.json()["users"] == []
+
+
+@pytest.mark.asyncio
+async def test_export_grades_streams_ndjson_and_csv():
+    """Test streaming grade exports with class and date filters"""
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        teacher_user = (await ac.post(
+            "/api/users", json={"name": "Export Teacher", "email": "export-t@example.com", "role": "teacher"}
+        )).json()
+        teacher = (await ac.post(
+            "/api/teachers/", json={"user_id": teacher_user["id"], "subjects": ["Math"]}
+        )).json()
+        students = []
+        for i, class_name in enumerate(["7A", "7B"]):
+            user = (await ac.post(
+                "/api/users", json={"name": f"Export {i}", "email": f"export{i}@example.com", "role": "student"}
+            )).json()
+            students.append((await ac.post(
+                "/api/students/", json={"user_id": user["id"], "class_name": class_name}
+            )).json())
+        await ac.post("/api/grades/bulk", json={"grades": [
+            {"student_id": s["id"], "teacher_id": teacher["id"], "subject": "Math", "grade": "4",
+             "date": "2024-03-01T10:00:00"}
+            for s in students
+        ] + [
+            {"student_id": students[0]["id"], "teacher_id": teacher["id"], "subject": "Math", "grade": "5",
+             "date": "2024-05-01T10:00:00"}
+        ]})
+        
+        ndjson = await ac.get("/api/export/grades", params={"class_name": "7A"})
+        csv_export = await ac.get(
+            "/api/export/grades", params={"format": "csv", "date_from": "2024-04-01T00:00:00"}
+        )
+        bad_format = await ac.get("/api/export/grades", params={"format": "xml"})
+    
+    assert ndjson.status_code == 200
+    assert ndjson.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in ndjson.text.splitlines()]
+    assert [(r["class_name"], r["grade"], r["score"]) for r in rows] == [("7A", "4", 4.0), ("7A", "5", 5.0)]
+    assert rows[0]["date"] == "2024-03-01T10:00:00"
+    
+    assert csv_export.status_code == 200
+    lines = csv_export.text.strip().splitlines()
+    assert lines[0].split(",")[:3] == ["id", "student_id", "class_name"]
+    assert len(lines) == 2 and ",5," in lines[1]
+    assert bad_format.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_list_include_embeds_related_objects():
+    """Test that include= eager-loads related objects and leaves them null otherwise"""
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        teacher_user = (await ac.post(
+            "/api/users", json={"name": "Include Teacher", "email": "include-t@example.com", "role": "teacher"}
+        )).json()
+        teacher = (await ac.post(
+            "/api/teachers/", json={"user_id": teacher_user["id"], "subjects": ["Math"]}
+        )).json()
+        student_user = (await ac.post(
+            "/api/users", json={"name": "Include Student", "email": "include-s@example.com", "role": "student"}
+        )).json()
+        student = (await ac.post(
+            "/api/students/", json={"user_id": student_user["id"], "class_name": "8C"}
+        )).json()
+        await ac.post("/api/grades/bulk", json={"grades": [
+            {"student_id": student["id"], "teacher_id": teacher["id"], "subject": "Math", "grade": "5",
+             "date": "2024-03-01T10:00:00"}
+        ]})
+        
+        plain = await ac.get("/api/grades/", params={"student_id": student["id"], "days": 10000})
+        included = await ac.get(
+            "/api/grades/", params=[("student_id", student["id"]), ("days", 10000), ("include", "with_student"), ("include", "with_teacher")]
+        )
+        students = await ac.get("/api/students/", params={"class_name": "8C", "include": "with_user"})
+        unknown = await ac.get("/api/students/", params={"include": "with_grades"})
+    
+    assert plain.status_code == 200
+    assert plain.json()["grades"][0]["student"] is None
+    assert plain.json()["grades"][0]["teacher"] is None
+    
+    grade = included.json()["grades"][0]
+    assert grade["student"] == {
+        "id": student["id"], "class_name": "8C", "user": {"id": student_user["id"], "name": "Include Student"}
+    }
+    assert grade["teacher"]["user"]["name"] == "Include Teacher"
+    assert students.json()["students"][0]["user"]["name"] == "Include Student"
+    assert unknown.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_include_embeds_users_without_a_name():
+    """Test that embedded users with a NULL name (users.name is nullable) still serialize"""
+    from sqlalchemy import update
+    from app.models.user import User
+    from tests.conftest import TestingSessionLocal
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        user = (await ac.post(
+            "/api/users", json={"name": "Nameless", "email": "nameless@example.com", "role": "student"}
+        )).json()
+        await ac.post("/api/students/", json={"user_id": user["id"], "class_name": "8N"})
+        async with TestingSessionLocal() as session:
+            await session.execute(update(User).where(User.id == user["id"]).values(name=None))
+            await session.commit()
+        
+        response = await ac.get("/api/students/", params={"class_name": "8N", "include": "with_user"})
+    
+    assert response.status_code == 200
+    assert response.json()["students"][0]["user"] == {"id": user["id"], "name": None}
+
+
+@pytest.mark.asyncio
+async def test_search_ranks_and_paginates():
+    """Test ranked prefix search across lessons, homework and grades"""
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        teacher_user = (await ac.post(
+            "/api/users", json={"name": "Search Teacher", "email": "search-t@example.com", "role": "teacher"}
+        )).json()
+        lesson = (await ac.post("/api/lessons/", json={
+            "date": "2024-03-01T09:00:00", "subject": "Math", "class_name": "5A",
+            "teacher_id": teacher_user["id"], "topic": "Fractions and decimals"
+        })).json()
+        other = (await ac.post("/api/lessons/", json={
+            "date": "2024-03-02T09:00:00", "subject": "Math", "class_name": "5A",
+            "teacher_id": teacher_user["id"], "topic": "Geometry"
+        })).json()
+        homework = (await ac.post("/api/homework/", json={
+            "lesson_id": lesson["id"], "title": "Worksheet", "description": "Adding fractions, fractions everywhere",
+            "due_date": "2024-03-05T09:00:00", "teacher_id": teacher_user["id"]
+        })).json()
+        await ac.put(f"/api/lessons/{other['id']}", json={"topic": "Fraction puzzles"})
+        
+        found = await ac.get("/api/search", params={"q": "fract"})
+        first_page = await ac.get("/api/search", params={"q": "fract", "limit": 2})
+        second_page = await ac.get(
+            "/api/search", params={"q": "fract", "limit": 2, "cursor": first_page.json()["next_cursor"]}
+        )
+        lessons_only = await ac.get("/api/search", params={"q": "fractions decimals", "kind": "lesson"})
+        bad_cursor = await ac.get("/api/search", params={"q": "fract", "cursor": "nope"})
+    
+    assert found.status_code == 200
+    hits = found.json()["results"]
+    assert {(h["kind"], h["id"]) for h in hits} == {
+        ("lesson", lesson["id"]), ("lesson", other["id"]), ("homework", homework["id"])
+    }
+    assert hits[0]["kind"] == "homework"
+    assert [h["rank"] for h in hits] == sorted((h["rank"] for h in hits), reverse=True)
+    assert first_page.json()["results"] + second_page.json()["results"] == hits
+    assert second_page.json()["next_cursor"] is None
+    assert [(h["kind"], h["text"]) for h in lessons_only.json()["results"]] == [("lesson", "Fractions and decimals")]
+    assert bad_cursor.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_attendance_heatmap_by_weekday_and_hour():
+    """Test weekday x hour absence buckets per student and class, cached per term"""
+    from app.services.database_service import heatmap_cache
+    heatmap_cache.clear()
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        teacher_user = (await ac.post(
+            "/api/users", json={"name": "Heatmap Teacher", "email": "heat-t@example.com", "role": "teacher"}
+        )).json()
+        user = (await ac.post(
+            "/api/users", json={"name": "Heatmap Student", "email": "heat-s@example.com", "role": "student"}
+        )).json()
+        student = (await ac.post("/api/students/", json={"user_id": user["id"], "class_name": "7C"})).json()
+        lessons = []
+        # Two Monday 9:00 lessons, one Monday 10:00, one Wednesday 9:00
+        for when in ["2024-03-04T09:00:00", "2024-03-11T09:15:00", "2024-03-04T10:00:00", "2024-03-06T09:00:00"]:
+            lessons.append((await ac.post("/api/lessons/", json={
+                "date": when, "subject": "Math", "class_name": "7C", "teacher_id": teacher_user["id"], "topic": "Sets"
+            })).json())
+        await ac.put("/api/attendance/bulk", json={"records": [
+            {"student_id": user["id"], "lesson_id": lesson["id"], "present": present}
+            for lesson, present in zip(lessons, [False, False, True, False])
+        ]})
+        
+        heatmap = await ac.get(f"/api/analytics/student/{student['id']}/attendance-heatmap", params={"day": "2024-03-01"})
+        other_term = await ac.get(f"/api/analytics/student/{student['id']}/attendance-heatmap", params={"day": "2023-10-01"})
+        class_heatmap = await ac.get("/api/analytics/class/7C/attendance-heatmap", params={"day": "2024-03-01"})
+        await ac.put("/api/attendance/bulk", json={"records": [
+            {"student_id": user["id"], "lesson_id": lessons[2]["id"], "present": False}
+        ]})
+        repeated = await ac.get("/api/analytics/class/7C/attendance-heatmap", params={"day": "2024-05-01"})
+        heatmap_cache.clear()
+        refreshed = await ac.get("/api/analytics/class/7C/attendance-heatmap", params={"day": "2024-05-01"})
+        missing = await ac.get("/api/analytics/student/999/attendance-heatmap")
+    
+    assert heatmap.status_code == 200
+    body = heatmap.json()
+    assert body["term"] == {"start": "2024-01-01", "end": "2024-09-01"}
+    assert [(c["weekday_name"], c["hour"], c["marked"], c["absences"]) for c in body["cells"]] == [
+        ("Monday", 9, 2, 2), ("Monday", 10, 1, 0), ("Wednesday", 9, 1, 1)
+    ]
+    assert body["cells"][0]["weekday"] == 1 and body["cells"][0]["absence_rate"] == 100.0
+    assert (body["total_marked"], body["total_absences"]) == (4, 3)
+    assert other_term.json()["cells"] == []
+    
+    assert class_heatmap.json()["cells"] == body["cells"]
+    assert repeated.json()["total_absences"] == 3  # same (closed) term: served from the cache
+    assert refreshed.json()["total_absences"] == 4
+    assert missing.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_student_percentiles():
+    """Test percentile ranks of a student's term averages"""
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        teacher_user = (await ac.post(
+            "/api/users", json={"name": "Rank Teacher", "email": "rank-t@example.com", "role": "teacher"}
+        )).json()
+        teacher = (await ac.post("/api/teachers/", json={"user_id": teacher_user["id"], "subjects": ["Math"]})).json()
+        students = []
+        for i, mark in enumerate(["5", "3"]):
+            user = (await ac.post(
+                "/api/users", json={"name": f"Rank {i}", "email": f"rank-{i}@example.com", "role": "student"}
+            )).json()
+            students.append((await ac.post("/api/students/", json={"user_id": user["id"], "class_name": "8A"})).json())
+            await ac.post("/api/grades/", json={
+                "student_id": students[-1]["id"], "teacher_id": teacher["id"], "subject": "Math",
+                "grade": mark, "date": "2024-03-01T09:00:00"
+            })
+        
+        response = await ac.get(f"/api/analytics/student/{students[0]['id']}/percentiles", params={"day": "2024-03-01"})
+        missing = await ac.get("/api/analytics/student/999/percentiles")
+    
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["class_name"], body["term"]) == ("8A", {"start": "2024-01-01", "end": "2024-09-01"})
+    math = body["subjects"]["Math"]
+    assert math["average"] == 5.0
+    assert math["class"]["percentile"] == 75.0 and math["class"]["students"] == 2
+    assert math["school"] == math["class"]
+    assert missing.status_code == 404
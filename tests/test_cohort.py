@@ -0,0 +1,96 @@
+import math
+import pytest
+from datetime import datetime, timedelta
+from app.services.cohort import GradeColumns, compute_cohort
+from app.services.database_service import DatabaseService
+
+
+def _reference(scores, days):
+    """Straightforward per-pair statistics to check the vectorized pass against"""
+    scored = [(d, s) for d, s in zip(days, scores) if s is not None]
+    ys = [s for _, s in scored]
+    ts = [d for d, _ in scored]
+    mean = sum(ys) / len(ys)
+    t_mean = sum(ts) / len(ts)
+    var = sum((t - t_mean) ** 2 for t in ts)
+    slope = sum((t - t_mean) * (y - mean) for t, y in zip(ts, ys)) / var if var else None
+    # Older half: days whose running count of scores is at most half of them
+    older = [y for t, y in scored if 2 * sum(1 for u in ts if u <= t) <= len(ys)]
+    newer = ys[len(older):]
+    delta = sum(newer) / len(newer) - sum(older) / len(older) if older and newer else None
+    return mean, slope, delta, min(ys), max(ys), ys[-1]
+
+
+def test_compute_cohort_matches_per_pair_reference():
+    """Test the vectorized statistics against a per-pair computation, with unsorted input"""
+    start = datetime(2024, 2, 1)
+    series = {
+        (1, "Math"): ([3.0, None, 4.0, 4.5, 5.0], [0, 1, 2, 5, 9]),
+        (1, "Physics"): ([5.0, 4.0, 3.0, 2.0, 1.0], [0, 3, 3, 4, 8]),
+        (2, "Math"): ([4.0], [3]),
+        (2, "Art"): ([None, None], [1, 2]),
+    }
+    rows = [
+        (student, subject, start + timedelta(days=d), s)
+        for (student, subject), (scores, days) in series.items()
+        for s, d in zip(scores, days)
+    ]
+    stats = compute_cohort(GradeColumns.from_rows(reversed(rows))).by_student()
+    
+    assert list(stats) == [1, 2]
+    assert list(stats[1]) == ["Math", "Physics"]
+    for (student, subject), (scores, days) in series.items():
+        result = stats[student][subject]
+        assert result["grade_count"] == len(scores)
+        if all(s is None for s in scores):
+            assert (result["count"], result["trend"], result["latest_grade"]) == (0, "no_data", None)
+            continue
+        mean, slope, delta, lowest, highest, latest = _reference(scores, days)
+        assert result["average"] == round(mean, 2)
+        assert (result["lowest_grade"], result["highest_grade"], result["latest_grade"]) == (lowest, highest, latest)
+        if slope is None:
+            assert result["slope"] is None
+        else:
+            assert math.isclose(result["slope"], slope, abs_tol=1e-4)
+        assert result["half_delta"] == (None if delta is None else round(delta, 2))
+    
+    assert stats[1]["Math"]["trend"] == "improving"
+    assert stats[1]["Physics"]["trend"] == "declining"
+    assert stats[2]["Math"]["trend"] == "insufficient_data"
+
+
+def test_compute_cohort_empty():
+    """Test that no grades produce no pairs"""
+    assert compute_cohort(GradeColumns.from_rows([])).by_student() == {}
+
+
+@pytest.mark.asyncio
+async def test_cohort_trends_agree_with_grade_trends(db_session):
+    """Test that the cohort engine and the rollup-based trend query agree"""
+    database_service = DatabaseService(session=db_session)
+    start = (datetime.now() - timedelta(days=10)).replace(hour=10)
+    for i, mark in enumerate(["5", "4", "4", "3", "2"]):
+        await database_service.create_grade(1, 1, "Math", mark, start + timedelta(days=i))
+    
+    cohort = (await database_service.get_cohort_trends(days=30))[1]["Math"]
+    trend = await database_service.get_grade_trends(1, "Math", days=30)
+    
+    for key in ("average", "trend", "count", "latest_grade", "highest_grade", "lowest_grade"):
+        assert cohort[key] == trend[key]
+    assert cohort["slope"] < 0
+
+
+@pytest.mark.asyncio
+async def test_trend_halves_keep_same_day_grades_together(db_session):
+    """Test that both trend paths split halves at day boundaries, not at the middle grade"""
+    database_service = DatabaseService(session=db_session)
+    start = (datetime.now() - timedelta(days=10)).replace(hour=9, minute=0)
+    # Splitting by position would compare 4, 3 with 5, 4 (improving); by day it is 4 vs 3, 5, 4
+    for mark, offset in [("4", timedelta(0)), ("3", timedelta(days=2)), ("5", timedelta(days=2, hours=2)), ("4", timedelta(days=4))]:
+        await database_service.create_grade(1, 1, "Math", mark, start + offset)
+    
+    cohort = (await database_service.get_cohort_trends(days=30))[1]["Math"]
+    trend = await database_service.get_grade_trends(1, "Math", days=30)
+    
+    assert cohort["trend"] == trend["trend"] == "stable"
+    assert cohort["half_delta"] == 0
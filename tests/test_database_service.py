@@ -2,6 +2,7 @@ import pytest
 from unittest.mock import Mock, AsyncMock, patch, MagicMock
 from datetime import datetime, timedelta
 from app.services.database_service import DatabaseService
+from app.models.homework_submission import HomeworkSubmission
 
 
 @pytest.fixture
@@ -21,12 +22,12 @@ async def test_get_grades_by_student():
     # Mock the database session and query results
     mock_grade = Mock()
     mock_grade.id = 1
-    mock_grade.value = 5.0
+    mock_grade.score = 5.0
     mock_grade.date = datetime.now()
     mock_grade.subject = "Math"
     mock_grade.student_id = 1
     mock_grade.teacher_id = 1
-    mock_grade.lesson_id = 1
+    mock_grade.lesson_topic = "Fractions"
     
     mock_result = Mock()
     mock_result.scalars.return_value.all.return_value = [mock_grade]
@@ -96,120 +97,162 @@ async def test_get_homework_by_student(database_service):
     assert result[0]["title"] == "Math Assignment"
 
 
+async def _add_grades(db_session, values, subject="Math"):
+    """Insert grades for student 1, oldest first, one day apart"""
+    service = DatabaseService(session=db_session)
+    start = datetime.now() - timedelta(days=len(values))
+    for i, value in enumerate(values):
+        await service.create_grade(1, 1, subject, value, start + timedelta(days=i))
+    return service
+
+
 @pytest.mark.asyncio
-async def test_get_grade_trends_no_data(database_service):
+async def test_get_grade_trends_no_data(db_session):
     """Test get_grade_trends with no grade data"""
-    with patch.object(database_service, 'get_grades_by_student', 
-                     new=AsyncMock(return_value=[])):
-        result = await database_service.get_grade_trends(1, "Math")
-        
-        assert result["subject"] == "Math"
-        assert result["average"] == 0
-        assert result["trend"] == "no_data"
-        assert result["count"] == 0
+    database_service = DatabaseService(session=db_session)
+    result = await database_service.get_grade_trends(1, "Math")
+    
+    assert result["subject"] == "Math"
+    assert result["average"] == 0
+    assert result["trend"] == "no_data"
+    assert result["count"] == 0
 
 
 @pytest.mark.asyncio
-async def test_get_grade_trends_improving(database_service):
+async def test_get_grade_trends_improving(db_session):
     """Test get_grade_trends with improving trend"""
-    mock_grades = [
-        {"value": 5.0, "date": "2024-01-20"},
-        {"value": 4.5, "date": "2024-01-15"},
-        {"value": 4.0, "date": "2024-01-10"},
-        {"value": 3.5, "date": "2024-01-05"}
-    ]
+    database_service = await _add_grades(db_session, ["3", "3+", "4", "5"])
+    result = await database_service.get_grade_trends(1, "Math")
     
-    with patch.object(database_service, 'get_grades_by_student', 
-                     new=AsyncMock(return_value=mock_grades)):
-        result = await database_service.get_grade_trends(1, "Math")
-        
-        assert result["subject"] == "Math"
-        assert result["average"] > 0
-        assert result["trend"] in ["improving", "stable", "declining"]
-        assert result["count"] == 4
+    assert result["subject"] == "Math"
+    assert result["average"] == 3.81
+    assert result["trend"] == "improving"
+    assert result["count"] == 4
+    assert result["latest_grade"] == 5
+    assert result["highest_grade"] == 5
+    assert result["lowest_grade"] == 3
 
 
 @pytest.mark.asyncio
-async def test_get_grade_trends_declining(database_service):
+async def test_get_grade_trends_declining(db_session):
     """Test get_grade_trends with declining trend"""
-    mock_grades = [
-        {"value": 3.0, "date": "2024-01-20"},
-        {"value": 3.5, "date": "2024-01-15"},
-        {"value": 4.0, "date": "2024-01-10"},
-        {"value": 4.5, "date": "2024-01-05"}
-    ]
+    database_service = await _add_grades(db_session, ["5", "5", "4", "3", "3"])
+    await _add_grades(db_session, ["2", "2"], subject="Physics")
+    result = await database_service.get_grade_trends(1, "Math")
     
-    with patch.object(database_service, 'get_grades_by_student', 
-                     new=AsyncMock(return_value=mock_grades)):
-        result = await database_service.get_grade_trends(1, "Math")
-        
-        assert result["subject"] == "Math"
-        assert result["trend"] in ["improving", "stable", "declining"]
+    assert result["subject"] == "Math"
+    assert result["count"] == 5
+    assert result["trend"] == "declining"
 
 
 @pytest.mark.asyncio
-async def test_get_attendance_stats_no_data(database_service):
+async def test_get_grade_trends_single_grade(db_session):
+    """Test get_grade_trends with a single grade"""
+    database_service = await _add_grades(db_session, ["4"])
+    result = await database_service.get_grade_trends(1, "Math")
+    
+    assert result["count"] == 1
+    assert result["trend"] == "insufficient_data"
+
+
+async def _add_attendance(db_session, marks):
+    """Insert attendance for student 1, one lesson per mark"""
+    service = DatabaseService(session=db_session)
+    for present in marks:
+        lesson = await service.create_lesson(datetime.now(), "Math", "5A", 1, topic="Fractions")
+        await service.mark_attendance(1, lesson.id, present=present)
+    return service
+
+
+@pytest.mark.asyncio
+async def test_get_attendance_stats_no_data(db_session):
     """Test get_attendance_stats with no attendance data"""
-    with patch.object(database_service, 'get_attendance_by_student', 
-                     new=AsyncMock(return_value=[])):
-        result = await database_service.get_attendance_stats(1)
-        
-        assert result["total_lessons"] == 0
-        assert result["attendance_rate"] == 0
+    database_service = DatabaseService(session=db_session)
+    result = await database_service.get_attendance_stats(1)
+    
+    assert result["total_lessons"] == 0
+    assert result["attendance_rate"] == 0
 
 
 @pytest.mark.asyncio
-async def test_get_attendance_stats_perfect_attendance(database_service):
+async def test_get_attendance_stats_perfect_attendance(db_session):
     """Test get_attendance_stats with perfect attendance"""
-    mock_records = [
-        {"present": True} for _ in range(10)
-    ]
+    database_service = await _add_attendance(db_session, [True] * 10)
+    result = await database_service.get_attendance_stats(1)
     
-    with patch.object(database_service, 'get_attendance_by_student', 
-                     new=AsyncMock(return_value=mock_records)):
-        result = await database_service.get_attendance_stats(1)
-        
-        assert result["total_lessons"] == 10
-        assert result["present_count"] == 10
-        assert result["absent_count"] == 0
-        assert result["attendance_rate"] == 100.0
+    assert result["total_lessons"] == 10
+    assert result["present_count"] == 10
+    assert result["absent_count"] == 0
+    assert result["attendance_rate"] == 100.0
 
 
 @pytest.mark.asyncio
-async def test_get_attendance_stats_partial_attendance(database_service):
+async def test_get_attendance_stats_partial_attendance(db_session):
     """Test get_attendance_stats with partial attendance"""
-    mock_records = [
-        {"present": True},
-        {"present": True},
-        {"present": False},
-        {"present": True},
-        {"present": False}
-    ]
+    database_service = await _add_attendance(db_session, [True, True, False, True, False])
+    result = await database_service.get_attendance_stats(1)
     
-    with patch.object(database_service, 'get_attendance_by_student', 
-                     new=AsyncMock(return_value=mock_records)):
-        result = await database_service.get_attendance_stats(1)
-        
-        assert result["total_lessons"] == 5
-        assert result["present_count"] == 3
-        assert result["absent_count"] == 2
-        assert result["attendance_rate"] == 60.0
+    assert result["total_lessons"] == 5
+    assert result["present_count"] == 3
+    assert result["absent_count"] == 2
+    assert result["attendance_rate"] == 60.0
 
 
 @pytest.mark.asyncio
-async def test_get_homework_completion_rate_no_data(database_service):
+async def test_get_homework_completion_rate_no_data(db_session):
     """Test get_homework_completion_rate with no homework data"""
-    mock_result = Mock()
-    mock_result.scalars.return_value.all.return_value = []
-    
-    database_service.session.execute = AsyncMock(return_value=mock_result)
-    
+    database_service = DatabaseService(session=db_session)
     result = await database_service.get_homework_completion_rate(1)
     
     assert result["total_assignments"] == 0
     assert result["completion_rate"] == 0
 
 
+@pytest.mark.asyncio
+async def test_get_homework_completion_rate_counts_in_sql(db_session):
+    """Test get_homework_completion_rate aggregates the class's homework and submissions"""
+    database_service = DatabaseService(session=db_session)
+    await database_service.create_student(1, "5A")
+    lesson = await database_service.create_lesson(datetime.now(), "Math", "5A", 1, topic="Fractions")
+    other_class = await database_service.create_lesson(datetime.now(), "Math", "5B", 1, topic="Fractions")
+    done = await database_service.create_homework(lesson.id, "Done", "", datetime.now() + timedelta(days=1), 1)
+    await database_service.create_homework(lesson.id, "Late", "", datetime.now() - timedelta(days=1), 1)
+    await database_service.create_homework(lesson.id, "Pending", "", datetime.now() + timedelta(days=2), 1)
+    await database_service.create_homework(other_class.id, "Not ours", "", datetime.now() - timedelta(days=1), 1)
+    db_session.add(HomeworkSubmission(homework_id=done.id, student_id=1, is_completed=True))
+    db_session.add(HomeworkSubmission(homework_id=done.id, student_id=1, is_completed=True))
+    await db_session.commit()
+    
+    result = await database_service.get_homework_completion_rate(1)
+    
+    assert result["total_assignments"] == 3
+    assert result["completed_count"] == 1
+    assert result["completion_rate"] == 33.33
+    assert result["pending_count"] == 1
+    assert result["overdue_count"] == 1
+    assert [h["title"] for h in await database_service.get_homework_by_student(1)] == ["Pending", "Done", "Late"]
+
+
+@pytest.mark.asyncio
+async def test_get_class_homework_completion(db_session):
+    """Test per-student homework completion for a whole class in one query"""
+    database_service = DatabaseService(session=db_session)
+    first = await database_service.create_student(1, "5A")
+    second = await database_service.create_student(2, "5A")
+    await database_service.create_student(3, "5B")
+    lesson = await database_service.create_lesson(datetime.now(), "Math", "5A", 1, topic="Fractions")
+    homework = await database_service.create_homework(lesson.id, "Due", "", datetime.now() - timedelta(days=1), 1)
+    db_session.add(HomeworkSubmission(homework_id=homework.id, student_id=2, is_completed=True))
+    await db_session.commit()
+    
+    result = await database_service.get_class_homework_completion("5A")
+    
+    assert [(r["id"], r["completed_count"], r["overdue_count"], r["completion_rate"]) for r in result] == [
+        (first.id, 0, 1, 0.0),
+        (second.id, 1, 0, 100.0),
+    ]
+
+
 @pytest.mark.asyncio
 async def test_get_homework_completion_rate_with_submissions(database_service):
     """Test get_homework_completion_rate with homework submissions"""
@@ -243,3 +286,359 @@ async def test_get_homework_completion_rate_with_submissions(database_service):
     assert result["completed_count"] == 1
     assert result["completion_rate"] == 50.0
     assert result["overdue_count"] == 1
+
+
+@pytest.mark.asyncio
+async def test_create_grade_sets_score(db_session):
+    """Test that grade writes store the parsed numeric score"""
+    database_service = DatabaseService(session=db_session)
+    grade = await database_service.create_grade(1, 1, "Math", "4+", datetime.now())
+    assert grade.score == 4.25
+    
+    updated = await database_service.update_grade(grade.id, grade="3")
+    assert updated.score == 3.0
+
+
+@pytest.mark.asyncio
+async def test_backfill_grade_scores(db_session):
+    """Test chunked backfill of scores for legacy rows"""
+    from app.models.grade import Grade
+    for mark in ["5", "4-", "н", "3", "2+"]:
+        db_session.add(Grade(student_id=1, teacher_id=1, subject="Math", grade=mark, date=datetime.now()))
+    await db_session.commit()
+    
+    database_service = DatabaseService(session=db_session)
+    updated = await database_service.backfill_grade_scores(chunk_size=2)
+    
+    assert updated == 4
+    result = await database_service.get_grades_by_student(1)
+    assert sorted(g["value"] for g in result if g["value"] is not None) == [2.25, 3.0, 3.75, 5.0]
+
+
+@pytest.mark.asyncio
+async def test_grade_rollups_follow_writes(db_session):
+    """Test that daily rollups are kept current by create, update and delete"""
+    from app.models.rollup import StudentSubjectDaily
+    from sqlalchemy import select
+    database_service = DatabaseService(session=db_session)
+    day = (datetime.now() - timedelta(days=1)).replace(hour=10)
+    first = await database_service.create_grade(1, 1, "Math", "5", day)
+    await database_service.create_grade(1, 1, "Math", "3", day.replace(hour=11))
+    
+    rollup = (await db_session.execute(select(StudentSubjectDaily))).scalars().one()
+    assert (rollup.grade_count, rollup.score_sum, rollup.score_min, rollup.score_max) == (2, 8.0, 3.0, 5.0)
+    
+    await database_service.update_grade(first.id, subject="Physics")
+    await database_service.delete_grade(first.id)
+    db_session.expire_all()
+    rollups = (await db_session.execute(select(StudentSubjectDaily))).scalars().all()
+    assert [(r.subject, r.grade_count, r.score_max) for r in rollups] == [("Math", 1, 3.0)]
+    
+    summary = await database_service.get_subject_summary(1)
+    assert summary == {"Math": {"count": 1, "average": 3.0, "lowest": 3.0, "highest": 3.0}}
+
+
+@pytest.mark.asyncio
+async def test_update_grade_to_unscored_mark_clears_score(db_session):
+    """Test that replacing a numeric mark with one that has no score writes a NULL score"""
+    database_service = await _add_grades(db_session, ["4", "2"])
+    grade = (await database_service.get_grades(limit=10))[0]
+    
+    updated = await database_service.update_grade(grade.id, grade="abs")
+    
+    assert (updated.grade, updated.score) == ("abs", None)
+    assert await database_service.get_subject_summary(1) == {
+        "Math": {"count": 2, "average": 2.0, "lowest": 2.0, "highest": 2.0}
+    }
+    assert (await database_service.get_trend_state(1))["Math"]["recent_scores"] == [2.0]
+
+
+@pytest.mark.asyncio
+async def test_attendance_rollups_follow_updates(db_session):
+    """Test that attendance stats reflect corrections through the rollup"""
+    database_service = await _add_attendance(db_session, [True, True, False])
+    record = (await database_service.get_attendance_records())[2]
+    await database_service.update_attendance(record.id, present=True)
+    
+    result = await database_service.get_attendance_stats(1)
+    assert result["present_count"] == 3
+    assert result["absent_count"] == 0
+
+
+@pytest.mark.asyncio
+async def test_single_marks_and_roster_share_one_record(db_session):
+    """Test that single marks, the lesson roster and bulk upserts all key on the lesson's date"""
+    from sqlalchemy import select
+    from app.models.attendance import Attendance
+    from app.models.rollup import StudentAttendanceDaily
+    database_service = DatabaseService(session=db_session)
+    lesson_date = datetime.now().replace(microsecond=0) - timedelta(days=3)
+    lesson = await database_service.create_lesson(lesson_date, "Math", "5A", 1, topic="Fractions")
+    
+    first = await database_service.mark_attendance(1, lesson.id, present=True)
+    await database_service.mark_lesson_attendance(lesson.id, {1: False})
+    await database_service.upsert_attendance([{"student_id": 1, "lesson_id": lesson.id, "present": False}])
+    again = await database_service.mark_attendance(1, lesson.id, present=False)
+    
+    records = (await db_session.execute(select(Attendance))).scalars().all()
+    assert [(r.id, r.date, r.present) for r in records] == [(first.id, lesson_date, False)]
+    assert again.id == first.id
+    db_session.expire_all()
+    rollups = (await db_session.execute(select(StudentAttendanceDaily))).scalars().all()
+    assert [(r.day, r.present_count, r.absent_count) for r in rollups] == [(lesson_date.date(), 0, 1)]
+    assert await database_service.mark_attendance(1, 9999) is None
+
+
+@pytest.mark.asyncio
+async def test_update_and_delete_missing_rows(db_session):
+    """Test that RETURNING-based writes report missing rows"""
+    database_service = DatabaseService(session=db_session)
+    assert await database_service.update_grade(999, grade="5") is None
+    assert await database_service.update_grade(999, subject="Math") is None
+    assert await database_service.update_lesson(999, topic="Fractions") is None
+    assert await database_service.delete_grade(999) is False
+    assert await database_service.delete_homework(999) is False
+
+
+@pytest.mark.asyncio
+async def test_batch_commits_once_and_rolls_back_together(db_session):
+    """Test that batch() groups writes into a single transaction"""
+    from app.models.user import Role
+    database_service = DatabaseService(session=db_session)
+    
+    async with database_service.batch():
+        user = await database_service.create_user("Batch", "batch@example.com", Role.student)
+        student = await database_service.create_student(user.id, "6A")
+        await database_service.update_student(student.id, class_name="6B")
+    student_id = student.id
+    assert (await database_service.get_student_by_id(student_id)).class_name == "6B"
+    
+    with pytest.raises(RuntimeError):
+        async with database_service.batch():
+            await database_service.create_user("Lost", "lost@example.com", Role.student)
+            await database_service.delete_student(student_id)
+            raise RuntimeError("abort")
+    assert await database_service.count_users() == 1
+    assert await database_service.get_student_by_id(student_id) is not None
+
+
+@pytest.mark.asyncio
+async def test_upserts_are_idempotent(db_session):
+    """Test that replaying grades and attendance updates rows instead of duplicating them"""
+    from app.models.user import Role
+    database_service = DatabaseService(session=db_session)
+    teacher_user = await database_service.create_user("Sync Teacher", "sync-t@example.com", Role.teacher)
+    teacher = await database_service.create_teacher(teacher_user.id, ["Math"])
+    user = await database_service.create_user("Sync Student", "sync-s@example.com", Role.student)
+    student = await database_service.create_student(user.id, "6A")
+    day = datetime(2024, 3, 1, 9)
+    lesson = await database_service.create_lesson(day, "Math", "6A", teacher_user.id, topic="Fractions")
+    feed = [
+        {"student_id": student.id, "teacher_id": teacher.id, "subject": "Math", "grade": "4", "date": day},
+        {"student_id": student.id, "teacher_id": teacher.id, "subject": "Math", "grade": "3", "date": day + timedelta(hours=1)},
+        {"student_id": 999, "teacher_id": teacher.id, "subject": "Math", "grade": "5", "date": day},
+    ]
+    
+    upserted, errors = await database_service.upsert_grades(feed)
+    assert [g.grade for g in upserted] == ["4", "3"]
+    assert errors == [{"index": 2, "detail": "Student with ID 999 not found"}]
+    
+    upserted, _ = await database_service.upsert_grades(feed[:2])
+    assert upserted == []
+    upserted, _ = await database_service.upsert_grades([{**feed[0], "grade": "5"}, {**feed[0], "grade": "5-"}])
+    assert [(g.grade, g.score) for g in upserted] == [("5-", 4.75)]
+    assert await database_service.count_grades() == 2
+    assert await database_service.get_subject_summary(student.id, days=100000) == {
+        "Math": {"count": 2, "average": 3.88, "lowest": 3.0, "highest": 4.75}
+    }
+    
+    # New grades after the pair's latest one are folded in without rescanning its history
+    later = {**feed[0], "grade": "2", "date": day + timedelta(days=1)}
+    with patch.object(database_service, "_fold_grade_trends", wraps=database_service._fold_grade_trends) as folds:
+        upserted, _ = await database_service.upsert_grades([later])
+        assert [g.grade for g in upserted] == ["2"] and not folds.called
+        await database_service.upsert_grades([{**later, "grade": "3"}])
+        assert folds.call_count == 1
+    assert (await database_service.get_trend_state(student.id))["Math"]["recent_scores"] == [4.75, 3.0, 3.0]
+    
+    records = [{"student_id": user.id, "lesson_id": lesson.id, "present": False}]
+    upserted, _ = await database_service.upsert_attendance(records)
+    assert [(a.present, a.date) for a in upserted] == [(False, lesson.date)]
+    assert (await database_service.upsert_attendance(records))[0] == []
+    upserted, errors = await database_service.upsert_attendance(
+        [{**records[0], "present": True}, {"student_id": user.id, "lesson_id": 999}]
+    )
+    assert [a.present for a in upserted] == [True]
+    assert errors == [{"index": 1, "detail": "Lesson with ID 999 not found"}]
+    assert await database_service.count_attendance_records() == 1
+
+
+@pytest.mark.asyncio
+async def test_trend_state_follows_grade_writes(db_session):
+    """Test that incremental trend state matches a rebuild after appends, back-dated grades and corrections"""
+    database_service = await _add_grades(db_session, ["3", "3", "4", "5", "5"])
+    state = (await database_service.get_trend_state(1))["Math"]
+    assert (state["count"], state["average"], state["recent_scores"]) == (5, 4.0, [3.0, 3.0, 4.0, 5.0, 5.0])
+    assert (state["ewma"], state["std_dev"]) == (4.42, 1.0)
+    assert state["trend"] == "improving"
+    
+    # Back-dated grade, a correction and a deletion all end up where a rebuild would
+    first = await database_service.create_grade(1, 1, "Math", "2", datetime.now() - timedelta(days=30))
+    grades = await database_service.get_grades(limit=10)
+    await database_service.update_grade(grades[-1].id, grade="3")
+    await database_service.delete_grade(first.id)
+    await _add_grades(db_session, ["n"])
+    incremental = await database_service.get_trend_state(1)
+    
+    await database_service.rebuild_rollups()
+    assert incremental == await database_service.get_trend_state(1)
+    assert incremental["Math"]["recent_scores"] == [3.0, 3.0, 4.0, 5.0, 3.0]
+    assert incremental["Math"]["trend"] == "stable"
+    assert await database_service.get_trend_state(1, subject="Physics") == {}
+
+
+async def _archive_spring_2024(db_session, database_service):
+    """Archive the 2024-01-01 - 2024-09-01 grades term as archive_terms.py does: record it, drop its rows"""
+    from datetime import date
+    from sqlalchemy import delete
+    from app.models.grade import Grade
+    await database_service.record_archived_term("grades", date(2024, 1, 1), date(2024, 9, 1))
+    await db_session.execute(delete(Grade).where(Grade.date < datetime(2024, 9, 1)))
+    await db_session.commit()
+
+
+@pytest.mark.asyncio
+async def test_archived_terms_keep_their_rollups(db_session):
+    """Test that writes dated in an archived term are rejected and rebuilds keep its rollups"""
+    from sqlalchemy import select
+    from app.models.rollup import StudentSubjectDaily
+    from app.services.database_service import ArchivedTermError
+    from app.models.user import Role
+    database_service = DatabaseService(session=db_session)
+    student = await database_service.create_student(
+        (await database_service.create_user("Archived", "archived@example.com", Role.student)).id, "5A"
+    )
+    teacher = await database_service.create_teacher(
+        (await database_service.create_user("Archivist", "archivist@example.com", Role.teacher)).id, ["Math"]
+    )
+    await database_service.create_grade(student.id, teacher.id, "Math", "4", datetime(2024, 3, 1, 9))
+    current = await database_service.create_grade(student.id, teacher.id, "Math", "5", datetime.now())
+    current_id, today, student_id = current.id, current.date.date(), student.id
+    await _archive_spring_2024(db_session, database_service)
+    
+    with pytest.raises(ArchivedTermError):
+        await database_service.create_grade(student.id, teacher.id, "Math", "2", datetime(2024, 3, 1, 10))
+    with pytest.raises(ArchivedTermError):
+        await database_service.update_grade(current_id, date=datetime(2024, 3, 1, 10))
+    _, errors = await database_service.upsert_grades([
+        {"student_id": student.id, "teacher_id": teacher.id, "subject": "Math", "grade": "2", "date": datetime(2024, 3, 1, 10)}
+    ])
+    assert "archived" in errors[0]["detail"]
+    
+    await database_service.rebuild_rollups()
+    db_session.expire_all()
+    days = (await db_session.execute(select(StudentSubjectDaily.day).order_by(StudentSubjectDaily.day))).scalars().all()
+    assert days == [datetime(2024, 3, 1).date(), today]
+    assert (await database_service.get_trend_state(student_id))["Math"]["recent_scores"] == [4.0, 5.0]
+
+
+@pytest.mark.asyncio
+async def test_trend_rebuilds_keep_archived_grades(db_session):
+    """Test that corrections and deletions after archiving a term rebuild on top of its grades"""
+    database_service = DatabaseService(session=db_session)
+    await database_service.create_grade(1, 1, "Math", "2", datetime(2024, 3, 1, 9))
+    await database_service.create_grade(1, 1, "Math", "4", datetime(2024, 5, 1, 9))
+    current = await database_service.create_grade(1, 1, "Math", "5", datetime.now())
+    current_id = current.id
+    before = await database_service.get_trend_state(1)
+    await _archive_spring_2024(db_session, database_service)
+    
+    await database_service.update_grade(current_id, grade="3")
+    corrected = (await database_service.get_trend_state(1))["Math"]
+    assert (corrected["count"], corrected["recent_scores"]) == (3, [2.0, 4.0, 3.0])
+    assert corrected["average"] == 3.0
+    
+    await database_service.update_grade(current_id, grade="5")
+    assert await database_service.get_trend_state(1) == before
+    await database_service.delete_grade(current_id)
+    assert (await database_service.get_trend_state(1))["Math"]["recent_scores"] == [2.0, 4.0]
+
+
+@pytest.mark.asyncio
+async def test_percentile_ranks_follow_grade_writes_and_class_changes(db_session):
+    """Test class, grade-level and school percentile ranks from the incrementally maintained sketches"""
+    from app.core.terms import term_for
+    from app.models.user import Role
+    database_service = DatabaseService(session=db_session)
+    day = datetime(2024, 3, 1, 9)
+    term = term_for(day)
+    students = {}
+    for name, class_name, marks in [
+        ("a", "5A", ["5"]), ("b", "5A", ["4", "4"]), ("c", "5A", ["3"]), ("d", "5B", ["5", "4"]), ("e", "6A", ["2"])
+    ]:
+        user = await database_service.create_user(name, f"{name}@example.com", Role.student)
+        students[name] = await database_service.create_student(user.id, class_name)
+        for i, mark in enumerate(marks):
+            await database_service.create_grade(students[name].id, 1, "Math", mark, day + timedelta(hours=i))
+    
+    ranks = (await database_service.get_percentile_ranks(students["b"], term))["Math"]
+    assert ranks["average"] == 4.0
+    assert ranks["class"] == {"percentile": 50.0, "students": 3, "median": 4.02}
+    assert (ranks["grade_level"]["percentile"], ranks["grade_level"]["students"]) == (37.5, 4)
+    assert (ranks["school"]["percentile"], ranks["school"]["students"]) == (50.0, 5)
+    assert await database_service.get_percentile_ranks(students["b"], term_for(datetime(2023, 10, 1))) == {}
+    
+    # c's average rises above b's; d joins b's class
+    c_grade = (await database_service.get_grades(student_id=students["c"].id))[0]
+    await database_service.update_grade(c_grade.id, grade="5")
+    await database_service.update_student(students["d"].id, class_name="5A")
+    ranks = (await database_service.get_percentile_ranks(students["b"], term))["Math"]
+    assert (ranks["class"]["percentile"], ranks["class"]["students"]) == (12.5, 4)
+    assert ranks["grade_level"]["students"] == 4
+    
+    await database_service.rebuild_rollups()
+    assert (await database_service.get_percentile_ranks(students["b"], term))["Math"] == ranks
+
+
+@pytest.mark.asyncio
+async def test_refresh_student_risk_ranks_school(db_session):
+    """Test that the risk job scores every student from grade slopes, attendance drops and missing-grade streaks"""
+    from app.models.user import Role
+    database_service = DatabaseService(session=db_session)
+    now = datetime.now().replace(hour=10, minute=0, second=0, microsecond=0)
+    days_ago = lambda n: now - timedelta(days=n)
+    teacher_user = await database_service.create_user("Risk Teacher", "risk-t@example.com", Role.teacher)
+    users = {}
+    students = {}
+    for name in ("falling", "steady", "ungraded"):
+        users[name] = await database_service.create_user(name, f"{name}@example.com", Role.student)
+        students[name] = await database_service.create_student(users[name].id, "9A")
+    lessons = [
+        await database_service.create_lesson(days_ago(n), "Math", "9A", teacher_user.id, topic="Risk")
+        for n in (20, 3, 2, 1)
+    ]
+    await database_service.create_homework(lessons[1].id, "Exercises", "1-10", days_ago(2), teacher_user.id)
+    
+    for n, mark in [(3, "5"), (2, "4"), (1, "2")]:
+        await database_service.create_grade(students["falling"].id, 1, "Math", mark, days_ago(n))
+    for n in (10, 9, 3):
+        await database_service.create_grade(students["steady"].id, 1, "Math", "4", days_ago(n))
+    for name, user in users.items():
+        await database_service.mark_attendance(user.id, lessons[0].id, present=True)
+        for lesson in lessons[1:]:
+            await database_service.mark_attendance(user.id, lesson.id, present=name != "falling")
+    
+    assert await database_service.refresh_student_risk() == 3
+    risk = {row.student_id: row for row in await database_service.get_student_risk()}
+    falling, steady, ungraded = (risk[students[name].id] for name in ("falling", "steady", "ungraded"))
+    
+    assert [r.rank for r in (falling, ungraded, steady)] == [1, 2, 3]
+    assert falling.grade_slope == -1.5 and steady.grade_slope == 0 and ungraded.grade_slope is None
+    assert (falling.attendance_rate, falling.attendance_drop, steady.attendance_drop) == (0, 100, 0)
+    assert [r.missing_grade_streak for r in (falling, steady, ungraded)] == [0, 2, 4]
+    assert {r.overdue_count for r in risk.values()} == {1}
+    # Slope z +1, attendance drop z +sqrt(2); the streak signal is in its favour
+    assert falling.score == pytest.approx(1 + 2 ** 0.5, rel=1e-3)
+    
+    assert [r.student_id for r in await database_service.get_student_risk(limit=1)] == [falling.student_id]
+    assert await database_service.get_student_risk(class_name="9B") == []
@@ -0,0 +1,28 @@
+import pytest
+from app.services.grading import parse_grade
+
+
+@pytest.mark.parametrize("mark, scale, expected", [
+    ("5", "five_point", 5.0),
+    ("4+", "five_point", 4.25),
+    ("4-", "five_point", 3.75),
+    ("5+", "five_point", 5.0),
+    (" 3 ", "five_point", 3.0),
+    ("6", "five_point", None),
+    ("н", "five_point", None),
+    ("85%", "five_point", None),
+    ("9-", "ten_point", 8.75),
+    ("10", "ten_point", 10.0),
+    ("85%", "percent", 85.0),
+    ("72,5", "percent", 72.5),
+    ("85+", "percent", None),
+])
+def test_parse_grade(mark, scale, expected):
+    """Test parsing mark strings on each grading scale"""
+    assert parse_grade(mark, scale) == expected
+
+
+def test_parse_grade_unknown_scale():
+    """Test that an unknown scale is rejected"""
+    with pytest.raises(ValueError):
+        parse_grade("5", "letters")
@@ -0,0 +1,77 @@
+import asyncio
+import pytest
+from app.services.loader import BatchLoader
+from app.services.database_service import DatabaseService
+from app.models.user import Role
+
+
+class RecordingBatch:
+    def __init__(self, fail=False):
+        self.calls = []
+        self.fail = fail
+
+    async def __call__(self, keys):
+        self.calls.append(sorted(keys))
+        if self.fail:
+            raise RuntimeError("boom")
+        return {key: f"value-{key}" for key in keys if key != 404}
+
+
+@pytest.mark.asyncio
+async def test_loads_in_the_same_tick_are_coalesced_and_memoized():
+    batch = RecordingBatch()
+    loader = BatchLoader(batch)
+    
+    results = await asyncio.gather(loader.load(1), loader.load(2), loader.load(1), loader.load(404))
+    assert results == ["value-1", "value-2", "value-1", None]
+    assert await loader.load(2) == "value-2"
+    assert batch.calls == [[1, 2, 404]]
+
+
+@pytest.mark.asyncio
+async def test_failures_are_not_memoized():
+    batch = RecordingBatch(fail=True)
+    loader = BatchLoader(batch)
+    
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            await loader.load(1)
+    assert batch.calls == [[1], [1]]
+
+
+@pytest.mark.asyncio
+async def test_prime_and_clear():
+    batch = RecordingBatch()
+    loader = BatchLoader(batch)
+    
+    loader.prime(7, "primed")
+    assert await loader.load(7) == "primed"
+    loader.clear(7)
+    assert await loader.load(7) == "value-7"
+    assert batch.calls == [[7]]
+
+
+@pytest.mark.asyncio
+async def test_get_by_ids_uses_one_query_and_tracks_writes(db_session):
+    """Test IN lookups behind the service's request-scoped loaders"""
+    database_service = DatabaseService(session=db_session)
+    users = [
+        await database_service.create_user(f"Loader {i}", f"loader{i}@example.com", Role.student)
+        for i in range(3)
+    ]
+    fresh = DatabaseService(session=db_session)
+    statements = []
+    execute = db_session.execute
+    
+    async def counting_execute(*args, **kwargs):
+        statements.append(args[0])
+        return await execute(*args, **kwargs)
+    db_session.execute = counting_execute
+    
+    found = await fresh.get_users_by_ids([users[0].id, users[2].id, users[0].id, 999])
+    assert sorted(found) == [users[0].id, users[2].id]
+    assert (await fresh.get_user_by_id(users[2].id)).name == "Loader 2"
+    assert len(statements) == 1
+    
+    await fresh.delete_user(users[2].id)
+    assert await fresh.get_user_by_id(users[2].id) is None
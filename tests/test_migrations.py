@@ -0,0 +1,41 @@
+import os
+from alembic import command
+from alembic.config import Config
+from alembic.autogenerate import compare_metadata
+from alembic.migration import MigrationContext
+from sqlalchemy import create_engine
+from app.core.database import Base
+import app.models  # noqa: F401
+from app.models.search import include_name
+
+MIGRATIONS_DB_FILE = "./test_migrations.db"
+ALEMBIC_INI = os.path.join(os.path.dirname(__file__), "..", "alembic.ini")
+
+
+def _alembic_config():
+    config = Config(ALEMBIC_INI)
+    config.set_main_option("sqlalchemy.url", f"sqlite+aiosqlite:///{MIGRATIONS_DB_FILE}")
+    config.attributes["configure_logger"] = False
+    return config
+
+
+def test_migrations_match_models():
+    """Test that upgrading to head produces exactly the model schema, and downgrades cleanly"""
+    if os.path.exists(MIGRATIONS_DB_FILE):
+        os.remove(MIGRATIONS_DB_FILE)
+    try:
+        config = _alembic_config()
+        command.upgrade(config, "head")
+        
+        engine = create_engine(f"sqlite:///{MIGRATIONS_DB_FILE}")
+        with engine.connect() as conn:
+            diff = compare_metadata(
+                MigrationContext.configure(conn, opts={"include_name": include_name}), Base.metadata
+            )
+        engine.dispose()
+        assert diff == []
+        
+        command.downgrade(config, "base")
+    finally:
+        if os.path.exists(MIGRATIONS_DB_FILE):
+            os.remove(MIGRATIONS_DB_FILE)
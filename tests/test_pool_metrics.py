@@ -0,0 +1,49 @@
+import pytest
+from sqlalchemy import exc, text
+from sqlalchemy.ext.asyncio import create_async_engine
+from httpx import AsyncClient, ASGITransport
+from app.main import app
+from app.core.pool_metrics import InstrumentedAsyncQueuePool, instrument_engine
+
+
+@pytest.mark.asyncio
+async def test_pool_metrics_track_checkouts_and_timeouts(tmp_path):
+    """Checkouts, connections in use and checkout timeouts are counted"""
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path / 'pool.db'}",
+        poolclass=InstrumentedAsyncQueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.05,
+    )
+    metrics = instrument_engine(engine, "test")
+    try:
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+            assert metrics.snapshot(engine.sync_engine.pool)["connections_in_use"] == 1
+            with pytest.raises(exc.TimeoutError):
+                async with engine.connect():
+                    pass
+        snapshot = metrics.snapshot(engine.sync_engine.pool)
+    finally:
+        await engine.dispose()
+    
+    assert snapshot["checkouts"] == 1
+    assert snapshot["checkout_timeouts"] == 1
+    assert snapshot["connections_in_use"] == 0
+    assert snapshot["peak_connections_in_use"] == 1
+    assert snapshot["connections_opened"] == 1
+    assert snapshot["pool_size"] == 1
+    assert snapshot["overflow_in_use"] == 0
+    assert snapshot["checkout_latency_avg_ms"] is not None
+
+
+@pytest.mark.asyncio
+async def test_db_pool_metrics_endpoint():
+    """Test the pool metrics surface"""
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        response = await ac.get("/api/metrics/db-pool")
+    assert response.status_code == 200
+    primary = response.json()["primary"]
+    assert {"checkouts", "checkout_timeouts", "connections_in_use", "overflow_in_use"} <= primary.keys()
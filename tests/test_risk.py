@@ -0,0 +1,32 @@
+import numpy as np
+from app.services.risk import RiskSignals, missing_grade_streaks, score_risk, zscores
+
+
+def test_zscores_ignore_missing_and_constant_signals():
+    """Test that NaN entries and signals without spread score 0"""
+    z = zscores(np.array([1.0, np.nan, 3.0]))
+    assert list(z) == [-1.0, 0.0, 1.0]
+    assert list(zscores(np.array([2.0, 2.0, np.nan]))) == [0.0, 0.0, 0.0]
+
+
+def test_score_risk_adds_positive_parts_and_ranks():
+    """Test that only the risky side of each signal counts and ties keep student order"""
+    signals = RiskSignals(
+        grade_slope=np.array([-1.0, 1.0, np.nan, np.nan]),
+        attendance_rate=np.full(4, np.nan),
+        attendance_drop=np.array([0.0, 0.0, 10.0, 0.0]),
+        overdue_count=np.zeros(4),
+        missing_grade_streak=np.zeros(4),
+    )
+    score, rank = score_risk(signals)
+    # Student 0 only scores on its falling grades; student 1's rising grades do not offset anything
+    assert score[0] == 1.0 and score[1] == 0.0
+    assert list(rank) == [2, 3, 1, 4]
+
+
+def test_missing_grade_streaks():
+    """Test streaks of ungraded latest lessons, per student, newest lesson first"""
+    student_index = np.array([0, 0, 0, 2, 2])
+    graded = np.array([False, True, False, False, False])
+    assert list(missing_grade_streaks(student_index, graded, 3)) == [1, 0, 2]
+    assert list(missing_grade_streaks(np.array([], dtype=int), np.array([], dtype=bool), 2)) == [0, 0]
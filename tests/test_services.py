@@ -7,4 +7,23 @@ async def test_analysis_service():
     client = MojoClient("", "")
     service = AnalysisService(client)
     # Add actual tests
-    assert service is not None
\ No newline at end of file
+    assert service is not None
+
+
+@pytest.mark.asyncio
+async def test_scheduler_holds_jobs_until_done(caplog):
+    import asyncio
+    from app.services.scheduler import SchedulerService
+    scheduler = SchedulerService(MojoClient("", ""))
+    
+    async def failing_job():
+        await asyncio.sleep(0)
+        raise RuntimeError("boom")
+    
+    scheduler._spawn(failing_job)
+    assert len(scheduler.jobs) == 1
+    await asyncio.gather(*scheduler.jobs, return_exceptions=True)
+    await asyncio.sleep(0)
+    
+    assert scheduler.jobs == set()
+    assert "failing_job failed: RuntimeError('boom')" in caplog.text
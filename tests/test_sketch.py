@@ -0,0 +1,31 @@
+import pytest
+from app.services.sketch import SKETCH_BINS, ScoreSketch, grade_level, sketch_bin
+
+
+def test_sketch_bins_cover_the_scale():
+    """Test that scale ends map to the first and last bins"""
+    assert sketch_bin(1.0, "five_point") == 0
+    assert sketch_bin(5.0, "five_point") == SKETCH_BINS - 1
+    assert sketch_bin(50.0, "percent") == SKETCH_BINS // 2
+
+
+def test_merged_sketch_ranks_like_the_combined_values():
+    """Test that merging class sketches equals sketching all values at once"""
+    class_a = [3.0, 4.0, 5.0]
+    class_b = [2.0, 4.5]
+    sketch = lambda values: ScoreSketch.from_bins([(sketch_bin(v, "five_point"), 1) for v in values], "five_point")
+    
+    merged = sketch(class_a) + sketch(class_b)
+    assert (merged.counts == sketch(class_a + class_b).counts).all()
+    assert merged.total == 5
+    assert merged.percentile_rank(4.0) == 50.0
+    assert merged.quantile(0.5) == 4.02
+    assert ScoreSketch(scale="five_point").percentile_rank(4.0) is None
+    
+    with pytest.raises(ValueError):
+        merged + ScoreSketch(scale="percent")
+
+
+@pytest.mark.parametrize("class_name, level", [("5A", "5"), ("10B", "10"), ("Prep", None)])
+def test_grade_level(class_name, level):
+    assert grade_level(class_name) == level
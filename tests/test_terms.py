@@ -0,0 +1,43 @@
+import pytest
+from datetime import date, datetime
+from app.core.terms import Term, term_for, terms_between, following_terms, term_start_days
+from app.services.partitions import create_partition_sql, ensure_term_partitions
+
+
+SPEC = "09-01,01-01"
+
+
+@pytest.mark.parametrize("day,expected", [
+    (date(2024, 9, 1), Term(date(2024, 9, 1), date(2025, 1, 1))),
+    (datetime(2024, 12, 31, 23, 59), Term(date(2024, 9, 1), date(2025, 1, 1))),
+    (date(2025, 1, 1), Term(date(2025, 1, 1), date(2025, 9, 1))),
+    (date(2025, 8, 31), Term(date(2025, 1, 1), date(2025, 9, 1))),
+])
+def test_term_for(day, expected):
+    assert term_for(day, SPEC) == expected
+
+
+def test_terms_between_and_following():
+    terms = terms_between(date(2024, 10, 5), date(2025, 9, 1), SPEC)
+    assert [t.label for t in terms] == ["2024_09", "2025_01", "2025_09"]
+    assert [t.label for t in following_terms(terms[-1], 2, SPEC)] == ["2026_01", "2026_09"]
+
+
+def test_term_start_days_validation():
+    assert term_start_days("01-01, 04-01,09-01") == [(1, 1), (4, 1), (9, 1)]
+    with pytest.raises(ValueError):
+        term_start_days("02-30")
+
+
+def test_create_partition_sql_moves_default_rows_before_attaching():
+    statements = create_partition_sql("grades", Term(date(2024, 9, 1), date(2025, 1, 1)))
+    assert statements[0].startswith("CREATE TABLE grades_2024_09 (LIKE grades")
+    assert "DELETE FROM grades_default WHERE date >= '2024-09-01' AND date < '2025-01-01'" in statements[1]
+    assert statements[2] == (
+        "ALTER TABLE grades ATTACH PARTITION grades_2024_09 FOR VALUES FROM ('2024-09-01') TO ('2025-01-01')"
+    )
+
+
+@pytest.mark.asyncio
+async def test_ensure_term_partitions_is_noop_without_postgres(db_session):
+    assert await ensure_term_partitions(db_session) == []